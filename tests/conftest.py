@@ -0,0 +1,25 @@
+from pathlib import Path
+
+import pytest
+
+from timeseries.common import enums
+from timeseries.economic import tariff_creator
+
+DATA_PATH = Path(__file__).parents[1] / "data"
+INVOICE_PATHS = {
+    enums.EnergyCarrier.ELECTRICITY:
+    DATA_PATH / "example_electric_invoices.csv",
+    enums.EnergyCarrier.NATURALGAS: DATA_PATH / "example_gas.csv",
+}
+
+
+@pytest.fixture(scope="session")
+def invoice_paths() -> dict:
+  return dict(INVOICE_PATHS)
+
+
+@pytest.fixture
+def importer() -> tariff_creator.EnergyTariffImporter:
+  importer = tariff_creator.EnergyTariffImporter("example")
+  importer.load_data(INVOICE_PATHS)
+  return importer
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from timeseries.economic import battery_dispatch
+
+
+def create_prices(nb_days: int, cheap: list[float],
+                  dear: list[float]) -> pd.Series:
+  """Return prices of 0.3 GBP/kWh with the first half-hour of each day at the
+  cheap price and the second at the dear price."""
+  index = pd.date_range("2023-01-02", periods=nb_days * 48, freq="30min")
+  prices = pd.Series(0.3, index=index)
+  prices.iloc[0::48] = cheap
+  prices.iloc[1::48] = dear
+  return prices
+
+
+def test_dispatch_buys_cheap_and_sells_dear():
+  prices = create_prices(1, [0.1], [0.5])
+  battery = battery_dispatch.BatteryParameters(10, 30, efficiency=0.81)
+  result = battery_dispatch.dispatch_batteries(prices, [battery])
+
+  # the whole capacity moves in one half-hour, 0.9 efficient each way
+  grid_energy = result.grid_energy[0]
+  assert grid_energy[0] == pytest.approx(10 / 0.9)
+  assert grid_energy[1] == pytest.approx(-9)
+  assert np.abs(grid_energy[2:]).max() == pytest.approx(0)
+  summary = result.get_summary()
+  assert summary.loc[battery.name, "Savings"] == pytest.approx(
+      9 * 0.5 - 10 / 0.9 * 0.1)
+  assert summary.loc[battery.name, "Cycles"] == pytest.approx(1)
+
+
+def test_power_limits_grid_energy():
+  prices = create_prices(1, [0.1], [0.5])
+  battery = battery_dispatch.BatteryParameters(100, 4, efficiency=0.81)
+  result = battery_dispatch.dispatch_batteries(prices, [battery])
+
+  # a 5 kWh step cannot be charged in a half-hour at 4 kW, finer steps can
+  assert result.get_summary().loc[battery.name, "Savings"] > 0
+  assert np.nanmax(np.abs(result.grid_energy)) <= 4 * 0.5 + 1e-9
+
+
+def test_max_cycles_keeps_most_profitable_days():
+  prices = create_prices(3, [0.1, 0.2, 0.1], [0.5, 0.3, 0.4])
+  battery = battery_dispatch.BatteryParameters(10, 20, efficiency=1.0,
+                                               max_cycles=2)
+  result = battery_dispatch.dispatch_batteries(prices, [battery])
+
+  summary = result.get_summary()
+  assert summary.loc[battery.name, "Cycles"] == pytest.approx(2)
+  assert summary.loc[battery.name, "Savings"] == pytest.approx(
+      10 * (0.5 - 0.1) + 10 * (0.4 - 0.1))
+  assert np.abs(result.grid_energy[0, 48:96]).max() == pytest.approx(0)
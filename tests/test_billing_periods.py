@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from timeseries.data import schema
+from timeseries.economic import billing_periods
+
+
+def get_invoices(starts: list[str], end_dates: list[str]) -> pd.DataFrame:
+  return pd.DataFrame(
+      {schema.DataInputSchema.END_DATE: pd.to_datetime(end_dates)},
+      index=pd.to_datetime(starts))
+
+
+def get_expected_positions(dataf: pd.DataFrame,
+                           index: pd.DatetimeIndex) -> np.ndarray:
+  """The invoice starting last among those covering each timestamp."""
+  starts, ends = billing_periods.get_period_bounds(dataf)
+  times = index.as_unit("ns").asi8
+  positions = np.full(len(times), billing_periods.NO_PERIOD)
+  for row in np.argsort(starts, kind="stable"):
+    positions[(starts[row] <= times) & (times < ends[row])] = row
+  return positions
+
+
+def test_nested_overlaps_use_last_started_invoice():
+  dataf = get_invoices(["2023-01-03", "2023-01-01", "2023-01-02"],
+                       ["2023-01-03", "2023-01-09", "2023-01-04"])
+  index = pd.date_range("2022-12-31", "2023-01-11", freq="D")
+  positions = billing_periods.BillingPeriods.from_dataframe(
+      dataf).get_positions(index)
+  np.testing.assert_array_equal(positions,
+                                [-1, 1, 2, 0, 2, 1, 1, 1, 1, 1, -1, -1])
+
+
+def test_random_overlaps():
+  rng = np.random.default_rng(0)
+  starts = pd.Timestamp("2023-01-01") + pd.to_timedelta(
+      rng.integers(0, 60, 40), unit="D")
+  end_dates = starts + pd.to_timedelta(rng.integers(0, 20, 40), unit="D")
+  dataf = get_invoices(starts, end_dates)
+  index = pd.date_range("2022-12-25", "2023-04-01", freq="6h")
+  np.testing.assert_array_equal(
+      billing_periods.BillingPeriods.from_dataframe(dataf).get_positions(
+          index), get_expected_positions(dataf, index))
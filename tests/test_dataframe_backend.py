@@ -0,0 +1,105 @@
+import pandas as pd
+import pytest
+
+from timeseries.common import enums
+from timeseries.economic import tariff_creator
+from timeseries.environmental import carbon
+
+pytest.importorskip("pyarrow")
+
+CARBON_RESPONSE = {
+    "data": [
+        {
+            "from": "2022-01-01T00:00Z",
+            "to": "2022-01-01T00:30Z",
+            "intensity": {
+                "forecast": 100,
+                "actual": 98,
+                "index": "low"
+            },
+        },
+        {
+            "from": "2022-01-01T00:30Z",
+            "to": "2022-01-01T01:00Z",
+            "intensity": {
+                "forecast": 110,
+                "actual": None,
+                "index": "low"
+            },
+        },
+    ]
+}
+
+
+def load_invoices(
+    invoice_paths: dict, backend: enums.DataFrameBackend,
+    keep_gas_readings: bool = False) -> tariff_creator.EnergyTariffImporter:
+  importer = tariff_creator.EnergyTariffImporter(
+      backend.value, backend=backend, keep_gas_readings=keep_gas_readings)
+  importer.load_data(invoice_paths)
+  return importer
+
+
+def assert_same_invoices(invoice_paths: dict, **options) -> None:
+  reference = load_invoices(invoice_paths, enums.DataFrameBackend.PANDAS,
+                            **options)
+  candidate = load_invoices(invoice_paths, enums.DataFrameBackend.ARROW,
+                            **options)
+  invoices = reference.invoice_data_dict
+  arrow_invoices = candidate.invoice_data_dict
+  assert arrow_invoices.keys() == invoices.keys()
+  for energy_carrier, dataf in invoices.items():
+    pd.testing.assert_frame_equal(arrow_invoices[energy_carrier], dataf)
+
+
+@pytest.mark.parametrize("keep_gas_readings", [False, True])
+def test_arrow_invoices_match_pandas(invoice_paths, keep_gas_readings):
+  assert_same_invoices(invoice_paths, keep_gas_readings=keep_gas_readings)
+
+
+def test_arrow_invoices_match_pandas_with_day_first_dates(
+    invoice_paths, tmp_path):
+  dataf = pd.read_csv(invoice_paths[enums.EnergyCarrier.ELECTRICITY],
+                      header=[0, 1],
+                      index_col=0)
+  for col in dataf.columns:
+    if col[1] in ("start_date", "end_date"):
+      dataf[col] = pd.to_datetime(dataf[col]).dt.strftime("%d/%m/%Y")
+  temp_path = tmp_path / "day_first.csv"
+  dataf.to_csv(temp_path)
+  assert_same_invoices({enums.EnergyCarrier.ELECTRICITY: temp_path})
+
+
+def test_arrow_tariff_structures_match_pandas(invoice_paths):
+  structures = load_invoices(
+      invoice_paths, enums.DataFrameBackend.PANDAS).get_tariff_structures()
+  arrow_structures = load_invoices(
+      invoice_paths, enums.DataFrameBackend.ARROW).get_tariff_structures()
+  assert arrow_structures.keys() == structures.keys()
+  for meter_id, structure in structures.items():
+    pd.testing.assert_series_equal(
+        arrow_structures[meter_id].get_total_charges_series(),
+        structure.get_total_charges_series())
+
+
+def test_arrow_carbon_intensity_matches_pandas():
+  pd.testing.assert_frame_equal(
+      carbon.json_response_to_dataframe(CARBON_RESPONSE,
+                                        enums.DataFrameBackend.ARROW),
+      carbon.json_response_to_dataframe(CARBON_RESPONSE))
+
+
+def test_rates_only_invoices(invoice_paths, tmp_path):
+  dataf = pd.read_csv(invoice_paths[enums.EnergyCarrier.ELECTRICITY],
+                      header=[0, 1],
+                      index_col=0)
+  dataf = dataf.drop(columns=tariff_creator.ELECTRICITY_CONSUMPTION_COLUMNS)
+  temp_path = tmp_path / "rates_only.csv"
+  dataf.to_csv(temp_path)
+  assert_same_invoices({enums.EnergyCarrier.ELECTRICITY: temp_path})
+
+  importer = load_invoices({enums.EnergyCarrier.ELECTRICITY: temp_path},
+                           enums.DataFrameBackend.PANDAS)
+  assert importer.get_tariff_structures()
+  with pytest.raises(ValueError):
+    importer.get_load_profiles()
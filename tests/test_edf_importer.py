@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from timeseries.data import schema
+from timeseries.economic import edf_importer
+
+MPAN = edf_importer.KEY_COLUMNS[0]
+BILL_PERIOD = edf_importer.KEY_COLUMNS[1]
+PERIODS = pd.to_datetime(["2023-01-01", "2023-02-01"])
+
+
+def get_column(name: str) -> str:
+  return edf_importer.normalize_column_name(name)
+
+
+def get_sheets() -> dict[str, pd.DataFrame]:
+  """Two bill periods of a meter, the second without night consumption nor
+  red band line."""
+  keys = {MPAN: [1928, 1928], BILL_PERIOD: PERIODS}
+  by_bill_period = pd.DataFrame({
+      **keys,
+      get_column(schema.EDFImportSchema.CONSUMP_KWH): [1000.0, 500.0],
+      get_column(schema.EDFImportSchema.CCL_AMOUNT): [7.75, 3.875],
+  })
+  detailed = pd.DataFrame({
+      MPAN: [1928, 1928, 1928, 1928],
+      BILL_PERIOD: PERIODS.repeat(2),
+      get_column(schema.EDFImportSchema.RATE_DESCRIPT): [
+          schema.EDFImportSchema.DAY_E_CHARGE,
+          schema.EDFImportSchema.NIGHT_E_CHARGE,
+          schema.EDFImportSchema.DAY_E_CHARGE,
+          schema.EDFImportSchema.NIGHT_E_CHARGE,
+      ],
+      get_column(schema.EDFImportSchema.RATE_CONSUMPT): [600.0, 400.0, 500.0,
+                                                          0.0],
+      get_column(schema.EDFImportSchema.RATE_CHARGE): [90.0, 40.0, 75.0, 0.0],
+  })
+  non_detailed = pd.DataFrame({
+      **keys,
+      get_column(schema.EDFImportSchema.RED_CONSUMP): [100.0, np.nan],
+      get_column(schema.EDFImportSchema.RED_CHARGE): [2.5, np.nan],
+      get_column(schema.EDFImportSchema.AMBER_CONSUMP): [300.0, 100.0],
+      get_column(schema.EDFImportSchema.AMBER_CHARGE): [1.5, 0.5],
+      get_column(schema.EDFImportSchema.GREEN_CONSUMP): [600.0, 400.0],
+      get_column(schema.EDFImportSchema.GREEN_CHARGE): [0.6, 0.4],
+  })
+  return {
+      schema.EDFImportSchema.BY_BILL_PERIOD: by_bill_period,
+      schema.EDFImportSchema.DETAILED: detailed,
+      schema.EDFImportSchema.NON_DETAILED: non_detailed,
+  }
+
+
+def test_rates_and_consumptions():
+  dataf = edf_importer.normalize_edf_invoices(get_sheets())
+  first_period = dataf.loc[PERIODS[0]]
+  assert first_period[schema.DataInputSchema.DAY_CHARGE] == 0.15
+  assert first_period[schema.DataInputSchema.NIGHT_CHARGE] == 0.1
+  assert first_period[schema.DataInputSchema.DUOS_RED] == 0.025
+  assert first_period[schema.DataInputSchema.CCL] == 0.00775
+
+
+def test_undefined_rates_are_missing():
+  dataf = edf_importer.normalize_edf_invoices(get_sheets())
+  second_period = dataf.loc[PERIODS[1]]
+  assert np.isnan(second_period[schema.DataInputSchema.NIGHT_CHARGE])
+  assert np.isnan(second_period[schema.DataInputSchema.DUOS_RED])
+  assert second_period[schema.DataInputSchema.NIGHT_CONSUMPTION] == 0
+  assert second_period[schema.DataInputSchema.RED_CONSUMPTION] == 0
+  assert np.isfinite(dataf.drop(columns=schema.DataInputSchema.METERCODE)
+                     .fillna(0).to_numpy(dtype=float)).all()
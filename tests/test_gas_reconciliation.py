@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from timeseries.common import enums
+from timeseries.data import schema
+from timeseries.economic import gas_reconciliation, tariff_creator
+
+CORRECTION_FACTOR = 1.02264
+CALORIFIC_VALUE = 39.5
+
+
+def create_invoice_lines(lines: list[dict]) -> pd.DataFrame:
+  """Return normalised gas invoice lines with their meter readings, actual
+  readings in m3 unless given."""
+  dataf = pd.DataFrame([{
+      schema.DataInputSchema.METERCODE: 1234,
+      schema.DataInputSchema.METER_UNIT: enums.MeterUnit.CUBIC_METRES.value,
+      schema.DataInputSchema.CORRECTION_FACTOR: CORRECTION_FACTOR,
+      schema.DataInputSchema.CALORIFIC_VALUE: CALORIFIC_VALUE,
+      schema.DataInputSchema.PRESENT_READING_TYPE:
+      enums.ReadingType.ACTUAL.value,
+      schema.DataInputSchema.PREVIOUS_READING_TYPE:
+      enums.ReadingType.ACTUAL.value,
+      schema.DataInputSchema.ENERGY_CHARGE: 0.02,
+      **line,
+  } for line in lines])
+  dataf.index = pd.date_range("2023-01-01", periods=len(dataf), freq="MS")
+  return dataf
+
+
+def get_kwh(volume: float) -> float:
+  return (volume * CORRECTION_FACTOR * CALORIFIC_VALUE /
+          gas_reconciliation.MJ_PER_KWH)
+
+
+def test_convert_readings_to_kwh():
+  dataf = create_invoice_lines([
+      {
+          schema.DataInputSchema.PRESENT_READING: 1100,
+          schema.DataInputSchema.PREVIOUS_READING: 1000,
+      },
+      {
+          schema.DataInputSchema.PRESENT_READING: 1100,
+          schema.DataInputSchema.PREVIOUS_READING: 1000,
+          schema.DataInputSchema.METER_UNIT:
+          enums.MeterUnit.HUNDREDS_OF_CUBIC_FEET.value.lower(),
+      },
+      {
+          schema.DataInputSchema.PRESENT_READING: 12,
+          schema.DataInputSchema.PREVIOUS_READING: 99990,
+      },
+      {
+          schema.DataInputSchema.PRESENT_READING: 18356,
+          schema.DataInputSchema.PREVIOUS_READING: 18398,
+          schema.DataInputSchema.PRESENT_READING_TYPE:
+          enums.ReadingType.ESTIMATED.value,
+      },
+      {
+          schema.DataInputSchema.PRESENT_READING: 1100,
+          schema.DataInputSchema.PREVIOUS_READING: 1000,
+          schema.DataInputSchema.METER_UNIT: "ft3",
+      },
+  ])
+  conversion = gas_reconciliation.convert_readings_to_kwh(dataf)
+
+  np.testing.assert_allclose(conversion[gas_reconciliation.VOLUME],
+                             [100, 283.168, 22, 42, np.nan])
+  np.testing.assert_allclose(conversion[gas_reconciliation.EXPECTED_KWH],
+                             [get_kwh(x) for x in [100, 283.168, 22, 42]] +
+                             [np.nan])
+  assert conversion[gas_reconciliation.ROLLED_OVER].tolist() == [
+      False, False, True, False, False
+  ]
+  assert conversion[gas_reconciliation.REVERSED].tolist() == [
+      False, False, False, True, False
+  ]
+  assert conversion[gas_reconciliation.ESTIMATED].tolist() == [
+      False, False, False, True, False
+  ]
+
+
+def test_reconcile_gas_invoices():
+  dataf = create_invoice_lines([
+      {
+          schema.DataInputSchema.PRESENT_READING: 1100,
+          schema.DataInputSchema.PREVIOUS_READING: 1000,
+          schema.DataInputSchema.GAS_CONSUMPTION: round(get_kwh(100), 1),
+          schema.DataInputSchema.GAS_CONSUMPTION_CHARGE: round(
+              get_kwh(100) * 0.02, 2),
+      },
+      {
+          schema.DataInputSchema.PRESENT_READING: 1000,
+          schema.DataInputSchema.PREVIOUS_READING: 1100,
+          schema.DataInputSchema.GAS_CONSUMPTION: round(get_kwh(200), 1),
+          schema.DataInputSchema.GAS_CONSUMPTION_CHARGE: round(
+              get_kwh(200) * 0.02, 2),
+      },
+  ])
+  discrepancies = gas_reconciliation.reconcile_gas_invoices(dataf)
+
+  assert discrepancies.index.tolist() == [dataf.index[1]]
+  assert discrepancies[gas_reconciliation.REVERSED].tolist() == [True]
+  np.testing.assert_allclose(discrepancies[gas_reconciliation.KWH_DIFFERENCE],
+                             get_kwh(100),
+                             atol=0.1)
+
+
+def test_gas_discrepancies_need_gas_readings(invoice_paths):
+  importer = tariff_creator.EnergyTariffImporter("electricity only")
+  importer.load_data({
+      enums.EnergyCarrier.ELECTRICITY:
+      invoice_paths[enums.EnergyCarrier.ELECTRICITY]
+  })
+  with pytest.raises(ValueError):
+    importer.get_gas_discrepancies()
+
+  importer.load_data(invoice_paths)
+  with pytest.raises(ValueError):
+    importer.get_gas_discrepancies()
+
+  importer = tariff_creator.EnergyTariffImporter("gas",
+                                                 keep_gas_readings=True)
+  importer.load_data(invoice_paths)
+  # the example readings which advance are all written present before previous
+  conversion = gas_reconciliation.convert_readings_to_kwh(
+      importer.invoice_data_dict[enums.EnergyCarrier.NATURALGAS])
+  is_advance = conversion[gas_reconciliation.VOLUME] > 0
+  assert conversion.loc[is_advance, gas_reconciliation.REVERSED].all()
+  discrepancies = importer.get_gas_discrepancies()
+  assert discrepancies[gas_reconciliation.REVERSED].all()
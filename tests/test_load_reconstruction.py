@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from timeseries.common import enums
+from timeseries.data import schema
+from timeseries.economic import (billing_periods, load_reconstruction,
+                                 time_of_use)
+
+
+def test_duos_band_totals_match_invoices(importer):
+  dataf = importer.invoice_data_dict[enums.EnergyCarrier.ELECTRICITY]
+  profiles = importer.get_load_profiles()
+  starts, ends = billing_periods.get_period_bounds(dataf)
+  columns = [
+      load_reconstruction.BAND_CONSUMPTIONS[x]
+      for x in time_of_use.DUOS_RULES.bands
+  ]
+  # the invoices billing no red/amber/green kWh leave those bands unsplit
+  is_split = dataf[columns].sum(axis=1) > 0
+  assert is_split.any()
+  for row in np.flatnonzero(is_split):
+    start, end = starts[row], ends[row]
+    invoice = dataf.iloc[row]
+    load = profiles[invoice[schema.DataInputSchema.METERCODE]].loc[
+        pd.Timestamp(start):pd.Timestamp(end) - pd.Timedelta("30min")]
+    masks = time_of_use.get_band_masks(load.index, time_of_use.DUOS_RULES)
+    for band, mask in masks.items():
+      np.testing.assert_allclose(
+          load[mask].sum(),
+          invoice[load_reconstruction.BAND_CONSUMPTIONS[band]],
+          rtol=1e-6)
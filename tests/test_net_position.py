@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from timeseries.common import enums
+from timeseries.data import schema
+from timeseries.economic import net_position, tariff_functions
+
+INDEX = pd.date_range("2023-01-01",
+                      "2023-02-01",
+                      freq="30min",
+                      inclusive="left")
+
+
+def create_monthly_dataf(column: str, rate: float) -> pd.DataFrame:
+  return pd.DataFrame({column: [rate]},
+                      index=pd.Index([pd.Timestamp("2023-01-01")],
+                                     name=schema.DataInputSchema.INDEX))
+
+
+def create_site_tariffs() -> net_position.SiteTariffs:
+  import_structure = tariff_functions.create_tariff_structure_from_hh_data(
+      pd.DataFrame({"Energy_Charge": 0.3}, index=INDEX),
+      enums.EnergyCarrier.ELECTRICITY, enums.Destination.IMPORT,
+      enums.TechnologyType.GRID)
+  export_structure = (
+      tariff_functions.create_export_electricity_tariff_structure_from_data(
+          create_monthly_dataf("Export_Charge", 0.05)))
+  onsite_structure = (
+      tariff_functions.create_onsite_electricity_tariff_structure_from_data(
+          pd.DataFrame({"Onsite_Charge": 0.1}, index=INDEX),
+          half_hourly=True))
+  return net_position.SiteTariffs(import_structure, export_structure,
+                                  onsite_structure)
+
+
+def test_export_and_onsite_structures():
+  site_tariffs = create_site_tariffs()
+  export_structure = site_tariffs.export_structure
+  assert export_structure.destination is enums.Destination.EXPORT
+  np.testing.assert_allclose(export_structure.get_total_charges_array(INDEX),
+                             0.05)
+  onsite_structure = site_tariffs.onsite_structure
+  assert onsite_structure.destination is enums.Destination.ONSITE
+  assert onsite_structure.origin is enums.TechnologyType.WINDTURBINE
+  np.testing.assert_allclose(onsite_structure.get_total_charges_array(INDEX),
+                             0.1)
+
+
+def test_net_costs():
+  site_tariffs = {
+      "site": create_site_tariffs(),
+      "import_only": net_position.SiteTariffs(
+          create_site_tariffs().import_structure),
+  }
+  import_flows = pd.DataFrame({"site": 10.0, "import_only": 10.0}, index=INDEX)
+  export_flows = pd.DataFrame({"site": 4.0, "import_only": 0.0}, index=INDEX)
+  onsite_flows = pd.DataFrame({"site": 2.0}, index=INDEX)
+  net_costs = net_position.evaluate_net_costs(site_tariffs, import_flows,
+                                              export_flows, onsite_flows)
+
+  np.testing.assert_allclose(net_costs["site"], 10 * 0.3 - 4 * 0.05 + 2 * 0.1)
+  np.testing.assert_allclose(net_costs["import_only"], 10 * 0.3)
+
+  export_flows["import_only"] = 1.0
+  net_costs = net_position.evaluate_net_costs(site_tariffs, import_flows,
+                                              export_flows)
+  assert net_costs["import_only"].isna().all()
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from timeseries.common import enums
+from timeseries.economic import portfolio, tariff_structure
+
+INDEX = pd.date_range("2023-01-01",
+                      "2023-03-01",
+                      freq="30min",
+                      inclusive="left")
+
+
+def create_january_tariff(rate: float) -> tariff_structure.TariffStructure:
+  january = INDEX[INDEX.month == 1]
+  return tariff_structure.TariffStructure(
+      energy_carrier=enums.EnergyCarrier.ELECTRICITY,
+      destination=enums.Destination.IMPORT,
+      origin=enums.TechnologyType.GRID,
+      list_consumption_charges=[
+          tariff_structure.ConsumptionCharges("Energy_Charge",
+                                              pd.Series(rate, index=january))
+      ],
+  )
+
+
+def test_uncovered_consumption_is_not_free():
+  consumption = pd.Series(1.0, index=INDEX)
+  meters = [
+      (1, create_january_tariff(0.3), consumption),
+      (2, create_january_tariff(0.2), consumption.loc[:"2023-01-31"]),
+  ]
+  costs = portfolio.aggregate_portfolio_costs(meters, INDEX)
+
+  daily_costs = costs.get_meter_totals()
+  np.testing.assert_allclose(daily_costs.loc["2023-01", 1], 48 * 0.3)
+  assert daily_costs.loc["2023-02", 1].isna().all()
+  np.testing.assert_allclose(daily_costs.loc["2023-02", 2], 0)
+
+  monthly_costs = costs.get_meter_totals("MS")
+  np.testing.assert_allclose(monthly_costs.loc["2023-01-01", 1], 31 * 48 * 0.3)
+  assert np.isnan(monthly_costs.loc["2023-02-01", 1])
+  estate_costs = costs.get_estate_totals("MS")
+  np.testing.assert_allclose(estate_costs.loc["2023-01-01"],
+                             31 * 48 * (0.3 + 0.2))
+  assert np.isnan(estate_costs.loc["2023-02-01"])
+  group_costs = costs.get_group_totals(
+      pd.DataFrame({"group": ["a", "a"]}, index=[1, 2]), "group", "MS")
+  assert np.isnan(group_costs.loc["2023-02-01", "a"])
@@ -0,0 +1,68 @@
+import threading
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+import requests
+
+from timeseries.economic import price_service, tariff_creator, window_query
+
+
+@pytest.fixture(scope="module")
+def state(invoice_paths: dict) -> price_service.PriceServiceState:
+  importer = tariff_creator.EnergyTariffImporter("example")
+  importer.load_data(invoice_paths)
+  return price_service.create_service_state(importer)
+
+
+@pytest.fixture
+def service(state: price_service.PriceServiceState):
+  return price_service.PriceService(state)
+
+
+@pytest.fixture
+def client(service: price_service.PriceService):
+  server = price_service.create_server(service)
+  thread = threading.Thread(target=server.serve_forever, daemon=True)
+  thread.start()
+  yield price_service.PriceServiceClient(
+      f"http://127.0.0.1:{server.server_address[1]}")
+  server.shutdown()
+  server.server_close()
+
+
+def get_status(client: price_service.PriceServiceClient, endpoint: str,
+               payload: dict) -> int:
+  with pytest.raises(requests.HTTPError) as error:
+    client.post(endpoint, payload)
+  return error.value.response.status_code
+
+
+def test_error_status(client, service, monkeypatch):
+  meter_id = min(service.state.profiles)
+  assert get_status(client, price_service.PRICE_ENDPOINT,
+                    {"timestamps": []}) == 400
+  assert get_status(client, price_service.PRICE_ENDPOINT, {
+      "meter_id": -1,
+      "timestamps": []
+  }) == 404
+
+  def fail(payload):
+    raise RuntimeError("failure")
+
+  monkeypatch.setattr(service, "get_prices", fail)
+  assert get_status(client, price_service.PRICE_ENDPOINT, {
+      "meter_id": meter_id,
+      "timestamps": []
+  }) == 500
+
+
+def test_cheapest_windows_match_tariff_structure(client, state):
+  meter_id = min(state.profiles)
+  start = pd.Timestamp("2022-11-01")
+  end = pd.Timestamp("2022-11-07")
+  windows = state.structures[meter_id].get_cheapest_windows(
+      timedelta(hours=2), 2, start_date=start, end_date=end)
+  starts = client.get_cheapest_windows(meter_id, 4, 2, start=start, end=end)
+  assert len(starts) == 14
+  assert starts == [x.isoformat() for x in windows[window_query.START]]
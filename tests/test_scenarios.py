@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from timeseries.common import enums
+from timeseries.data import schema
+from timeseries.economic import scenarios, tariff_functions
+
+
+def get_flat_load(dataf: pd.DataFrame) -> pd.Series:
+  index = pd.date_range(dataf.index.min().to_period("M").to_timestamp(),
+                        dataf.index.max().to_period("M").to_timestamp() +
+                        pd.offsets.MonthBegin(),
+                        freq="30min",
+                        inclusive="left")
+  return pd.Series(1.0, index=index)
+
+
+def test_rate_columns_leave_out_end_dates_and_consumptions(importer):
+  meter_id = importer.get_all_meter_ids()[enums.EnergyCarrier.ELECTRICITY][0]
+  dataf = importer.filter_data(meter_id)
+  assert schema.DataInputSchema.END_DATE in dataf.columns
+  assert schema.DataInputSchema.RED_CONSUMPTION in dataf.columns
+  rates = scenarios.get_rate_columns(dataf)
+  assert set(rates.columns) <= set(scenarios.RATE_COLUMNS)
+  assert schema.DataInputSchema.DUOS_RED in rates.columns
+
+
+def test_scenarios_on_importer_data(importer):
+  for meter_ids in importer.get_all_meter_ids().values():
+    dataf = importer.filter_data(meter_ids[0])
+    costs = scenarios.evaluate_rate_scenarios(dataf,
+                                              get_flat_load(dataf),
+                                              nb_scenarios=10,
+                                              seed=0)
+    assert np.isfinite(costs.to_numpy()).all()
+    assert list(costs.columns)[-1] == scenarios.TOTAL_LABEL
+
+
+def test_filled_months_have_no_end_date(importer):
+  meter_id = importer.get_all_meter_ids()[enums.EnergyCarrier.NATURALGAS][0]
+  dataf = importer.filter_data(meter_id)
+  start_month = dataf.index.min().to_period("M").to_timestamp()
+  end_month = start_month + pd.DateOffset(years=4)
+  filled = tariff_functions.fill_missing_months(dataf, start_month, end_month)
+  invoiced = filled.index.isin(dataf.index.to_period("M").to_timestamp())
+  end_dates = filled[schema.DataInputSchema.END_DATE]
+  assert end_dates[~invoiced].isna().all()
+  assert end_dates[invoiced].notna().all()
@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from timeseries.common import enums
+from timeseries.economic import tariff_cache, tariff_structure
+
+INDEX = pd.date_range("2023-01-01",
+                      "2023-02-01",
+                      freq="30min",
+                      inclusive="left")
+
+
+def create_structure(rate: float) -> tariff_structure.TariffStructure:
+  return tariff_structure.TariffStructure(
+      energy_carrier=enums.EnergyCarrier.ELECTRICITY,
+      destination=enums.Destination.IMPORT,
+      origin=enums.TechnologyType.GRID,
+      list_consumption_charges=[
+          tariff_structure.ConsumptionCharges("Energy_Charge",
+                                              pd.Series(rate, index=INDEX))
+      ],
+  )
+
+
+def test_cache_shared_by_threads():
+  cache = tariff_cache.TariffStructureCache(max_entries=4)
+  structure = create_structure(0.3)
+
+  def use_cache(meter_id: int) -> int:
+    nb_hits = 0
+    for _ in range(200):
+      cache.put(meter_id, None, None, structure)
+      nb_hits += cache.get(meter_id, None, None) is not None
+      cache.get_covering(meter_id, INDEX[0], INDEX[-1])
+      cache.invalidate([meter_id])
+    return nb_hits
+
+  with ThreadPoolExecutor(max_workers=8) as executor:
+    nb_hits = sum(executor.map(use_cache, range(8)))
+  info = cache.info()
+  assert info.entries == 0
+  assert info.nbytes == 0
+  assert info.hits == nb_hits
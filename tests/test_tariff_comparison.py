@@ -0,0 +1,66 @@
+import pandas as pd
+
+from timeseries.common import enums
+from timeseries.economic import tariff_comparison, tariff_structure
+
+INDEX = pd.date_range("2022-01-01",
+                      "2023-01-01",
+                      freq="30min",
+                      inclusive="left")
+
+
+def create_flat_tariff(
+    rate: float, index: pd.DatetimeIndex) -> tariff_structure.TariffStructure:
+  return tariff_structure.TariffStructure(
+      energy_carrier=enums.EnergyCarrier.ELECTRICITY,
+      destination=enums.Destination.IMPORT,
+      origin=enums.TechnologyType.GRID,
+      list_consumption_charges=[
+          tariff_structure.ConsumptionCharges("Energy_Charge",
+                                              pd.Series(rate, index=index))
+      ],
+  )
+
+
+def test_partial_tariff_is_not_ranked():
+  tariffs = {
+      "full": create_flat_tariff(0.30, INDEX),
+      "half": create_flat_tariff(0.25, INDEX[:len(INDEX) // 2]),
+      "dearer": create_flat_tariff(0.35, INDEX),
+  }
+  sites = {"site": pd.Series(1.0, index=INDEX)}
+  comparison = tariff_comparison.compare_tariffs(tariffs, sites, INDEX)
+
+  assert comparison.coverage["half"] < 1.0
+  assert comparison.costs.loc["half", "site"] < comparison.costs.loc["full",
+                                                                      "site"]
+  assert comparison.get_best_tariffs()["site"] == "full"
+  ranking = comparison.get_ranking()
+  assert "half" not in ranking.index
+  assert ranking.loc["full", "site"] == 1
+  assert ranking.loc["dearer", "site"] == 2
+
+
+def test_no_covering_tariff():
+  tariffs = {"half": create_flat_tariff(0.25, INDEX[:len(INDEX) // 2])}
+  sites = {"site": pd.Series(1.0, index=INDEX)}
+  comparison = tariff_comparison.compare_tariffs(tariffs, sites, INDEX)
+  assert comparison.get_best_tariffs().isna().all()
+  assert comparison.get_ranking().empty
+
+
+def test_costs_do_not_depend_on_blocks():
+  tariffs = {
+      "full": create_flat_tariff(0.30, INDEX),
+      "half": create_flat_tariff(0.25, INDEX[:len(INDEX) // 2]),
+  }
+  sites = {"site": pd.Series(range(len(INDEX)), index=INDEX, dtype=float)}
+  comparison = tariff_comparison.compare_tariffs(tariffs, sites, INDEX)
+  block_comparison = tariff_comparison.compare_tariffs(tariffs,
+                                                       sites,
+                                                       INDEX,
+                                                       block_periods=1000)
+  pd.testing.assert_frame_equal(block_comparison.costs, comparison.costs)
+  pd.testing.assert_series_equal(block_comparison.coverage,
+                                 comparison.coverage)
+  assert comparison.coverage["half"] == 0.5
@@ -0,0 +1,83 @@
+import pandas as pd
+
+from timeseries.common import enums
+from timeseries.economic import parallel_build, tariff_creator
+
+
+def get_meter_id(importer: tariff_creator.EnergyTariffImporter) -> int:
+  return importer.get_all_meter_ids()[enums.EnergyCarrier.ELECTRICITY][0]
+
+
+def test_sliced_structure_matches_built_structure(importer, invoice_paths):
+  meter_id = get_meter_id(importer)
+  start_date = pd.Timestamp("2023-01-01")
+  end_date = pd.Timestamp("2023-06-01")
+  importer.get_tariff_structure(meter_id)
+  sliced = importer.get_tariff_structure(meter_id, start_date, end_date)
+  assert importer.get_cache_info().slice_hits == 1
+
+  other_importer = tariff_creator.EnergyTariffImporter("other")
+  other_importer.load_data(invoice_paths)
+  built = other_importer.get_tariff_structure(meter_id, start_date, end_date)
+  pd.testing.assert_series_equal(sliced.get_total_charges_series(),
+                                 built.get_total_charges_series())
+
+
+def test_load_data_clears_cache(importer, invoice_paths):
+  importer.get_tariff_structure(get_meter_id(importer))
+  assert importer.get_cache_info().entries == 1
+  importer.load_data(invoice_paths)
+  assert importer.get_cache_info().entries == 0
+
+
+def test_parallel_structures_match_serial_structures(importer, invoice_paths):
+  # a sliced, a built and an unknown meter
+  meter_ids = importer.get_all_meter_ids()[
+      enums.EnergyCarrier.ELECTRICITY][:2] + [-1]
+  start_date = pd.Timestamp("2023-01-01")
+  end_date = pd.Timestamp("2023-06-01")
+  importer.get_tariff_structure(meter_ids[0])
+  serial = importer.get_tariff_structures(meter_ids, start_date, end_date)
+
+  other_importer = tariff_creator.EnergyTariffImporter("other")
+  other_importer.load_data(invoice_paths)
+  other_importer.get_tariff_structure(meter_ids[0])
+  parallel = other_importer.get_tariff_structures(meter_ids,
+                                                  start_date,
+                                                  end_date,
+                                                  nb_workers=2)
+  assert serial.keys() == parallel.keys()
+  assert parallel[-1] is None
+  for meter_id in meter_ids[:2]:
+    pd.testing.assert_series_equal(
+        serial[meter_id].get_total_charges_series(),
+        parallel[meter_id].get_total_charges_series())
+  assert (importer.get_cache_info().slice_hits ==
+          other_importer.get_cache_info().slice_hits == 1)
+
+
+def test_structures_without_invoices_in_window(importer):
+  meter_ids = [
+      x for list_meters in importer.get_all_meter_ids().values()
+      for x in list_meters
+  ]
+  start_date = pd.Timestamp("2030-01-01")
+  end_date = pd.Timestamp("2030-06-01")
+  expected = dict.fromkeys(meter_ids)
+  assert importer.get_tariff_structures(meter_ids, start_date,
+                                        end_date) == expected
+  assert importer.get_tariff_structures(meter_ids,
+                                        start_date,
+                                        end_date,
+                                        nb_workers=2) == expected
+  assert parallel_build.build_structures_in_parallel(
+      tariff_creator.get_structure_builder(enums.EnergyCarrier.ELECTRICITY),
+      [], 2) == []
+
+
+def test_window_without_invoices_is_not_a_slice_hit(importer):
+  meter_id = get_meter_id(importer)
+  importer.get_tariff_structure(meter_id)
+  assert importer.get_tariff_structure(meter_id, pd.Timestamp("2030-01-01"),
+                                       pd.Timestamp("2030-06-01")) is None
+  assert importer.get_cache_info().slice_hits == 0
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from timeseries.common import enums, measurements
+from timeseries.economic import rollups, tariff_structure
+
+
+def get_month_series(month: str, value: float) -> pd.Series:
+  start = pd.Timestamp(month)
+  index = pd.date_range(start,
+                        start + pd.offsets.MonthBegin(1),
+                        freq="30min",
+                        inclusive="left")
+  return pd.Series(np.full(len(index), value), index=index)
+
+
+def get_expected(series: pd.Series, new_series: pd.Series) -> pd.Series:
+  months = series.index.to_period("M")
+  kept = series.loc[~months.isin(new_series.index.to_period("M"))]
+  return pd.concat([kept, new_series]).sort_index()
+
+
+def test_replace_months():
+  series = pd.concat([
+      get_month_series("2023-01-01", 1.0),
+      get_month_series("2023-03-01", 3.0),
+      get_month_series("2023-04-01", 4.0),
+  ])
+  new_series = pd.concat([
+      get_month_series("2023-02-01", 20.0),
+      get_month_series("2023-03-01", 30.0),
+      get_month_series("2023-05-01", 50.0),
+  ])
+  charges = tariff_structure.ConsumptionCharges("charge", series)
+  charges.replace_months(new_series)
+  pd.testing.assert_series_equal(charges.series,
+                                 get_expected(series, new_series),
+                                 check_freq=False)
+  assert (series.loc["2023-03"] == 3.0).all()
+
+
+def test_replace_partial_month():
+  series = get_month_series("2023-01-01", 1.0)
+  new_series = get_month_series("2023-01-01", 2.0).iloc[:48]
+  charges = tariff_structure.ConsumptionCharges("charge", series)
+  charges.replace_months(new_series)
+  pd.testing.assert_series_equal(charges.series,
+                                 get_expected(series, new_series),
+                                 check_freq=False)
+
+
+def test_partial_update_matches_rollups_recompute():
+  series = pd.concat([
+      get_month_series("2023-01-01", 1.0),
+      get_month_series("2023-02-01", 2.0),
+      get_month_series("2023-03-01", 3.0),
+  ])
+  structure = tariff_structure.TariffStructure(
+      energy_carrier=enums.EnergyCarrier.ELECTRICITY,
+      destination=enums.Destination.IMPORT,
+      origin=enums.TechnologyType.GRID,
+      list_consumption_charges=[
+          tariff_structure.ConsumptionCharges("Energy_Charge", series),
+          tariff_structure.ConsumptionCharges("Standing_Charge", series * 2),
+      ],
+  )
+  structure.get_rollups()
+  structure.update_charges(
+      tariff_structure.TariffStructure(
+          energy_carrier=enums.EnergyCarrier.ELECTRICITY,
+          destination=enums.Destination.IMPORT,
+          origin=enums.TechnologyType.GRID,
+          list_consumption_charges=[
+              tariff_structure.ConsumptionCharges(
+                  "Energy_Charge", get_month_series("2023-02-01", 20.0))
+          ],
+      ))
+
+  expected = rollups.create_rollup_pyramid(
+      structure.get_consumption_charges_dataframe())
+  for level, dataf in expected.levels.items():
+    pd.testing.assert_frame_equal(structure.get_rollups().levels[level],
+                                  dataf,
+                                  check_freq=False)
+
+
+def test_replace_months_with_duplicated_timestamps():
+  series = pd.concat([
+      get_month_series("2023-01-01", 1.0),
+      get_month_series("2023-02-01", 2.0),
+  ])
+  series = pd.concat([series, series.loc["2023-01-01"]]).sort_index()
+  new_series = get_month_series("2023-02-01", 20.0)
+  charges = tariff_structure.ConsumptionCharges("charge", series)
+  charges.replace_months(new_series)
+  pd.testing.assert_series_equal(charges.series,
+                                 get_expected(series, new_series),
+                                 check_freq=False)
+
+
+def create_structure(
+    index: pd.DatetimeIndex) -> tariff_structure.TariffStructure:
+  return tariff_structure.TariffStructure(
+      energy_carrier=enums.EnergyCarrier.ELECTRICITY,
+      destination=enums.Destination.IMPORT,
+      origin=enums.TechnologyType.GRID,
+      units=measurements.get_unit("GBP/kWh"),
+      list_consumption_charges=[
+          tariff_structure.ConsumptionCharges(
+              "Energy_Charge", pd.Series(np.linspace(0.1, 0.2, len(index)),
+                                         index=index)),
+          tariff_structure.ConsumptionCharges("CCL",
+                                              pd.Series(0.00775, index=index)),
+      ],
+  )
+
+
+@pytest.mark.parametrize("tz", [None, "Europe/London"])
+def test_save_load(tmp_path, tz):
+  # the tz-aware index crosses the change to summer time
+  index = pd.date_range("2023-03-01",
+                        "2023-04-01",
+                        freq="30min",
+                        tz=tz,
+                        inclusive="left")
+  structure = create_structure(index)
+  structure.save(tmp_path)
+  loaded = tariff_structure.TariffStructure.load(tmp_path)
+
+  assert loaded.energy_carrier is structure.energy_carrier
+  assert loaded.destination is structure.destination
+  assert loaded.origin is structure.origin
+  assert str(loaded.units) == str(structure.units)
+  pd.testing.assert_frame_equal(loaded.get_consumption_charges_dataframe(),
+                                structure.get_consumption_charges_dataframe(),
+                                check_freq=False)
+  for temp_charges in loaded.list_consumption_charges:
+    assert not temp_charges.series.values.flags.writeable
+    with pytest.raises(ValueError):
+      temp_charges.series.values[0] = 1.0
@@ -0,0 +1,120 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+NB_HH = 48
+NB_SLOTS = 54 * 7 * NB_HH  # ISO weeks go up to 53
+KEY = "Key"
+
+
+def get_slot_keys(index: pd.DatetimeIndex) -> np.ndarray:
+  """Return the Week*7*48 + Day_of_week*48 + HH key of each timestamp."""
+  week = index.isocalendar().week.to_numpy(dtype=np.int64)
+  day_of_week = np.asarray(index.dayofweek, dtype=np.int64)
+  hh = np.asarray(index.hour * 2 + index.minute // 30, dtype=np.int64)
+  return week * 7 * NB_HH + day_of_week * NB_HH + hh
+
+
+def merge_moments(
+    counts_a: np.ndarray, means_a: np.ndarray, m2_a: np.ndarray,
+    counts_b: np.ndarray, means_b: np.ndarray, m2_b: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+  """Combine the counts, means and sums of squared deviations of two sets of
+  slots."""
+  counts = counts_a + counts_b
+  with np.errstate(invalid="ignore", divide="ignore"):
+    delta = means_b - means_a
+    means = np.where(counts > 0,
+                     means_a + delta * np.divide(counts_b, counts), 0.0)
+    m2 = m2_a + m2_b + np.where(
+        counts > 0, delta**2 * counts_a * counts_b / counts, 0.0)
+  return counts, means, m2
+
+
+@dataclass
+class AverageWeekAccumulator:
+  """Running mean (and optionally variance) of half-hourly data per week slot.
+  The slots use the same Week*7*48 + Day_of_week*48 + HH key as
+  get_average_week, so the history does not need to be kept in memory to build
+  the lookup tables.
+  Args:
+      columns: list[str]
+        The columns accumulated.
+      track_variance: bool
+        Also accumulate the sum of squared deviations of each slot.
+
+  Methods:
+      update(dataf: pd.DataFrame) -> None:
+          Add a chunk of half-hourly data.
+      merge(other: AverageWeekAccumulator) -> None:
+          Add the slots of an accumulator filled in parallel.
+      get_means() -> pd.DataFrame:
+          Return the mean of each slot.
+      get_variances() -> pd.DataFrame:
+          Return the sample variance of each slot.
+      get_lookup_dict() -> dict[str, pd.DataFrame]:
+          Return the lookup tables in the format of get_average_week.
+  """
+  columns: list[str]
+  track_variance: bool = False
+  counts: np.ndarray = field(init=False, repr=False)
+  means: np.ndarray = field(init=False, repr=False)
+  m2: np.ndarray = field(init=False, repr=False)
+
+  def __post_init__(self):
+    self.columns = list(self.columns)
+    shape = (len(self.columns), NB_SLOTS)
+    self.counts = np.zeros(shape)
+    self.means = np.zeros(shape)
+    self.m2 = np.zeros(shape)
+
+  def update(self, dataf: pd.DataFrame) -> None:
+    keys = get_slot_keys(dataf.index)
+    for row, col in enumerate(self.columns):
+      values = dataf[col].to_numpy(dtype=float)
+      valid = ~np.isnan(values)
+      temp_keys = keys[valid]
+      values = values[valid]
+      counts = np.bincount(temp_keys, minlength=NB_SLOTS).astype(float)
+      sums = np.bincount(temp_keys, weights=values, minlength=NB_SLOTS)
+      with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, 0.0)
+      m2 = np.zeros(NB_SLOTS)
+      if self.track_variance:
+        m2 = np.bincount(temp_keys,
+                         weights=(values - means[temp_keys])**2,
+                         minlength=NB_SLOTS)
+      self.counts[row], self.means[row], self.m2[row] = merge_moments(
+          self.counts[row], self.means[row], self.m2[row], counts, means, m2)
+
+  def merge(self, other: "AverageWeekAccumulator") -> None:
+    if other.columns != self.columns:
+      raise ValueError("Cannot merge accumulators of different columns.")
+    self.counts, self.means, self.m2 = merge_moments(self.counts, self.means,
+                                                     self.m2, other.counts,
+                                                     other.means, other.m2)
+
+  def to_dataframe(self, values: np.ndarray) -> pd.DataFrame:
+    filled_slots = np.flatnonzero(self.counts.sum(axis=0) > 0)
+    dataf = pd.DataFrame(data=values[:, filled_slots].T,
+                         index=pd.Index(filled_slots, name=KEY),
+                         columns=self.columns)
+    return dataf.where(self.counts[:, filled_slots].T > 0)
+
+  def get_means(self) -> pd.DataFrame:
+    return self.to_dataframe(self.means)
+
+  def get_variances(self) -> pd.DataFrame:
+    if not self.track_variance:
+      raise ValueError("The accumulator does not track the variance.")
+    with np.errstate(invalid="ignore", divide="ignore"):
+      variances = np.where(self.counts > 1, self.m2 / (self.counts - 1),
+                           np.nan)
+    return self.to_dataframe(variances)
+
+  def get_lookup_dict(self) -> dict[str, pd.DataFrame]:
+    """Return one dataframe of means indexed by Key per column, as
+    get_average_week."""
+    means = self.get_means()
+    return {col: means[[col]].dropna() for col in self.columns}
@@ -0,0 +1,172 @@
+import csv
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from timeseries.common import enums
+
+HEADER_SEPARATOR = "\x1f"
+
+
+def import_pyarrow():
+  """Return the pyarrow module, only needed by the Arrow backend."""
+  try:
+    import pyarrow  # pylint: disable=import-outside-toplevel
+    import pyarrow.compute  # pylint: disable=import-outside-toplevel
+    import pyarrow.csv  # pylint: disable=import-outside-toplevel
+  except ImportError as error:
+    raise ImportError(
+        "The Arrow backend needs pyarrow, install the arrow extra.") from error
+  return pyarrow
+
+
+def get_column_name(label: str | tuple[str, ...]) -> str:
+  """Return the name of the Arrow column of a (multi-row) header label."""
+  if isinstance(label, str):
+    return label
+  return HEADER_SEPARATOR.join(label)
+
+
+def read_header_rows(file, nb_header_rows: int) -> list[list[str]]:
+  """Read the header rows of an open binary csv file, leaving it at the first
+  data row."""
+  return [
+      next(csv.reader([file.readline().decode("utf-8-sig")]))
+      for _ in range(nb_header_rows)
+  ]
+
+
+@lru_cache(maxsize=None)
+def get_datetime_dtype():
+  """Return the dtype pandas gives to parsed dates."""
+  return pd.to_datetime(pd.Series(["2000-01-01"]), format="%Y-%m-%d").dtype
+
+
+def flatten_records(dataf: pd.DataFrame, nested_column: str) -> pd.DataFrame:
+  """Replace the "nested_column.key" columns of a flattened frame by their
+  keys."""
+  prefix = f"{nested_column}."
+  return dataf.rename(columns={
+      col: col[len(prefix):]
+      for col in dataf.columns if col.startswith(prefix)
+  })
+
+
+def parse_dates(values,
+                formats: tuple[str, ...],
+                offset: timedelta | None = None):
+  """Return the timestamps of an Arrow array of dates or text, shifted by
+  offset, the text being parsed with the first of formats matching all the
+  values."""
+  pyarrow = import_pyarrow()
+  if pyarrow.types.is_temporal(values.type):
+    dates = values.cast(pyarrow.timestamp("s"))
+  else:
+    for date_format in formats:
+      try:
+        dates = pyarrow.compute.strptime(values, format=date_format, unit="s")
+        break
+      except pyarrow.ArrowInvalid:
+        if date_format == formats[-1]:
+          raise
+  if offset is not None:
+    dates = pyarrow.compute.add(
+        dates, pyarrow.scalar(offset, type=pyarrow.duration("s")))
+  return dates
+
+
+def select_columns(table, labels: list[str | tuple[str, ...]],
+                   names: list[str]):
+  """Return the columns of an Arrow table read from csv, renamed to names."""
+  table = table.select([get_column_name(label) for label in labels])
+  return table.rename_columns(names)
+
+
+@dataclass(frozen=True)
+class PandasBackend:
+  """Read the input data into pandas frames.
+
+  Methods:
+      read_csv(path: Path, nb_header_rows: int = 1) -> pd.DataFrame:
+          Read a csv file with one or more header rows.
+      from_records(records: list[dict], nested_column: str,
+                   columns: list[str]) -> pd.DataFrame:
+          Build a frame of the columns of records, the keys of a nested
+          column being columns.
+  """
+
+  def read_csv(self, path: Path, nb_header_rows: int = 1) -> pd.DataFrame:
+    if nb_header_rows == 1:
+      return pd.read_csv(path)
+    return pd.read_csv(path,
+                       header=list(range(nb_header_rows)),
+                       index_col=None)
+
+  def from_records(self, records: list[dict], nested_column: str,
+                   columns: list[str]) -> pd.DataFrame:
+    dataf = flatten_records(pd.json_normalize(records), nested_column)
+    return dataf.reindex(columns=columns)
+
+
+@dataclass(frozen=True)
+class ArrowBackend:
+  """Read the input data into Arrow tables with the multi-threaded Arrow
+  readers. The tables are normalised in Arrow and converted by to_pandas.
+
+  Methods:
+      read_csv(path: Path, nb_header_rows: int = 1) -> pyarrow.Table:
+          Read a csv file with one or more header rows, the labels of several
+          rows being joined by HEADER_SEPARATOR.
+      from_records(records: list[dict], nested_column: str,
+                   columns: list[str]) -> pd.DataFrame:
+          Build a frame of the columns of records, the keys of a nested
+          column being columns.
+      to_pandas(table: pyarrow.Table,
+                index_column: str | None = None) -> pd.DataFrame:
+          Return the frame of a table with the dtypes pandas would give.
+  """
+
+  def read_csv(self, path: Path, nb_header_rows: int = 1):
+    pyarrow = import_pyarrow()
+    with open(path, "rb") as file:
+      header_rows = read_header_rows(file, nb_header_rows)
+      read_options = pyarrow.csv.ReadOptions(
+          column_names=[get_column_name(x) for x in zip(*header_rows)],
+          use_threads=True)
+      return pyarrow.csv.read_csv(file, read_options=read_options)
+
+  def from_records(self, records: list[dict], nested_column: str,
+                   columns: list[str]) -> pd.DataFrame:
+    pyarrow = import_pyarrow()
+    table = pyarrow.Table.from_pylist(records).flatten()
+    prefix = f"{nested_column}."
+    table = table.rename_columns([
+        name[len(prefix):] if name.startswith(prefix) else name
+        for name in table.column_names
+    ])
+    table = table.select([col for col in columns if col in table.column_names])
+    return self.to_pandas(table).reindex(columns=columns)
+
+  def to_pandas(self, table, index_column: str | None = None) -> pd.DataFrame:
+    dataf = table.to_pandas()
+    for position, dtype in enumerate(dataf.dtypes):
+      if dtype.kind == "M":
+        dataf.isetitem(position,
+                       dataf.iloc[:, position].astype(get_datetime_dtype()))
+    if index_column is not None:
+      dataf = dataf.set_index(index_column)
+    return dataf
+
+
+BACKENDS = {
+    enums.DataFrameBackend.PANDAS: PandasBackend(),
+    enums.DataFrameBackend.ARROW: ArrowBackend(),
+}
+
+
+def get_backend(
+    backend: enums.DataFrameBackend) -> PandasBackend | ArrowBackend:
+  return BACKENDS[backend]
@@ -77,6 +77,28 @@ class TechnologyType(Enum):
   SITE = "Site"
 
 
+class DataFrameBackend(Enum):
+  """Engines used to read and normalise the input data."""
+
+  PANDAS = "pandas"
+  ARROW = "pyarrow"
+
+
+class MeterUnit(Enum):
+  """Units of the gas meter registers found on invoices."""
+
+  CUBIC_METRES = "M3"
+  HUNDREDS_OF_CUBIC_FEET = "HCUF"
+
+
+class ReadingType(Enum):
+  """Types of the meter readings found on invoices."""
+
+  ACTUAL = "A"
+  ESTIMATED = "E"
+  CUSTOMER = "C"
+
+
 class DispatchStrategy(Enum):
   ELECTRICITYLED = auto()
   THERMALLED = auto()
@@ -102,3 +124,5 @@ class Charts(Enum):
   HH_LABEL = "half-hourly"
   DAILY_LABEL = "daily"
   WEEKLY_LABEL = "weekly"
+  MONTHLY_LABEL = "monthly"
+  YEARLY_LABEL = "yearly"
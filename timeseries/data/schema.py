@@ -45,6 +45,7 @@ class TariffSchema:
 class DataInputSchema:
   """Input schema used to create tariff structure object"""
   INDEX = "Date"
+  END_DATE = 'End_Date'
   METERCODE = 'MPAN/MPR'
   CCL = 'CCL'
   DAY_CHARGE = 'DAY_CHARGE'
@@ -55,6 +56,21 @@ class DataInputSchema:
   GAS = 'GAS_CHARGE'
   ENERGY_CHARGE = 'Energy_Charge'
   DUOS = 'DUOS'
+  RED_CONSUMPTION = 'RED_KWH'
+  AMBER_CONSUMPTION = 'AMBER_KWH'
+  GREEN_CONSUMPTION = 'GREEN_KWH'
+  DAY_CONSUMPTION = 'DAY_KWH'
+  NIGHT_CONSUMPTION = 'NIGHT_KWH'
+  PEAK_DEMAND = 'PEAK_KW'
+  GAS_CONSUMPTION = 'GAS_KWH'
+  GAS_CONSUMPTION_CHARGE = 'GAS_CONSUMPTION_CHARGE'
+  METER_UNIT = 'METER_UNIT'
+  CORRECTION_FACTOR = 'CORRECTION_FACTOR'
+  CALORIFIC_VALUE = 'CALORIFIC_VALUE'
+  PRESENT_READING = 'PRESENT_READING'
+  PRESENT_READING_TYPE = 'PRESENT_READING_TYPE'
+  PREVIOUS_READING = 'PREVIOUS_READING'
+  PREVIOUS_READING_TYPE = 'PREVIOUS_READING_TYPE'
 
 
 class EDFImportSchema:
@@ -62,6 +78,7 @@ class EDFImportSchema:
   DETAILED = 'DetailedEnergy'
   NON_DETAILED = 'DetailedNonEnergy'
 
+  MPAN = 'MPAN'
   BILL_PERIOD = 'Bill Period Start Date'
   BILL_PERIOD_2 = 'Bill Period\nStart Date'
   CONSUMP_KWH = 'Consumption\nkWh'
@@ -100,12 +117,30 @@ class ImportElecSchema:
   GREEN = f'Green - {CHARGE}'
   DAY = f'Day - {CHARGE}'
   NIGHT = f'Night - {CHARGE}'
+  CONSUMPTION = 'Consumption (kWh)'
+  RED_CONSUMPTION = f'Red - {CONSUMPTION}'
+  AMBER_CONSUMPTION = f'Amber - {CONSUMPTION}'
+  GREEN_CONSUMPTION = f'Green - {CONSUMPTION}'
+  DAY_CONSUMPTION = f'Day - {CONSUMPTION}'
+  NIGHT_CONSUMPTION = f'Night - {CONSUMPTION}'
+  NETWORK = 'Network Usage'
+  PEAK = 'Consumption (kW)'
   CARBON = 'Carbon Tax'
   ACCOUNT = 'Account ID'
 
 
 class ImportGasSchema:
   START_DATE = 'period_from'
+  END_DATE = 'period_to'
   ID = 'mpr'
   CARBON = 'ccl_rate_per_kWh'
   GAS_RATE = 'charge_rate_per_kWh'
+  CONSUMPTION = 'consumption_kWh'
+  CONSUMPTION_CHARGE = 'consumption_charge'
+  UNIT = 'meter_unit'
+  CORRECTION_FACTOR = 'cf'
+  CALORIFIC_VALUE = 'calorific_value'
+  PRESENT_READING = 'meter_present_reading'
+  PRESENT_READING_TYPE = 'meter_present_type'
+  PREVIOUS_READING = 'meter_previous_reading'
+  PREVIOUS_READING_TYPE = 'meter_previous_type'
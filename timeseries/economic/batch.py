@@ -0,0 +1,190 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from timeseries.common import enums
+from timeseries.data import schema
+from timeseries.economic import tariff_creator, tariff_functions
+
+SUCCESS_FILENAME = "_SUCCESS"
+FILL_NONE = "none"
+FILL_LAST = "last"
+FILL_DEFAULT = "default"
+
+
+@dataclass
+class MeterTask:
+  """Everything a worker needs to build and write the profiles of a meter."""
+  meter_id: int
+  energy_carrier: enums.EnergyCarrier
+  dataf: pd.DataFrame
+  output_path: Path
+  start_month: datetime | None = None
+  end_month: datetime | None = None
+  fill: str = FILL_NONE
+  dtype: str = "float64"
+
+
+def detect_energy_carrier(temp_path: Path) -> enums.EnergyCarrier:
+  """Return the energy carrier of an invoice file from its header."""
+  with open(temp_path, encoding="utf-8") as file:
+    header = file.readline()
+  if schema.ImportElecSchema.INFO in header:
+    return enums.EnergyCarrier.ELECTRICITY
+  if schema.ImportGasSchema.ID in header.split(","):
+    return enums.EnergyCarrier.NATURALGAS
+  return enums.EnergyCarrier.NONE
+
+
+def load_invoice_directory(
+    input_path: Path,
+    backend: enums.DataFrameBackend = enums.DataFrameBackend.PANDAS
+) -> tariff_creator.EnergyTariffImporter:
+  """Load every electricity and gas invoice file of a directory."""
+  importer = tariff_creator.EnergyTariffImporter(input_path.name,
+                                                 backend=backend)
+  for temp_path in sorted(input_path.glob("*.csv")):
+    energy_carrier = detect_energy_carrier(temp_path)
+    if energy_carrier is enums.EnergyCarrier.NONE:
+      print(f"Skipping {temp_path.name}: unknown invoice format.")
+      continue
+    importer.add_invoice_data(
+        energy_carrier, importer.read_invoice_data(energy_carrier, temp_path))
+  return importer
+
+
+def get_meter_path(output_path: Path, meter_id: int) -> Path:
+  return output_path / f"meter={meter_id}"
+
+
+def get_default_data(energy_carrier: enums.EnergyCarrier,
+                     start_month: datetime,
+                     end_month: datetime) -> pd.DataFrame:
+  if energy_carrier is enums.EnergyCarrier.ELECTRICITY:
+    return tariff_functions.create_default_import_electricity_data(
+        start_month, end_month)
+  return tariff_functions.create_default_import_gas_data(
+      start_month, end_month)
+
+
+def prepare_meter_data(task: MeterTask) -> pd.DataFrame:
+  """Return the monthly data of the meter over the horizon, filled as
+  requested."""
+  dataf = task.dataf.sort_index()
+  months = dataf.index.to_period("M").to_timestamp()
+  start_month = months[0] if task.start_month is None else task.start_month
+  end_month = months[-1] if task.end_month is None else task.end_month
+  if task.fill == FILL_NONE:
+    return dataf.loc[(months >= start_month) & (months <= end_month)]
+  default_dataf = None
+  if task.fill == FILL_DEFAULT:
+    default_dataf = get_default_data(task.energy_carrier, start_month,
+                                     end_month)
+  return tariff_functions.fill_missing_months(dataf, start_month, end_month,
+                                              default_dataf)
+
+
+def build_meter_profiles(task: MeterTask) -> int:
+  """Build the tariff structure of a meter and write one profile per year."""
+  dataf = prepare_meter_data(task)
+  structure = tariff_creator.create_tariff_structure(task.energy_carrier,
+                                                     dataf)
+  meter_path = get_meter_path(task.output_path, task.meter_id)
+  charges = structure.get_consumption_charges_dataframe()
+  for year in sorted(charges.index.year.unique()):
+    year_structure = structure.get_slice(datetime(year, 1, 1),
+                                         datetime(year, 12, 31, 23, 59))
+    year_structure.save(meter_path / f"year={year}", dtype=task.dtype)
+  (meter_path / SUCCESS_FILENAME).touch()
+  return task.meter_id
+
+
+def create_meter_tasks(importer: tariff_creator.EnergyTariffImporter,
+                       output_path: Path, **options) -> list[MeterTask]:
+  """Return the tasks of the meters which profiles have not been written
+  yet."""
+  tasks = []
+  for energy_carrier, list_meters in importer.get_all_meter_ids().items():
+    dataf = importer.invoice_data_dict[energy_carrier]
+    for meter_id in list_meters:
+      meter_id = int(meter_id)
+      if (get_meter_path(output_path, meter_id) / SUCCESS_FILENAME).exists():
+        continue
+      meter_dataf = dataf.loc[dataf[schema.DataInputSchema.METERCODE] ==
+                              meter_id]
+      tasks.append(
+          MeterTask(meter_id, energy_carrier, meter_dataf, output_path,
+                    **options))
+  return tasks
+
+
+def run_batch(input_path: Path,
+              output_path: Path,
+              nb_workers: int = 1,
+              backend: enums.DataFrameBackend = enums.DataFrameBackend.PANDAS,
+              **options) -> list[int]:
+  """Write the half-hourly profiles of every meter of the invoices of
+  input_path."""
+  importer = load_invoice_directory(input_path, backend)
+  tasks = create_meter_tasks(importer, output_path, **options)
+  print(f"{len(tasks)} meters to process.")
+  done = []
+  if nb_workers > 1:
+    with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+      futures = [executor.submit(build_meter_profiles, task) for task in tasks]
+      for future in as_completed(futures):
+        done.append(future.result())
+        print(f"[{len(done)}/{len(tasks)}] meter {done[-1]} done.")
+  else:
+    for task in tasks:
+      done.append(build_meter_profiles(task))
+      print(f"[{len(done)}/{len(tasks)}] meter {done[-1]} done.")
+  return done
+
+
+def parse_month(value: str) -> datetime:
+  return datetime.strptime(value, "%Y-%m")
+
+
+def main(argv: list[str] | None = None):
+  parser = argparse.ArgumentParser(
+      prog="price-profile",
+      description="Generate half-hourly price profiles from invoice files.")
+  parser.add_argument("input_path",
+                      type=Path,
+                      help="Directory of electricity and gas invoices.")
+  parser.add_argument("output_path",
+                      type=Path,
+                      help="Directory of the meter=<id>/year=<year> profiles.")
+  parser.add_argument("--start", type=parse_month, help="First month YYYY-MM.")
+  parser.add_argument("--end", type=parse_month, help="Last month YYYY-MM.")
+  parser.add_argument(
+      "--fill",
+      choices=[FILL_NONE, FILL_LAST, FILL_DEFAULT],
+      default=FILL_NONE,
+      help="How to fill the months of the horizon without invoice.")
+  parser.add_argument("--precision",
+                      choices=["float32", "float64"],
+                      default="float64")
+  parser.add_argument("--workers", type=int, default=1)
+  parser.add_argument("--backend",
+                      choices=[x.value for x in enums.DataFrameBackend],
+                      default=enums.DataFrameBackend.PANDAS.value,
+                      help="Engine reading the invoice files.")
+  args = parser.parse_args(argv)
+  run_batch(args.input_path,
+            args.output_path,
+            nb_workers=args.workers,
+            backend=enums.DataFrameBackend(args.backend),
+            start_month=args.start,
+            end_month=args.end,
+            fill=args.fill,
+            dtype=args.precision)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,248 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+NB_HH = 48
+HOURS_PER_HH = 0.5
+GRAMS_PER_TONNE = 10**6
+DEFAULT_NB_LEVELS = 20
+
+
+@dataclass(frozen=True)
+class BatteryParameters:
+  """Battery used for price arbitrage behind the meter.
+  Args:
+      capacity: float
+        The usable capacity in kWh.
+      power: float
+        The maximum charge and discharge power in kW.
+      efficiency: float
+        The round-trip efficiency, split evenly between charge and discharge.
+      max_cycles: float | None
+        The maximum number of full cycles over the horizon, unlimited if None.
+  """
+  capacity: float
+  power: float
+  efficiency: float = 0.9
+  max_cycles: float | None = None
+
+  @property
+  def name(self) -> str:
+    return f"{self.capacity:g}kWh/{self.power:g}kW"
+
+
+@dataclass
+class DispatchResult:
+  """Schedules of a set of batteries over the same half-hourly prices.
+  Args:
+      batteries: list[BatteryParameters]
+        The batteries, in the order of the rows of the arrays.
+      index: pd.DatetimeIndex
+        The half-hours of the schedules.
+      grid_energy: np.ndarray
+        The (batteries x periods) kWh drawn from the grid to charge (positive)
+        or delivered to the site when discharging (negative).
+      state_of_charge: np.ndarray
+        The (batteries x periods) kWh stored at the end of each period.
+      costs: np.ndarray
+        The (batteries x periods) cost in GBP of the grid energy, negative when
+        saving.
+
+  Methods:
+      get_schedule(position: int = 0) -> pd.DataFrame:
+          Return the grid energy and state of charge of one battery.
+      get_summary() -> pd.DataFrame:
+          Return the savings and cycles of each battery.
+  """
+  batteries: list[BatteryParameters]
+  index: pd.DatetimeIndex
+  grid_energy: np.ndarray
+  state_of_charge: np.ndarray
+  costs: np.ndarray
+
+  def get_schedule(self, position: int = 0) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Grid_energy": self.grid_energy[position],
+            "State_of_charge": self.state_of_charge[position],
+            "Cost": self.costs[position],
+        },
+        index=self.index)
+
+  def get_summary(self) -> pd.DataFrame:
+    capacities = np.array([x.capacity for x in self.batteries])
+    discharged = np.clip(-np.diff(self.state_of_charge, axis=1, prepend=0),
+                         0, None).sum(axis=1)
+    return pd.DataFrame(
+        {
+            "Savings": -np.nansum(self.costs, axis=1),
+            "Cycles": discharged / capacities,
+        },
+        index=[x.name for x in self.batteries])
+
+
+def get_daily_prices(prices: np.ndarray) -> np.ndarray:
+  """Return the (days x half-hours) prices, the last day padded with NaN."""
+  nb_days = -(-len(prices) // NB_HH)
+  daily_prices = np.full(nb_days * NB_HH, np.nan)
+  daily_prices[:len(prices)] = prices
+  return daily_prices.reshape(nb_days, NB_HH)
+
+
+def get_nb_levels(battery: BatteryParameters, nb_levels: int) -> int:
+  """Return the number of state of charge steps of a battery, at least
+  nb_levels and enough for one step to be charged within the power in a
+  half-hour."""
+  min_levels = np.ceil(battery.capacity /
+                       (battery.power * HOURS_PER_HH *
+                        np.sqrt(battery.efficiency)) - 1e-9)
+  return int(max(nb_levels, min_levels))
+
+
+def get_move_energy(batteries: list[BatteryParameters],
+                    nb_levels: int) -> tuple[np.ndarray, np.ndarray]:
+  """Return the state of charge levels that can be moved, from -max to +max,
+  and the (batteries x moves) kWh drawn from the grid by each move, NaN where
+  the grid energy is above the power."""
+  level_energy = np.array([x.capacity / nb_levels for x in batteries])
+  one_way = np.sqrt([x.efficiency for x in batteries])
+  max_energy = np.array([x.power * HOURS_PER_HH for x in batteries])
+  # discharging draws the most stored energy for a given grid energy
+  max_moves = np.floor(max_energy / (one_way * level_energy) + 1e-9)
+  max_move = int(min(max_moves.max(), nb_levels))
+  moves = np.arange(-max_move, max_move + 1)
+  stored = moves[None, :] * level_energy[:, None]
+  grid_energy = np.where(stored > 0, stored / one_way[:, None],
+                         stored * one_way[:, None])
+  is_allowed = np.abs(grid_energy) <= max_energy[:, None] * (1 + 1e-9)
+  return moves, np.where(is_allowed, grid_energy, np.nan)
+
+
+def solve_daily_moves(daily_prices: np.ndarray, moves: np.ndarray,
+                      move_energy: np.ndarray, nb_levels: int) -> np.ndarray:
+  """Return the (days x batteries x half-hours) optimal level moves of each
+  day, the batteries starting and ending the days empty.
+  The backward induction runs over the 48 half-hours of a day for all days,
+  batteries and levels at once, the half-hours without price are idle."""
+  nb_days = len(daily_prices)
+  nb_batteries = len(move_energy)
+  nb_states = nb_levels + 1
+  max_move = int(moves.max())
+  is_idle = moves == 0
+  # values of the next half-hour, padded so that every move reads a state
+  values = np.full((nb_days, nb_batteries, nb_states + 2 * max_move), np.inf)
+  values[:, :, max_move] = 0.0
+  policy = np.empty((NB_HH, nb_days, nb_batteries, nb_states), dtype=np.int16)
+  for hh in reversed(range(NB_HH)):
+    prices = daily_prices[:, hh]
+    costs = prices[:, None, None] * move_energy[None, :, :]
+    costs = np.where(np.isnan(prices)[:, None, None] & is_idle, 0.0, costs)
+    costs = np.nan_to_num(costs, nan=np.inf)
+    candidates = (sliding_window_view(values, len(moves), axis=2) +
+                  costs[:, :, None, :])
+    best = np.argmin(candidates, axis=3)
+    best_values = np.take_along_axis(candidates, best[..., None], axis=3)[...,
+                                                                          0]
+    # stay idle rather than cycling for nothing on ties, up to rounding
+    best = np.where(candidates[..., max_move] <= best_values + 1e-9, max_move,
+                    best)
+    policy[hh] = moves[best]
+    values[:, :, max_move:max_move + nb_states] = best_values
+
+  daily_moves = np.empty((nb_days, nb_batteries, NB_HH), dtype=np.int64)
+  levels = np.zeros((nb_days, nb_batteries, 1), dtype=np.int64)
+  for hh in range(NB_HH):
+    daily_moves[:, :, hh] = np.take_along_axis(policy[hh], levels, axis=2)[...,
+                                                                           0]
+    levels[..., 0] += daily_moves[:, :, hh]
+  return daily_moves
+
+
+def limit_cycles(daily_moves: np.ndarray, daily_savings: np.ndarray,
+                 batteries: list[BatteryParameters],
+                 nb_levels: np.ndarray) -> np.ndarray:
+  """Return the moves with only the most profitable days per cycle kept for the
+  batteries whose cycles would exceed their max_cycles, the other days are
+  idle. nb_levels is the number of state of charge steps of each battery."""
+  daily_cycles = (np.clip(-daily_moves, 0, None).sum(axis=2) /
+                  nb_levels[None, :])
+  for position, battery in enumerate(batteries):
+    if battery.max_cycles is None:
+      continue
+    cycles = daily_cycles[:, position]
+    with np.errstate(invalid="ignore", divide="ignore"):
+      savings_per_cycle = np.where(cycles > 0,
+                                   daily_savings[:, position] / cycles, 0.0)
+    order = np.argsort(-savings_per_cycle, kind="stable")
+    kept = np.cumsum(cycles[order]) <= battery.max_cycles + 1e-9
+    dropped_days = order[~kept]
+    daily_moves[dropped_days, position] = 0
+  return daily_moves
+
+
+def dispatch_batteries(prices: pd.Series,
+                       batteries: list[BatteryParameters],
+                       carbon: pd.Series | None = None,
+                       carbon_price: float = 0.0,
+                       nb_levels: int = DEFAULT_NB_LEVELS) -> DispatchResult:
+  """Return the cost-optimal arbitrage schedule of each battery against
+  half-hourly prices (GBP/kWh, e.g. TariffStructure.get_total_charges_series)
+  starting at midnight. The state of charge is discretised in nb_levels steps
+  of the capacity, more for the batteries which cannot charge one step in a
+  half-hour, and every day is solved exactly by dynamic programming from and
+  to an empty battery, all days and battery shapes (C-rate and efficiency) of
+  the same number of steps at once. The power limits the grid energy. The days
+  beyond max_cycles are dropped, the least profitable per cycle first. With
+  carbon (gCO2/kWh) the dispatch prices the emissions at carbon_price
+  (GBP/tCO2), the costs returned are the costs at the prices only."""
+  values = prices.to_numpy(dtype=float)
+  dispatch_prices = values
+  if carbon is not None:
+    dispatch_prices = values + carbon.reindex(prices.index).to_numpy(
+        dtype=float) * carbon_price / GRAMS_PER_TONNE
+  # the costs of batteries of the same C-rate and efficiency are proportional
+  # to their capacity, so their moves in levels are the same and are solved
+  # once
+  shapes = [
+      BatteryParameters(1.0, x.power / x.capacity, x.efficiency)
+      for x in batteries
+  ]
+  unique_shapes = list(dict.fromkeys(shapes))
+  shape_levels = [get_nb_levels(x, nb_levels) for x in unique_shapes]
+  daily_prices = get_daily_prices(dispatch_prices)
+  shape_moves = [None] * len(unique_shapes)
+  for levels in sorted(set(shape_levels)):
+    positions = [i for i, x in enumerate(shape_levels) if x == levels]
+    moves, move_energy = get_move_energy(
+        [unique_shapes[i] for i in positions], levels)
+    group_moves = solve_daily_moves(daily_prices, moves, move_energy, levels)
+    for group_position, position in enumerate(positions):
+      shape_moves[position] = group_moves[:, group_position, :]
+  shape_positions = [unique_shapes.index(x) for x in shapes]
+  daily_moves = np.stack([shape_moves[x] for x in shape_positions], axis=1)
+  battery_levels = np.array([shape_levels[x] for x in shape_positions])
+
+  level_energy = np.array([x.capacity for x in batteries]) / battery_levels
+  one_way = np.sqrt([x.efficiency for x in batteries])
+  if any(x.max_cycles is not None for x in batteries):
+    stored = daily_moves * level_energy[None, :, None]
+    grid_energy = np.where(stored > 0, stored / one_way[None, :, None],
+                           stored * one_way[None, :, None])
+    daily_savings = -np.nansum(grid_energy * daily_prices[:, None, :], axis=2)
+    daily_moves = limit_cycles(daily_moves, daily_savings, batteries,
+                               battery_levels)
+
+  moves_by_battery = daily_moves.transpose(1, 0, 2).reshape(
+      len(batteries), -1)[:, :len(values)]
+  stored = moves_by_battery * level_energy[:, None]
+  grid_energy = np.where(stored > 0, stored / one_way[:, None],
+                         stored * one_way[:, None])
+  return DispatchResult(
+      batteries=list(batteries),
+      index=prices.index,
+      grid_energy=grid_energy,
+      state_of_charge=np.cumsum(stored, axis=1),
+      costs=np.where(grid_energy == 0, 0.0, grid_energy * values[None, :]),
+  )
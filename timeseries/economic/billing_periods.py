@@ -0,0 +1,170 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from timeseries.data import schema
+from timeseries.economic import time_of_use
+
+GAP = "Gap"
+OVERLAP = "Overlap"
+START = "Start"
+END = "End"
+NO_PERIOD = -1
+
+
+def get_period_bounds(dataf: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+  """Return the start (inclusive) and end (exclusive) in ns of the billing
+  period of each invoice. Invoices without end date are assumed to cover the
+  calendar month of their date."""
+  index = pd.DatetimeIndex(dataf.index)
+  starts = index.normalize().as_unit("ns").asi8
+  ends = (index.to_period("M") + 1).to_timestamp().as_unit("ns").asi8
+  if schema.DataInputSchema.END_DATE in dataf.columns:
+    end_dates = pd.DatetimeIndex(
+        pd.to_datetime(dataf[schema.DataInputSchema.END_DATE]))
+    end_dates = (end_dates.normalize() + pd.Timedelta(days=1)).as_unit("ns")
+    ends = np.where(end_dates.isna(), ends, end_dates.asi8)
+  return starts, ends
+
+
+@dataclass
+class BillingPeriods:
+  """Interval index of the billing periods of the invoices of a meter.
+  Args:
+      starts: np.ndarray
+        The start (inclusive, ns) of each period, sorted.
+      ends: np.ndarray
+        The end (exclusive, ns) of each period.
+      rows: np.ndarray
+        The position of the invoice of each period in the invoice dataframe.
+
+  Methods:
+      get_positions(index: pd.DatetimeIndex) -> np.ndarray:
+          Return the position of the invoice covering each timestamp, -1 if
+          none.
+      get_flags(index: pd.DatetimeIndex) -> pd.DataFrame:
+          Return whether each timestamp is in a gap or covered by several
+          invoices.
+      get_gaps() -> pd.DataFrame:
+          Return the periods not covered by any invoice.
+      get_overlaps() -> pd.DataFrame:
+          Return the periods covered by more than one invoice.
+  """
+  starts: np.ndarray
+  ends: np.ndarray
+  rows: np.ndarray
+  running_ends: np.ndarray = field(init=False, repr=False)
+  sorted_ends: np.ndarray = field(init=False, repr=False)
+  breaks: np.ndarray = field(init=False, repr=False)
+  owners: np.ndarray = field(init=False, repr=False)
+
+  def __post_init__(self):
+    if np.any(self.ends <= self.starts):
+      raise ValueError("A billing period ends before it starts.")
+    self.running_ends = np.maximum.accumulate(self.ends)
+    self.sorted_ends = np.sort(self.ends)
+    # the period starting last among those covering each segment between
+    # two consecutive bounds, painted from the last started period backwards,
+    # with a NO_PERIOD segment for the timestamps outside the bounds
+    self.breaks = np.unique(np.concatenate([self.starts, self.ends]))
+    self.owners = np.full(max(len(self.breaks), 1), NO_PERIOD)
+    first_segments = np.searchsorted(self.breaks, self.starts)
+    last_segments = np.searchsorted(self.breaks, self.ends)
+    for period in range(len(self.starts) - 1, -1, -1):
+      segments = self.owners[first_segments[period]:last_segments[period]]
+      segments[segments == NO_PERIOD] = period
+
+  @classmethod
+  def from_dataframe(cls, dataf: pd.DataFrame) -> "BillingPeriods":
+    """Create the billing periods of normalised invoices indexed by start
+    date."""
+    starts, ends = get_period_bounds(dataf)
+    rows = np.argsort(starts, kind="stable")
+    return cls(starts[rows], ends[rows], rows)
+
+  def get_positions(self, index: pd.DatetimeIndex) -> np.ndarray:
+    """Return the position of the invoice covering each timestamp, -1 in the
+    gaps. Where invoices overlap, the one starting last among those covering
+    the timestamp is used."""
+    times = index.as_unit("ns").asi8
+    segments = np.searchsorted(self.breaks, times, side="right") - 1
+    return np.append(self.rows, NO_PERIOD)[self.owners[segments]]
+
+  def get_coverage_counts(self, index: pd.DatetimeIndex) -> np.ndarray:
+    """Return the number of invoices covering each timestamp."""
+    times = index.as_unit("ns").asi8
+    return (np.searchsorted(self.starts, times, side="right") -
+            np.searchsorted(self.sorted_ends, times, side="right"))
+
+  def get_flags(self, index: pd.DatetimeIndex) -> pd.DataFrame:
+    counts = self.get_coverage_counts(index)
+    return pd.DataFrame({GAP: counts == 0, OVERLAP: counts > 1}, index=index)
+
+  def to_dataframe(self, starts: np.ndarray, ends: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame({
+        START: pd.DatetimeIndex(starts.astype("M8[ns]")),
+        END: pd.DatetimeIndex(ends.astype("M8[ns]")),
+    })
+
+  def get_gaps(self) -> pd.DataFrame:
+    """Return the [Start, End) periods between the first and last invoices
+    without invoice."""
+    is_gap = self.starts[1:] > self.running_ends[:-1]
+    return self.to_dataframe(self.running_ends[:-1][is_gap],
+                             self.starts[1:][is_gap])
+
+  def get_overlaps(self) -> pd.DataFrame:
+    """Return the [Start, End) periods where an invoice starts before the
+    previous ones end."""
+    is_overlap = self.starts[1:] < self.running_ends[:-1]
+    return self.to_dataframe(
+        self.starts[1:][is_overlap],
+        np.minimum(self.running_ends[:-1], self.ends[1:])[is_overlap])
+
+  def get_index(self, freq: str = "30min") -> pd.DatetimeIndex:
+    """Return the regular index from the first start to the last end."""
+    if len(self.starts) == 0:
+      return pd.DatetimeIndex([], dtype="M8[ns]")
+    return pd.date_range(pd.Timestamp(self.starts[0]),
+                         pd.Timestamp(self.running_ends[-1]),
+                         freq=freq,
+                         inclusive="left")
+
+
+def expand_invoice_values(dataf: pd.DataFrame, columns: list[str],
+                          positions: np.ndarray) -> np.ndarray:
+  """Return the (periods x columns) values of the invoices at positions,
+  NaN at -1."""
+  values = dataf[columns].to_numpy(dtype=float)
+  values = np.vstack([values, np.full((1, len(columns)), np.nan)])
+  return values[positions]
+
+
+def expand_invoices(dataf: pd.DataFrame,
+                    index: pd.DatetimeIndex | None = None,
+                    columns: list[str] | None = None) -> pd.DataFrame:
+  """Return the values of the invoice covering each timestamp of index (by
+  default the half-hours of all billing periods), NaN where no invoice covers
+  it."""
+  periods = BillingPeriods.from_dataframe(dataf)
+  if index is None:
+    index = periods.get_index()
+  if columns is None:
+    columns = [
+        x for x in dataf.columns if x not in (schema.DataInputSchema.METERCODE,
+                                              schema.DataInputSchema.END_DATE)
+    ]
+  values = expand_invoice_values(dataf, columns,
+                                 periods.get_positions(index))
+  return pd.DataFrame(values, index=index, columns=columns)
+
+
+def expand_time_of_use_charges(
+    dataf: pd.DataFrame, index: pd.DatetimeIndex, positions: np.ndarray,
+    rules: time_of_use.TimeOfUseRules) -> np.ndarray:
+  """Return the rate of the band of each timestamp, read from the band columns
+  of the invoice covering it."""
+  rates = expand_invoice_values(dataf, list(rules.bands), positions)
+  codes = time_of_use.get_band_codes(index, rules)
+  return rates[np.arange(len(index)), codes]
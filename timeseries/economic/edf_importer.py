@@ -0,0 +1,189 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from timeseries.data import schema
+
+HEADER_SEARCH_ROWS = 20
+
+SHEET_COLUMNS = {
+    schema.EDFImportSchema.BY_BILL_PERIOD: [
+        schema.EDFImportSchema.CONSUMP_KWH,
+        schema.EDFImportSchema.CCL_AMOUNT,
+    ],
+    schema.EDFImportSchema.DETAILED: [
+        schema.EDFImportSchema.RATE_DESCRIPT,
+        schema.EDFImportSchema.RATE_CONSUMPT,
+        schema.EDFImportSchema.RATE_CHARGE,
+    ],
+    schema.EDFImportSchema.NON_DETAILED: [
+        schema.EDFImportSchema.RED_CONSUMP,
+        schema.EDFImportSchema.RED_CHARGE,
+        schema.EDFImportSchema.AMBER_CONSUMP,
+        schema.EDFImportSchema.AMBER_CHARGE,
+        schema.EDFImportSchema.GREEN_CONSUMP,
+        schema.EDFImportSchema.GREEN_CHARGE,
+    ],
+}
+
+DUOS_COLUMNS = {
+    schema.DataInputSchema.DUOS_RED:
+    (schema.EDFImportSchema.RED_CHARGE, schema.EDFImportSchema.RED_CONSUMP),
+    schema.DataInputSchema.DUOS_AMBER:
+    (schema.EDFImportSchema.AMBER_CHARGE,
+     schema.EDFImportSchema.AMBER_CONSUMP),
+    schema.DataInputSchema.DUOS_GREEN:
+    (schema.EDFImportSchema.GREEN_CHARGE,
+     schema.EDFImportSchema.GREEN_CONSUMP),
+}
+
+ENERGY_RATES = {
+    schema.DataInputSchema.DAY_CHARGE: schema.EDFImportSchema.DAY_E_CHARGE,
+    schema.DataInputSchema.NIGHT_CHARGE:
+    schema.EDFImportSchema.NIGHT_E_CHARGE,
+}
+
+CONSUMPTION_COLUMNS = {
+    schema.DataInputSchema.DUOS_RED: schema.DataInputSchema.RED_CONSUMPTION,
+    schema.DataInputSchema.DUOS_AMBER:
+    schema.DataInputSchema.AMBER_CONSUMPTION,
+    schema.DataInputSchema.DUOS_GREEN:
+    schema.DataInputSchema.GREEN_CONSUMPTION,
+    schema.DataInputSchema.DAY_CHARGE: schema.DataInputSchema.DAY_CONSUMPTION,
+    schema.DataInputSchema.NIGHT_CHARGE:
+    schema.DataInputSchema.NIGHT_CONSUMPTION,
+}
+
+
+def normalize_column_name(name: object) -> str:
+  """Collapse the line breaks and spaces of a header, so that the multi-line
+  variants (e.g. BILL_PERIOD and BILL_PERIOD_2) have the same name."""
+  return " ".join(str(name).split())
+
+
+KEY_COLUMNS = [
+    normalize_column_name(schema.EDFImportSchema.MPAN),
+    normalize_column_name(schema.EDFImportSchema.BILL_PERIOD),
+]
+
+
+def find_header_row(path: Path, sheet_name: str) -> int:
+  """Return the row of the header of a sheet, the first row holding the bill
+  period."""
+  top_rows = pd.read_excel(path,
+                           sheet_name=sheet_name,
+                           header=None,
+                           nrows=HEADER_SEARCH_ROWS)
+  for row, values in enumerate(top_rows.itertuples(index=False)):
+    if KEY_COLUMNS[1] in {normalize_column_name(x) for x in values}:
+      return row
+  raise ValueError(f"No bill period header found in the {sheet_name} sheet.")
+
+
+def read_sheet(path: Path, sheet_name: str) -> pd.DataFrame:
+  """Read only the key columns and the columns needed from a sheet."""
+  needed_columns = set(KEY_COLUMNS) | {
+      normalize_column_name(x)
+      for x in SHEET_COLUMNS[sheet_name]
+  }
+  dataf = pd.read_excel(
+      path,
+      sheet_name=sheet_name,
+      header=find_header_row(path, sheet_name),
+      usecols=lambda x: normalize_column_name(x) in needed_columns)
+  dataf.columns = [normalize_column_name(x) for x in dataf.columns]
+  missing_columns = needed_columns.difference(dataf.columns)
+  if missing_columns:
+    raise ValueError(
+        f"Missing columns {sorted(missing_columns)} in the {sheet_name} sheet."
+    )
+  dataf[KEY_COLUMNS[1]] = pd.to_datetime(
+      dataf[KEY_COLUMNS[1]]).dt.to_period("M").dt.to_timestamp()
+  return dataf.dropna(subset=KEY_COLUMNS)
+
+
+def read_edf_sheets(path: Path,
+                    nb_workers: int = 1) -> dict[str, pd.DataFrame]:
+  """Read the ByBillPeriod, DetailedEnergy and DetailedNonEnergy sheets, one
+  per process."""
+  sheet_names = list(SHEET_COLUMNS)
+  if nb_workers > 1:
+    with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+      frames = list(
+          executor.map(read_sheet, [path] * len(sheet_names), sheet_names))
+  else:
+    frames = [read_sheet(path, x) for x in sheet_names]
+  return dict(zip(sheet_names, frames))
+
+
+def get_rate(dataf: pd.DataFrame, charge_column: str,
+             consumption_column: str) -> pd.Series:
+  """Return the £/kWh rate of each meter and bill period from charges and
+  consumptions, NaN for the periods without consumption."""
+  totals = dataf.groupby(KEY_COLUMNS)[[charge_column,
+                                       consumption_column]].sum()
+  consumptions = totals[consumption_column]
+  return totals[charge_column] / consumptions.where(consumptions != 0)
+
+
+def get_consumption(dataf: pd.DataFrame, consumption_column: str) -> pd.Series:
+  """Return the kWh of each meter and bill period."""
+  return dataf.groupby(KEY_COLUMNS)[consumption_column].sum()
+
+
+def normalize_edf_invoices(sheets: dict[str, pd.DataFrame]) -> pd.DataFrame:
+  """Return the rates and band consumptions of each meter and bill period in
+  the DataInputSchema format.
+  A rate the invoices do not define (band not billed, no consumption) is left
+  NaN, a consumption not billed is 0 kWh."""
+  by_bill_period = sheets[schema.EDFImportSchema.BY_BILL_PERIOD]
+  rates = {
+      schema.DataInputSchema.CCL:
+      get_rate(by_bill_period,
+               normalize_column_name(schema.EDFImportSchema.CCL_AMOUNT),
+               normalize_column_name(schema.EDFImportSchema.CONSUMP_KWH))
+  }
+  detailed = sheets[schema.EDFImportSchema.DETAILED]
+  description = detailed[normalize_column_name(
+      schema.EDFImportSchema.RATE_DESCRIPT)].map(normalize_column_name)
+  for col, rate_description in ENERGY_RATES.items():
+    rate_lines = detailed.loc[description == normalize_column_name(
+        rate_description)]
+    rates[col] = get_rate(
+        rate_lines, normalize_column_name(schema.EDFImportSchema.RATE_CHARGE),
+        normalize_column_name(schema.EDFImportSchema.RATE_CONSUMPT))
+    rates[CONSUMPTION_COLUMNS[col]] = get_consumption(
+        rate_lines,
+        normalize_column_name(schema.EDFImportSchema.RATE_CONSUMPT))
+  non_detailed = sheets[schema.EDFImportSchema.NON_DETAILED]
+  for col, (charge_column, consumption_column) in DUOS_COLUMNS.items():
+    rates[col] = get_rate(non_detailed, normalize_column_name(charge_column),
+                          normalize_column_name(consumption_column))
+    rates[CONSUMPTION_COLUMNS[col]] = get_consumption(
+        non_detailed, normalize_column_name(consumption_column))
+
+  dataf = pd.DataFrame(rates)
+  consumption_columns = list(CONSUMPTION_COLUMNS.values())
+  dataf[consumption_columns] = dataf[consumption_columns].fillna(0)
+  dataf = dataf.reset_index()
+  dataf = dataf.rename(columns={
+      KEY_COLUMNS[0]: schema.DataInputSchema.METERCODE,
+      KEY_COLUMNS[1]: schema.DataInputSchema.INDEX,
+  }).set_index(schema.DataInputSchema.INDEX)
+  return dataf[[
+      schema.DataInputSchema.METERCODE,
+      schema.DataInputSchema.CCL,
+      schema.DataInputSchema.DUOS_GREEN,
+      schema.DataInputSchema.DUOS_AMBER,
+      schema.DataInputSchema.DUOS_RED,
+      schema.DataInputSchema.DAY_CHARGE,
+      schema.DataInputSchema.NIGHT_CHARGE,
+      *consumption_columns,
+  ]]
+
+
+def import_edf_data(path: Path, nb_workers: int = 1) -> pd.DataFrame:
+  """Import an EDF invoice workbook into the EnergyTariffImporter electricity
+  format."""
+  return normalize_edf_invoices(read_edf_sheets(path, nb_workers))
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+from timeseries.common import enums
+from timeseries.data import schema
+
+MJ_PER_KWH = 3.6
+CUBIC_METRES_PER_UNIT = {
+    enums.MeterUnit.CUBIC_METRES.value: 1.0,
+    enums.MeterUnit.HUNDREDS_OF_CUBIC_FEET.value: 2.83168,
+}
+DEFAULT_KWH_TOLERANCE = 0.1
+DEFAULT_CHARGE_TOLERANCE = 0.01
+DEFAULT_RELATIVE_TOLERANCE = 1e-4
+
+VOLUME = "Volume_m3"
+EXPECTED_KWH = "Expected_kWh"
+BILLED_KWH = "Billed_kWh"
+KWH_DIFFERENCE = "kWh_difference"
+EXPECTED_CHARGE = "Expected_charge"
+BILLED_CHARGE = "Billed_charge"
+CHARGE_DIFFERENCE = "Charge_difference"
+ESTIMATED = "Estimated"
+ROLLED_OVER = "Rolled_over"
+REVERSED = "Reversed"
+
+
+def get_register_advance(
+    present: np.ndarray,
+    previous: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+  """Return the advance of the meter registers between two readings, whether
+  the register rolled over and whether the readings were written in reverse
+  order. A present reading below the previous one is either a roll-over past
+  the largest value of the register (10 to the number of digits of the
+  readings) or a pair of readings in reverse order, whichever gives the smaller
+  advance."""
+  advance = present - previous
+  nb_digits = np.floor(np.log10(np.maximum(np.fmax(present, previous),
+                                           1.0))) + 1
+  wrapped = advance + 10.0**nb_digits
+  is_negative = advance < 0
+  rolled_over = is_negative & (wrapped < -advance)
+  is_reversed = is_negative & ~rolled_over
+  advance = np.where(rolled_over, wrapped,
+                     np.where(is_reversed, -advance, advance))
+  return advance, rolled_over, is_reversed
+
+
+def map_labels(values: pd.Series, mapping: dict, default) -> np.ndarray:
+  """Return the mapping of the upper-cased labels, each distinct label being
+  mapped once, default for the unknown and missing labels."""
+  codes, uniques = pd.factorize(values)
+  mapped = [mapping.get(str(x).upper(), default) for x in uniques] + [default]
+  return np.asarray(mapped)[codes]
+
+
+def convert_readings_to_kwh(dataf: pd.DataFrame) -> pd.DataFrame:
+  """Return the gas volume (m3) and energy (kWh) between the meter readings of
+  each invoice line, kWh = m3 x correction factor x calorific value (MJ/m3)
+  / 3.6. Lines with an estimated reading are flagged, as their consumption is
+  provisional."""
+  advance, rolled_over, is_reversed = get_register_advance(
+      dataf[schema.DataInputSchema.PRESENT_READING].to_numpy(dtype=float),
+      dataf[schema.DataInputSchema.PREVIOUS_READING].to_numpy(dtype=float))
+  volume = advance * map_labels(dataf[schema.DataInputSchema.METER_UNIT],
+                                CUBIC_METRES_PER_UNIT, np.nan)
+  energy = (volume *
+            dataf[schema.DataInputSchema.CORRECTION_FACTOR].to_numpy(
+                dtype=float) *
+            dataf[schema.DataInputSchema.CALORIFIC_VALUE].to_numpy(
+                dtype=float) / MJ_PER_KWH)
+  estimated = np.zeros(len(dataf), dtype=bool)
+  for column in (schema.DataInputSchema.PRESENT_READING_TYPE,
+                 schema.DataInputSchema.PREVIOUS_READING_TYPE):
+    estimated |= map_labels(dataf[column],
+                            {enums.ReadingType.ESTIMATED.value: True}, False)
+  return pd.DataFrame(
+      {
+          VOLUME: volume,
+          EXPECTED_KWH: energy,
+          ESTIMATED: estimated,
+          ROLLED_OVER: rolled_over,
+          REVERSED: is_reversed,
+      },
+      index=dataf.index)
+
+
+def exceeds_tolerance(difference: np.ndarray, expected: np.ndarray,
+                      tolerance: float,
+                      relative_tolerance: float) -> np.ndarray:
+  """Return whether each difference is beyond the tolerance, or cannot be
+  computed."""
+  return ~(np.abs(difference)
+           <= tolerance + relative_tolerance * np.abs(expected))
+
+
+def reconcile_gas_invoices(
+    dataf: pd.DataFrame,
+    kwh_tolerance: float = DEFAULT_KWH_TOLERANCE,
+    charge_tolerance: float = DEFAULT_CHARGE_TOLERANCE,
+    relative_tolerance: float = DEFAULT_RELATIVE_TOLERANCE) -> pd.DataFrame:
+  """Return the gas invoice lines, imported with their meter readings, which
+  billed kWh or consumption charge do not match the energy converted from the
+  readings and the charge rate x converted energy.
+  A difference is accepted up to the tolerance (kWh or GBP) plus
+  relative_tolerance of the expected value, which absorbs the rounding of the
+  invoices. Lines which cannot be converted (unknown unit, missing reading) are
+  returned as well."""
+  conversion = convert_readings_to_kwh(dataf)
+  expected_kwh = conversion[EXPECTED_KWH].to_numpy()
+  billed_kwh = dataf[schema.DataInputSchema.GAS_CONSUMPTION].to_numpy(
+      dtype=float)
+  expected_charge = expected_kwh * dataf[
+      schema.DataInputSchema.ENERGY_CHARGE].to_numpy(dtype=float)
+  billed_charge = dataf[
+      schema.DataInputSchema.GAS_CONSUMPTION_CHARGE].to_numpy(dtype=float)
+  is_discrepancy = (exceeds_tolerance(billed_kwh - expected_kwh, expected_kwh,
+                                      kwh_tolerance, relative_tolerance)
+                    | exceeds_tolerance(billed_charge - expected_charge,
+                                        expected_charge, charge_tolerance,
+                                        relative_tolerance))
+  table = pd.DataFrame(
+      {
+          schema.DataInputSchema.METERCODE:
+          dataf[schema.DataInputSchema.METERCODE].to_numpy(),
+          ESTIMATED: conversion[ESTIMATED].to_numpy(),
+          ROLLED_OVER: conversion[ROLLED_OVER].to_numpy(),
+          REVERSED: conversion[REVERSED].to_numpy(),
+          EXPECTED_KWH: expected_kwh,
+          BILLED_KWH: billed_kwh,
+          KWH_DIFFERENCE: billed_kwh - expected_kwh,
+          EXPECTED_CHARGE: expected_charge,
+          BILLED_CHARGE: billed_charge,
+          CHARGE_DIFFERENCE: billed_charge - expected_charge,
+      },
+      index=dataf.index)
+  if schema.DataInputSchema.END_DATE in dataf.columns:
+    table.insert(1, schema.DataInputSchema.END_DATE,
+                 dataf[schema.DataInputSchema.END_DATE].to_numpy())
+  return table.loc[is_discrepancy]
@@ -0,0 +1,211 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from timeseries.common import average_week
+from timeseries.data import schema
+from timeseries.economic import billing_periods, time_of_use
+
+DEFAULT_NB_ITERATIONS = 100
+DEFAULT_TOLERANCE = 1e-9
+HH_NS = 30 * 60 * 10**9
+HOURS_PER_HH = 0.5
+
+BAND_CONSUMPTIONS = {
+    schema.DataInputSchema.DUOS_RED: schema.DataInputSchema.RED_CONSUMPTION,
+    schema.DataInputSchema.DUOS_AMBER:
+    schema.DataInputSchema.AMBER_CONSUMPTION,
+    schema.DataInputSchema.DUOS_GREEN:
+    schema.DataInputSchema.GREEN_CONSUMPTION,
+    schema.DataInputSchema.DAY_CHARGE: schema.DataInputSchema.DAY_CONSUMPTION,
+    schema.DataInputSchema.NIGHT_CHARGE:
+    schema.DataInputSchema.NIGHT_CONSUMPTION,
+}
+
+logger = logging.getLogger(__name__)
+
+
+def get_period_half_hours(
+    dataf: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+  """Return the half-hours (ns) of the billing periods of all invoices and the
+  invoice row of each half-hour."""
+  starts, ends = billing_periods.get_period_bounds(dataf)
+  lengths = (ends - starts) // HH_NS
+  rows = np.repeat(np.arange(len(dataf)), lengths)
+  steps = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths,
+                                               lengths)
+  return np.repeat(starts, lengths) + steps * HH_NS, rows
+
+
+def get_band_targets(dataf: pd.DataFrame,
+                     rules: time_of_use.TimeOfUseRules) -> np.ndarray:
+  """Return the (invoices x bands) kWh of the bands of rules, NaN where not
+  invoiced."""
+  columns = [BAND_CONSUMPTIONS[x] for x in rules.bands]
+  return dataf.reindex(columns=columns).to_numpy(dtype=float)
+
+
+def get_invoice_totals(targets: np.ndarray) -> np.ndarray:
+  """Return the kWh of each invoice over its bands, NaN if no band was
+  invoiced."""
+  totals = np.nansum(targets, axis=1)
+  return np.where(np.isnan(targets).all(axis=1), np.nan, totals)
+
+
+def drop_unsplit_bands(targets: np.ndarray,
+                       other_totals: np.ndarray) -> np.ndarray:
+  """Return the targets with the invoices billing no kWh in the bands but some
+  in the other bands set to NaN, as the bands were not split on those
+  invoices."""
+  totals = get_invoice_totals(targets)
+  unsplit = ~(totals > 0) & (other_totals > 0)
+  return np.where(unsplit[:, None], np.nan, targets)
+
+
+def get_initial_shape(index: pd.DatetimeIndex,
+                      template: pd.Series | None) -> np.ndarray:
+  """Return the strictly positive starting profile over index, the average week
+  template at the slot of each half-hour (slots missing from it get its mean)
+  or a flat profile."""
+  if template is None:
+    return np.ones(len(index))
+  values = template.reindex(average_week.get_slot_keys(index)).to_numpy(
+      dtype=float)
+  mean = np.nanmean(template.to_numpy(dtype=float))
+  values = np.where(np.isnan(values), mean, values)
+  return np.maximum(values, 1e-6 * max(mean, 1.0))
+
+
+def fit_band_totals(values: np.ndarray, groups: np.ndarray,
+                    targets: np.ndarray) -> np.ndarray:
+  """Scale the values of each group so that they sum to its target, NaN targets
+  are left unconstrained."""
+  sums = np.bincount(groups, weights=values, minlength=len(targets))
+  with np.errstate(invalid="ignore", divide="ignore"):
+    factors = np.where(np.isnan(targets), 1.0,
+                       np.where(sums > 0, targets / sums, 0.0))
+  return values * factors[groups]
+
+
+def get_fit_error(values: np.ndarray, groups: np.ndarray,
+                  targets: np.ndarray) -> float:
+  """Return the largest error of the group sums relative to their targets."""
+  sums = np.bincount(groups, weights=values, minlength=len(targets))
+  errors = np.abs(sums - targets) / np.maximum(np.abs(targets), 1.0)
+  return float(np.nanmax(errors, initial=0.0))
+
+
+def fit_cell_totals(cell_sums: np.ndarray, duos_targets: np.ndarray,
+                    day_night_targets: np.ndarray, nb_iterations: int,
+                    tolerance: float) -> np.ndarray:
+  """Return the kWh of each (invoice, DUOS band, day/night band) cell matching
+  the (invoices x bands) targets of both band sets.
+  The scaling factors of the fit are shared by all the half-hours of a cell, so
+  it is run on the cells rather than on the half-hours."""
+  nb_duos_bands = duos_targets.shape[1]
+  nb_day_night_bands = day_night_targets.shape[1]
+  cells = np.arange(len(cell_sums))
+  duos_groups = cells // nb_day_night_bands
+  day_night_groups = (cells // (nb_duos_bands * nb_day_night_bands) *
+                      nb_day_night_bands + cells % nb_day_night_bands)
+  duos_targets = duos_targets.ravel()
+  day_night_targets = day_night_targets.ravel()
+  values = cell_sums
+  for _ in range(nb_iterations):
+    values = fit_band_totals(values, duos_groups, duos_targets)
+    values = fit_band_totals(values, day_night_groups, day_night_targets)
+    error = max(get_fit_error(values, duos_groups, duos_targets),
+                get_fit_error(values, day_night_groups, day_night_targets))
+    if error < tolerance:
+      break
+  else:
+    logger.warning("Load reconstruction did not converge, largest error %.2e.",
+                   error)
+  return fit_band_totals(values, duos_groups, duos_targets)
+
+
+def reconstruct_load_profiles(
+    dataf: pd.DataFrame,
+    template: pd.Series | pd.DataFrame | None = None,
+    use_peak_demand: bool = False,
+    duos_rules: time_of_use.TimeOfUseRules = time_of_use.DUOS_RULES,
+    day_night_rules: time_of_use.TimeOfUseRules = time_of_use.DAY_NIGHT_RULES,
+    nb_iterations: int = DEFAULT_NB_ITERATIONS,
+    tolerance: float = DEFAULT_TOLERANCE) -> pd.DataFrame:
+  """Return the estimated half-hourly load (kWh) of each meter of normalised
+  electricity invoices, one column per meter.
+  The load of every billing period matches its red/amber/green kWh and its
+  day/night kWh, scaled to the red/amber/green total when both are invoiced.
+  Bands billing no kWh while the other bands bill some are left unconstrained.
+  All invoices are solved together by iterative proportional fitting from the
+  template, an average week lookup table indexed by Key (get_average_week or
+  AverageWeekAccumulator), or a flat profile. With use_peak_demand the
+  half-hours are also capped at the peak kW of the invoice when the invoiced
+  kWh fit under it. Where invoices overlap the one starting last is used."""
+  if dataf.empty:
+    return pd.DataFrame()
+  if isinstance(template, pd.DataFrame):
+    template = template.iloc[:, 0]
+  dataf = dataf.sort_index(kind="stable")
+  times, rows = get_period_half_hours(dataf)
+  # the half-hours of all invoices lie on one grid, the time features are
+  # computed on it
+  index = pd.date_range(pd.Timestamp(times.min()),
+                        pd.Timestamp(times.max()),
+                        freq="30min")
+  positions = (times - times.min()) // HH_NS
+
+  duos_targets = get_band_targets(dataf, duos_rules)
+  day_night_targets = get_band_targets(dataf, day_night_rules)
+  duos_targets, day_night_targets = (
+      drop_unsplit_bands(duos_targets, get_invoice_totals(day_night_targets)),
+      drop_unsplit_bands(day_night_targets, get_invoice_totals(duos_targets)))
+  duos_totals = get_invoice_totals(duos_targets)
+  day_night_totals = get_invoice_totals(day_night_targets)
+  with np.errstate(invalid="ignore", divide="ignore"):
+    scale = np.where(
+        np.isnan(duos_totals) | ~(day_night_totals > 0), 1.0,
+        duos_totals / day_night_totals)
+  day_night_targets = day_night_targets * scale[:, None]
+
+  nb_duos_bands = len(duos_rules.bands)
+  nb_day_night_bands = len(day_night_rules.bands)
+  cells = ((rows * nb_duos_bands +
+            time_of_use.get_band_codes(index, duos_rules)[positions]) *
+           nb_day_night_bands +
+           time_of_use.get_band_codes(index, day_night_rules)[positions])
+  nb_cells = len(dataf) * nb_duos_bands * nb_day_night_bands
+
+  caps = None
+  if (use_peak_demand
+      and schema.DataInputSchema.PEAK_DEMAND in dataf.columns):
+    invoice_caps = (dataf[schema.DataInputSchema.PEAK_DEMAND].to_numpy(
+        dtype=float) * HOURS_PER_HH)
+    lengths = np.bincount(rows, minlength=len(dataf))
+    totals = np.where(np.isnan(duos_totals), day_night_totals, duos_totals)
+    feasible = invoice_caps * lengths >= totals
+    caps = np.where(feasible, invoice_caps, np.inf)[rows]
+
+  values = get_initial_shape(index, template)[positions]
+  for _ in range(nb_iterations):
+    cell_sums = np.bincount(cells, weights=values, minlength=nb_cells)
+    fitted = fit_cell_totals(cell_sums, duos_targets, day_night_targets,
+                             nb_iterations, tolerance)
+    with np.errstate(invalid="ignore", divide="ignore"):
+      values = values * np.where(cell_sums > 0, fitted / cell_sums, 0.0)[cells]
+    if caps is None or np.all(values <= caps * (1 + tolerance)):
+      break
+    values = np.minimum(values, caps)
+  no_invoice = np.isnan(duos_totals) & np.isnan(day_night_totals)
+  values[no_invoice[rows]] = np.nan
+
+  meters, meter_rows = np.unique(
+      dataf[schema.DataInputSchema.METERCODE].to_numpy(), return_inverse=True)
+  profiles = np.full((len(index), len(meters)), np.nan)
+  # the rows are sorted by start, so the invoice starting last is written last
+  profiles.ravel()[positions * len(meters) + meter_rows[rows]] = values
+  return pd.DataFrame(profiles,
+                      index=pd.Index(index, name=schema.DataInputSchema.INDEX),
+                      columns=pd.Index(meters,
+                                       name=schema.DataInputSchema.METERCODE))
@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from timeseries.common import enums
+from timeseries.economic import tariff_structure
+
+
+@dataclass
+class SiteTariffs:
+  """Tariff structures of a site for each destination of its electricity
+  flows."""
+  import_structure: tariff_structure.TariffStructure
+  export_structure: tariff_structure.TariffStructure | None = None
+  onsite_structure: tariff_structure.TariffStructure | None = None
+
+  def __post_init__(self):
+    for temp_structure, destination in [
+        (self.import_structure, enums.Destination.IMPORT),
+        (self.export_structure, enums.Destination.EXPORT),
+        (self.onsite_structure, enums.Destination.ONSITE),
+    ]:
+      if (temp_structure is not None
+          and temp_structure.destination is not destination):
+        raise ValueError(f"{temp_structure.name} cannot be used as the "
+                         f"{destination.name} tariff.")
+
+
+def get_price_matrix(structures: list[tariff_structure.TariffStructure
+                                      | None],
+                     index: pd.DatetimeIndex) -> np.ndarray:
+  """Return the (sites x periods) total charges, NaN for a site without
+  structure."""
+  prices = np.full((len(structures), len(index)), np.nan)
+  for row, temp_structure in enumerate(structures):
+    if temp_structure is not None:
+      prices[row] = temp_structure.get_total_charges_array(index)
+  return prices
+
+
+def get_flow_matrix(flows: pd.DataFrame | None, sites: list,
+                    index: pd.DatetimeIndex) -> np.ndarray:
+  """Return the (sites x periods) flows in kWh, 0 where a flow is not given."""
+  if flows is None:
+    return np.zeros((len(sites), len(index)))
+  return flows.reindex(index=index, columns=sites).fillna(0).values.T
+
+
+def evaluate_net_costs(
+    site_tariffs: dict[str, SiteTariffs],
+    import_flows: pd.DataFrame,
+    export_flows: pd.DataFrame | None = None,
+    onsite_flows: pd.DataFrame | None = None) -> pd.DataFrame:
+  """Return the half-hourly net cost (GBP) of each site.
+  The flows are half-hourly dataframes in kWh with one column per site, the net
+  cost is import costs plus onsite generation costs minus export revenues.
+  Periods without price are NaN where the site has a flow for that
+  destination, as are all the flows of a site without a structure for their
+  destination."""
+  sites = list(site_tariffs)
+  index = import_flows.index
+  net_costs = np.zeros((len(sites), len(index)))
+  for flows, attribute in [
+      (import_flows, "import_structure"),
+      (export_flows, "export_structure"),
+      (onsite_flows, "onsite_structure"),
+  ]:
+    if flows is None:
+      continue
+    structures = [getattr(site_tariffs[x], attribute) for x in sites]
+    flow_matrix = get_flow_matrix(flows, sites, index)
+    prices = get_price_matrix(structures, index)
+    costs = np.where(flow_matrix == 0, 0, flow_matrix * prices)
+    if attribute == "export_structure":
+      costs = -costs
+    net_costs += costs
+  return pd.DataFrame(data=net_costs.T, index=index, columns=sites)
@@ -0,0 +1,111 @@
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from timeseries.economic import tariff_structure
+
+StructureBuilder = Callable[..., tariff_structure.TariffStructure]
+
+
+def get_month_lengths(index: pd.DatetimeIndex) -> np.ndarray:
+  """Return the number of half-hours of the month of each invoice date."""
+  return np.asarray(index.days_in_month, dtype=np.int64) * 48
+
+
+def get_hh_index(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+  """Return the concatenated half-hourly indexes of the months of the invoice
+  dates, in the order the builders generate them."""
+  month_starts = index.to_period("M").to_timestamp().as_unit("ns").asi8
+  lengths = get_month_lengths(index)
+  offsets = np.repeat(month_starts, lengths)
+  steps = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths,
+                                               lengths)
+  return pd.DatetimeIndex(offsets + steps * 30 * 60 * 10**9, dtype="M8[ns]")
+
+
+def build_chunk(builder: StructureBuilder, dataf: pd.DataFrame,
+                shm_name: str, shape: tuple[int, int], offset: int,
+                charge_names: list[str], builder_kwargs: dict) -> int:
+  """Build the charges of a chunk of invoices and write them in the shared
+  memory."""
+  structure = builder(dataf, **builder_kwargs)
+  shm = shared_memory.SharedMemory(name=shm_name)
+  try:
+    charges = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    series_by_name = {
+        temp_charges.name: temp_charges.series
+        for temp_charges in structure.list_consumption_charges
+    }
+    length = 0
+    for row, name in enumerate(charge_names):
+      values = series_by_name[name].values
+      length = len(values)
+      charges[row, offset:offset + length] = values
+    del charges
+  finally:
+    shm.close()
+  return length
+
+
+def build_structures_in_parallel(
+    builder: StructureBuilder, list_dataf: list[pd.DataFrame],
+    nb_workers: int,
+    **builder_kwargs) -> list[tariff_structure.TariffStructure]:
+  """Build one tariff structure per invoice dataframe over a process pool.
+  The invoices of all dataframes are split in nb_workers contiguous chunks,
+  each worker writes its charges into a shared memory block at offsets known in
+  advance, so the result does not depend on nb_workers and no charge series is
+  pickled."""
+  if not list_dataf:
+    return []
+  dataf = pd.concat(list_dataf)
+  if dataf.empty:
+    # no invoice to build the template from, the builder handles empty data
+    return [builder(x, **builder_kwargs) for x in list_dataf]
+  lengths = get_month_lengths(dataf.index)
+  offsets = np.concatenate([[0], np.cumsum(lengths)])
+  template = builder(dataf.iloc[:1], **builder_kwargs)
+  charge_names = [x.name for x in template.list_consumption_charges]
+  shape = (len(charge_names), int(offsets[-1]))
+  shm = shared_memory.SharedMemory(create=True,
+                                   size=max(1, shape[0] * shape[1] * 8))
+  try:
+    chunks = np.array_split(np.arange(len(dataf)), nb_workers)
+    chunks = [x for x in chunks if len(x) > 0]
+    with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+      futures = [
+          executor.submit(build_chunk, builder, dataf.iloc[x], shm.name,
+                          shape, int(offsets[x[0]]), charge_names,
+                          builder_kwargs) for x in chunks
+      ]
+      for future in futures:
+        future.result()
+    charges = np.ndarray(shape, dtype=np.float64, buffer=shm.buf).copy()
+  finally:
+    shm.close()
+    shm.unlink()
+
+  hh_index = get_hh_index(dataf.index).as_unit(
+      template.list_consumption_charges[0].series.index.unit)
+  structures = []
+  first_record = 0
+  for temp_dataf in list_dataf:
+    start = offsets[first_record]
+    end = offsets[first_record + len(temp_dataf)]
+    first_record += len(temp_dataf)
+    structures.append(
+        tariff_structure.TariffStructure(
+            energy_carrier=template.energy_carrier,
+            destination=template.destination,
+            origin=template.origin,
+            list_consumption_charges=[
+                tariff_structure.ConsumptionCharges(
+                    name, pd.Series(charges[row, start:end],
+                                    index=hh_index[start:end]))
+                for row, name in enumerate(charge_names)
+            ],
+        ))
+  return structures
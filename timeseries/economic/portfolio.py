@@ -0,0 +1,123 @@
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from timeseries.data import schema
+from timeseries.economic import tariff_structure
+
+DEFAULT_BLOCK_BYTES = 256 * 2**20
+
+
+@dataclass
+class PortfolioCosts:
+  """Daily costs (GBP) of every meter of a portfolio.
+  Args:
+      daily_costs: pd.DataFrame
+        A dataframe indexed by day with one column per meter, NaN for the days
+        with consumption in half-hours the tariff structure does not cover.
+        The totals including such days are NaN.
+
+  Methods:
+      get_meter_totals(freq: str = "D") -> pd.DataFrame:
+          Return the costs of each meter resampled to freq.
+      get_group_totals(metadata: pd.DataFrame, group_column: str,
+                       freq: str = "D") -> pd.DataFrame:
+          Return the costs of each group of meters resampled to freq.
+      get_estate_totals(freq: str = "D") -> pd.Series:
+          Return the costs of the whole portfolio resampled to freq.
+  """
+  daily_costs: pd.DataFrame
+
+  def get_meter_totals(self, freq: str = "D") -> pd.DataFrame:
+    if freq == "D":
+      return self.daily_costs
+    totals = self.daily_costs.resample(freq).sum()
+    is_missing = self.daily_costs.isna().resample(freq).sum() > 0
+    return totals.mask(is_missing)
+
+  def get_group_totals(
+      self,
+      metadata: pd.DataFrame,
+      group_column: str = schema.MetadataSchema.DESTINATION_ENTITY_ID,
+      freq: str = "D") -> pd.DataFrame:
+    """Return the costs summed by the group_column of the metadata.
+    The metadata is indexed by meter id (or has a MetadataSchema.PROFILE_ID
+    column)."""
+    if schema.MetadataSchema.PROFILE_ID in metadata.columns:
+      metadata = metadata.set_index(schema.MetadataSchema.PROFILE_ID)
+    groups = metadata[group_column].reindex(self.daily_costs.columns)
+    meter_totals = self.get_meter_totals(freq)
+    totals = meter_totals.T.groupby(groups.values).sum().T
+    is_missing = meter_totals.isna().T.groupby(groups.values).sum().T > 0
+    return totals.mask(is_missing)
+
+  def get_estate_totals(self, freq: str = "D") -> pd.Series:
+    return self.get_meter_totals(freq).sum(axis=1, skipna=False)
+
+
+def get_block_size(nb_periods: int,
+                   max_block_bytes: int = DEFAULT_BLOCK_BYTES) -> int:
+  """Return the number of meters per block so that the charge and consumption
+  blocks fit within max_block_bytes."""
+  bytes_per_meter = 2 * nb_periods * np.dtype(np.float64).itemsize
+  return max(1, max_block_bytes // bytes_per_meter)
+
+
+def get_day_starts(index: pd.DatetimeIndex) -> tuple[np.ndarray, pd.Index]:
+  """Return the positions of the first period of each day and the days."""
+  days = index.normalize()
+  is_start = np.ones(len(days), dtype=bool)
+  is_start[1:] = days[1:] != days[:-1]
+  return np.flatnonzero(is_start), days[is_start]
+
+
+def iter_blocks(
+    meters: Iterable[tuple[int, tariff_structure.TariffStructure, pd.Series]],
+    index: pd.DatetimeIndex, block_size: int
+) -> Iterator[tuple[list[int], np.ndarray, np.ndarray]]:
+  """Yield blocks of meter ids, charges (£/kWh) and consumptions (kWh) aligned
+  on index, the charges NaN where the tariff structure has none."""
+  meter_ids = []
+  charges = np.zeros((block_size, len(index)))
+  consumptions = np.zeros((block_size, len(index)))
+  for meter_id, temp_structure, consumption in meters:
+    row = len(meter_ids)
+    charges[row] = temp_structure.get_total_charges_array(index)
+    consumptions[row] = consumption.reindex(index).fillna(0).values
+    meter_ids.append(meter_id)
+    if len(meter_ids) == block_size:
+      yield meter_ids, charges, consumptions
+      meter_ids = []
+  if meter_ids:
+    yield (meter_ids, charges[:len(meter_ids)],
+           consumptions[:len(meter_ids)])
+
+
+def aggregate_portfolio_costs(
+    meters: Iterable[tuple[int, tariff_structure.TariffStructure, pd.Series]],
+    index: pd.DatetimeIndex,
+    max_block_bytes: int = DEFAULT_BLOCK_BYTES) -> PortfolioCosts:
+  """Compute the daily costs of every meter of a portfolio.
+  meters is an iterable of (meter id, tariff structure, half-hourly consumption
+  in kWh). It is consumed block by block so it can be a generator reading
+  meters lazily, only the (meters x days) results are kept in memory. The
+  consumption of half-hours without charge makes the cost of its day NaN
+  rather than free."""
+  day_starts, days = get_day_starts(index)
+  block_size = get_block_size(len(index), max_block_bytes)
+  list_meter_ids = []
+  list_daily_costs = []
+  for meter_ids, charges, consumptions in iter_blocks(
+      meters, index, block_size):
+    costs = np.where(consumptions == 0, 0.0, charges * consumptions)
+    list_daily_costs.append(np.add.reduceat(costs, day_starts, axis=1))
+    list_meter_ids.extend(meter_ids)
+  if list_daily_costs:
+    data = np.concatenate(list_daily_costs, axis=0).T
+  else:
+    data = np.zeros((len(days), 0))
+  daily_costs = pd.DataFrame(data=data, index=days, columns=list_meter_ids)
+  daily_costs.index.name = schema.DataInputSchema.INDEX
+  return PortfolioCosts(daily_costs)
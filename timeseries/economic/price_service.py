@@ -0,0 +1,348 @@
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+from datetime import time as time_of_day
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import requests
+
+from timeseries.common import enums
+from timeseries.economic import tariff_creator, tariff_structure, window_query
+
+PRICE_ENDPOINT = "/price"
+COST_ENDPOINT = "/cost"
+CHEAPEST_ENDPOINT = "/cheapest"
+RELOAD_ENDPOINT = "/reload"
+METRICS_ENDPOINT = "/metrics"
+NB_LATENCIES_KEPT = 10000
+
+
+@dataclass(frozen=True)
+class PriceProfile:
+  """Sorted half-hourly profile held as numpy arrays for fast batch lookups."""
+  index: np.ndarray
+  values: np.ndarray
+
+  def lookup(self, timestamps: pd.DatetimeIndex) -> np.ndarray:
+    """Return the values at the timestamps, NaN where the profile has no
+    value."""
+    keys = timestamps.as_unit("ns").asi8
+    positions = np.clip(self.index.searchsorted(keys), 0,
+                        len(self.index) - 1)
+    found = self.index[positions] == keys
+    return np.where(found, self.values[positions], np.nan)
+
+
+def create_price_profile(series: pd.Series) -> PriceProfile:
+  series = series.sort_index()
+  series = series[~series.index.duplicated(keep="last")]
+  index = pd.DatetimeIndex(series.index).as_unit("ns")
+  return PriceProfile(index.asi8.copy(), series.values.astype(float))
+
+
+@dataclass(frozen=True)
+class PriceServiceState:
+  """Immutable snapshot of the total charges (£/kWh) and tariff structures of
+  each meter and of the carbon intensity (gCO2/kWh). A new snapshot is built
+  and swapped in on reload."""
+  profiles: dict[int, PriceProfile] = field(default_factory=dict)
+  carbon: PriceProfile | None = None
+  structures: dict[int, tariff_structure.TariffStructure] = field(
+      default_factory=dict)
+
+
+def create_service_state(
+    importer: tariff_creator.EnergyTariffImporter,
+    carbon_intensity: pd.Series | None = None) -> PriceServiceState:
+  """Build the tariff structures of every meter of the importer, with the
+  prefix sums of their window queries."""
+  profiles = {}
+  structures = {}
+  for list_meters in importer.get_all_meter_ids().values():
+    for meter_id in list_meters:
+      temp_structure = importer.get_tariff_structure(meter_id)
+      temp_structure.get_prefix_sums()
+      structures[int(meter_id)] = temp_structure
+      profiles[int(meter_id)] = create_price_profile(
+          temp_structure.get_total_charges_series())
+  carbon = None
+  if carbon_intensity is not None:
+    carbon = create_price_profile(carbon_intensity)
+  return PriceServiceState(profiles, carbon, structures)
+
+
+def get_field(payload: dict, name: str):
+  """Return a required field of a request payload."""
+  if name not in payload:
+    raise ValueError(f"Missing {name} in the request.")
+  return payload[name]
+
+
+def get_time_of_day(value: str | None) -> time_of_day | None:
+  return None if value is None else time_of_day.fromisoformat(value)
+
+
+def to_json_list(values: np.ndarray) -> list[float | None]:
+  return [None if np.isnan(value) else float(value) for value in values]
+
+
+class LatencyMetrics:
+  """Thread-safe record of the latest request latencies of each endpoint."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._latencies: dict[str, deque] = {}
+    self._counts: dict[str, int] = {}
+
+  def record(self, endpoint: str, latency: float) -> None:
+    with self._lock:
+      latencies = self._latencies.setdefault(
+          endpoint, deque(maxlen=NB_LATENCIES_KEPT))
+      latencies.append(latency)
+      self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+
+  def summary(self) -> dict[str, dict[str, float]]:
+    """Return the number of requests and the latency statistics in ms."""
+    with self._lock:
+      latencies = {k: np.array(v) * 1000 for k, v in self._latencies.items()}
+      counts = dict(self._counts)
+    return {
+        endpoint: {
+            "count": counts[endpoint],
+            "mean_ms": float(values.mean()),
+            "p50_ms": float(np.percentile(values, 50)),
+            "p95_ms": float(np.percentile(values, 95)),
+            "max_ms": float(values.max()),
+        }
+        for endpoint, values in latencies.items()
+    }
+
+
+class PriceService:
+  """Keep the tariff structures of an importer hot in memory and answer batch
+  queries. Queries read the current state without locking, reloads build a new
+  state and swap it atomically."""
+
+  def __init__(self,
+               state: PriceServiceState | None = None,
+               name: str = "price_service"):
+    self.name = name
+    self.state = PriceServiceState() if state is None else state
+    self.metrics = LatencyMetrics()
+    self._reload_lock = threading.Lock()
+
+  def load_invoices(self,
+                    invoice_path_dict: dict[enums.EnergyCarrier, Path],
+                    carbon_intensity: pd.Series | None = None) -> None:
+    with self._reload_lock:
+      importer = tariff_creator.EnergyTariffImporter(self.name)
+      importer.load_data(invoice_path_dict)
+      if carbon_intensity is None and self.state.carbon is not None:
+        new_state = replace(create_service_state(importer),
+                            carbon=self.state.carbon)
+      else:
+        new_state = create_service_state(importer, carbon_intensity)
+      self.state = new_state
+
+  def get_meter_id(self, state: PriceServiceState, payload: dict) -> int:
+    meter_id = int(get_field(payload, "meter_id"))
+    if meter_id not in state.profiles:
+      raise KeyError(f"Unknown meter {meter_id}.")
+    return meter_id
+
+  def get_profile(self, state: PriceServiceState,
+                  payload: dict) -> PriceProfile:
+    return state.profiles[self.get_meter_id(state, payload)]
+
+  def get_prices(self, payload: dict) -> dict:
+    """Return the total charges (and carbon intensity) at the timestamps of a
+    meter."""
+    state = self.state
+    profile = self.get_profile(state, payload)
+    timestamps = pd.DatetimeIndex(
+        pd.to_datetime(get_field(payload, "timestamps")))
+    response = {"prices": to_json_list(profile.lookup(timestamps))}
+    if state.carbon is not None:
+      response["carbon"] = to_json_list(state.carbon.lookup(timestamps))
+    return response
+
+  def get_cost(self, payload: dict) -> dict:
+    """Return the cost (GBP) of a load profile (kWh per timestamp) of a
+    meter."""
+    state = self.state
+    profile = self.get_profile(state, payload)
+    timestamps = pd.DatetimeIndex(
+        pd.to_datetime(get_field(payload, "timestamps")))
+    consumption = np.asarray(get_field(payload, "consumption"), dtype=float)
+    prices = profile.lookup(timestamps)
+    missing = np.isnan(prices)
+    return {
+        "cost": float(np.sum(prices[~missing] * consumption[~missing])),
+        "nb_missing_prices": int(missing.sum()),
+    }
+
+  def get_cheapest_windows(self, payload: dict) -> dict:
+    """Return the start times of the nb_windows cheapest windows of nb_periods
+    half-hours of each day of a meter, as TariffStructure.get_cheapest_windows.
+    """
+    state = self.state
+    structure = state.structures[self.get_meter_id(state, payload)]
+    start = payload.get("start")
+    end = payload.get("end")
+    windows = structure.get_cheapest_windows(
+        int(get_field(payload, "nb_periods")) * window_query.PERIOD,
+        int(payload.get("nb_windows", 1)),
+        start_date=None if start is None else pd.Timestamp(start),
+        end_date=None if end is None else pd.Timestamp(end),
+        earliest=get_time_of_day(payload.get("earliest")),
+        latest=get_time_of_day(payload.get("latest")))
+    return {
+        "days": [x.date().isoformat() for x in windows[window_query.DAY]],
+        "starts": [x.isoformat() for x in windows[window_query.START]],
+        "average_prices":
+        windows[window_query.AVERAGE_PRICE].astype(float).tolist(),
+    }
+
+  def reload(self, payload: dict) -> dict:
+    invoice_path_dict = {
+        enums.EnergyCarrier[energy_carrier]: Path(temp_path)
+        for energy_carrier, temp_path in get_field(payload,
+                                                    "invoice_paths").items()
+    }
+    self.load_invoices(invoice_path_dict)
+    return {"meters": sorted(self.state.profiles)}
+
+  def handle(self, endpoint: str, payload: dict) -> dict:
+    handlers = {
+        PRICE_ENDPOINT: self.get_prices,
+        COST_ENDPOINT: self.get_cost,
+        CHEAPEST_ENDPOINT: self.get_cheapest_windows,
+        RELOAD_ENDPOINT: self.reload,
+    }
+    if endpoint not in handlers:
+      raise LookupError(f"Unknown endpoint {endpoint}.")
+    start_time = time.perf_counter()
+    try:
+      return handlers[endpoint](payload)
+    finally:
+      self.metrics.record(endpoint, time.perf_counter() - start_time)
+
+
+class PriceRequestHandler(BaseHTTPRequestHandler):
+  """Serve the PriceService of the server as JSON over HTTP."""
+
+  def send_json(self, status: int, body: dict) -> None:
+    content = json.dumps(body).encode("utf-8")
+    self.send_response(status)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(content)))
+    self.end_headers()
+    self.wfile.write(content)
+
+  def do_GET(self):  # pylint: disable=invalid-name
+    if self.path == METRICS_ENDPOINT:
+      self.send_json(200, self.server.service.metrics.summary())
+    else:
+      self.send_json(404, {"error": f"Unknown endpoint {self.path}."})
+
+  def do_POST(self):  # pylint: disable=invalid-name
+    length = int(self.headers.get("Content-Length", 0))
+    try:
+      payload = json.loads(self.rfile.read(length) or b"{}")
+      self.send_json(200, self.server.service.handle(self.path, payload))
+    except LookupError as error:
+      self.send_json(404, {"error": str(error)})
+    except (ValueError, TypeError) as error:
+      self.send_json(400, {"error": str(error)})
+    except Exception as error:  # pylint: disable=broad-except
+      self.send_json(500, {"error": str(error)})
+
+  def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+    pass
+
+
+def create_server(service: PriceService,
+                  host: str = "127.0.0.1",
+                  port: int = 0) -> ThreadingHTTPServer:
+  """Create a threaded HTTP server for the service, port 0 picks a free
+  port."""
+  server = ThreadingHTTPServer((host, port), PriceRequestHandler)
+  server.daemon_threads = True
+  server.service = service
+  return server
+
+
+@dataclass
+class PriceServiceClient:
+  """Client of a running price service."""
+  url: str
+  timeout: float = 30.0
+
+  def post(self, endpoint: str, payload: dict) -> dict:
+    response = requests.post(f"{self.url}{endpoint}",
+                             json=payload,
+                             timeout=self.timeout)
+    response.raise_for_status()
+    return response.json()
+
+  def get_prices(self, meter_id: int,
+                 timestamps: pd.DatetimeIndex) -> pd.DataFrame:
+    response = self.post(PRICE_ENDPOINT, {
+        "meter_id": meter_id,
+        "timestamps": [x.isoformat() for x in timestamps]
+    })
+    return pd.DataFrame(response, index=timestamps, dtype=float)
+
+  def get_cost(self, meter_id: int, consumption: pd.Series) -> float:
+    return self.post(
+        COST_ENDPOINT, {
+            "meter_id": meter_id,
+            "timestamps": [x.isoformat() for x in consumption.index],
+            "consumption": consumption.tolist()
+        })["cost"]
+
+  def get_cheapest_windows(self,
+                           meter_id: int,
+                           nb_periods: int,
+                           nb_windows: int = 1,
+                           start: pd.Timestamp | None = None,
+                           end: pd.Timestamp | None = None,
+                           earliest: time_of_day | None = None,
+                           latest: time_of_day | None = None) -> list[str]:
+    """Return the start times of the nb_windows cheapest windows of each
+    day."""
+    payload = {
+        "meter_id": meter_id,
+        "nb_periods": nb_periods,
+        "nb_windows": nb_windows
+    }
+    if start is not None:
+      payload["start"] = start.isoformat()
+    if end is not None:
+      payload["end"] = end.isoformat()
+    if earliest is not None:
+      payload["earliest"] = earliest.isoformat()
+    if latest is not None:
+      payload["latest"] = latest.isoformat()
+    return self.post(CHEAPEST_ENDPOINT, payload)["starts"]
+
+  def reload(self, invoice_path_dict: dict[enums.EnergyCarrier,
+                                           Path]) -> list[int]:
+    return self.post(
+        RELOAD_ENDPOINT, {
+            "invoice_paths": {
+                k.name: str(v)
+                for k, v in invoice_path_dict.items()
+            }
+        })["meters"]
+
+  def get_metrics(self) -> dict:
+    response = requests.get(f"{self.url}{METRICS_ENDPOINT}",
+                            timeout=self.timeout)
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,139 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from timeseries.common import enums
+
+SUM = "sum"
+MIN = "min"
+MAX = "max"
+COUNT = "count"
+MEAN = "mean"
+STATS = [SUM, MIN, MAX, COUNT]
+
+PERIOD_FREQUENCIES = {
+    enums.Charts.WEEKLY_LABEL: "W-SUN",
+    enums.Charts.MONTHLY_LABEL: "M",
+    enums.Charts.YEARLY_LABEL: "Y",
+}
+
+
+def get_group_starts(keys: np.ndarray) -> np.ndarray:
+  """Return the positions where a new group starts in sorted keys."""
+  is_start = np.ones(len(keys), dtype=bool)
+  is_start[1:] = keys[1:] != keys[:-1]
+  return np.flatnonzero(is_start)
+
+
+def aggregate_values(values: np.ndarray,
+                     starts: np.ndarray) -> dict[str, np.ndarray]:
+  """Return the sum, min, max and count of non-NaN values of each group of
+  rows."""
+  return {
+      SUM: np.add.reduceat(np.nan_to_num(values), starts, axis=0),
+      MIN: np.fmin.reduceat(values, starts, axis=0),
+      MAX: np.fmax.reduceat(values, starts, axis=0),
+      COUNT: np.add.reduceat((~np.isnan(values)).astype(float),
+                             starts,
+                             axis=0),
+  }
+
+
+def merge_aggregates(aggregates: dict[str, np.ndarray],
+                     starts: np.ndarray) -> dict[str, np.ndarray]:
+  """Combine groups of aggregates into coarser aggregates."""
+  return {
+      SUM: np.add.reduceat(aggregates[SUM], starts, axis=0),
+      MIN: np.fmin.reduceat(aggregates[MIN], starts, axis=0),
+      MAX: np.fmax.reduceat(aggregates[MAX], starts, axis=0),
+      COUNT: np.add.reduceat(aggregates[COUNT], starts, axis=0),
+  }
+
+
+def to_dataframe(aggregates: dict[str, np.ndarray], index: pd.DatetimeIndex,
+                 columns: pd.Index) -> pd.DataFrame:
+  """Return the aggregates with (column, stat) columns."""
+  dataf = pd.concat(
+      {
+          stat: pd.DataFrame(aggregates[stat], index=index, columns=columns)
+          for stat in STATS
+      },
+      axis=1).swaplevel(axis=1)
+  return dataf[pd.MultiIndex.from_product([columns, STATS])]
+
+
+def from_dataframe(dataf: pd.DataFrame) -> dict[str, np.ndarray]:
+  return {stat: dataf.xs(stat, axis=1, level=1).values for stat in STATS}
+
+
+def compute_daily_aggregates(dataf: pd.DataFrame) -> pd.DataFrame:
+  """Return the daily sum, min, max and count of each column of a half-hourly
+  dataframe."""
+  dataf = dataf.sort_index()
+  days = dataf.index.normalize()
+  starts = get_group_starts(days.asi8)
+  aggregates = aggregate_values(dataf.values.astype(float), starts)
+  return to_dataframe(aggregates, days[starts], dataf.columns)
+
+
+def compute_period_aggregates(daily: pd.DataFrame,
+                              freq: str) -> pd.DataFrame:
+  """Return the aggregates of the periods of freq from the daily aggregates."""
+  periods = daily.index.to_period(freq)
+  starts = get_group_starts(periods.asi8)
+  aggregates = merge_aggregates(from_dataframe(daily), starts)
+  index = periods[starts].start_time
+  index.name = daily.index.name
+  return to_dataframe(aggregates, index,
+                      daily.columns.get_level_values(0).unique())
+
+
+@dataclass
+class RollupPyramid:
+  """Daily, weekly, monthly and yearly sum/min/max/count of a half-hourly
+  dataframe. The daily level is computed from the half-hourly data in a single
+  pass and the coarser levels are derived from it.
+  Args:
+      daily: pd.DataFrame
+        The daily aggregates with (column, stat) columns.
+
+  Methods:
+      get_rollup(level: enums.Charts, stat: str = "mean") -> pd.DataFrame:
+          Return one statistic of every column at the given level.
+      update(dataf: pd.DataFrame) -> None:
+          Recompute the days covered by dataf, which must contain whole days.
+  """
+  daily: pd.DataFrame
+  levels: dict[enums.Charts, pd.DataFrame] = field(default_factory=dict)
+
+  def __post_init__(self):
+    self.compute_levels()
+
+  def compute_levels(self) -> None:
+    self.levels = {enums.Charts.DAILY_LABEL: self.daily}
+    for level, freq in PERIOD_FREQUENCIES.items():
+      self.levels[level] = compute_period_aggregates(self.daily, freq)
+
+  def get_rollup(self,
+                 level: enums.Charts,
+                 stat: str = MEAN) -> pd.DataFrame:
+    if level not in self.levels:
+      raise ValueError(f"No rollup for the {level.value} level.")
+    aggregates = self.levels[level]
+    if stat == MEAN:
+      return (aggregates.xs(SUM, axis=1, level=1) /
+              aggregates.xs(COUNT, axis=1, level=1))
+    return aggregates.xs(stat, axis=1, level=1)
+
+  def update(self, dataf: pd.DataFrame) -> None:
+    new_daily = compute_daily_aggregates(dataf)
+    daily = self.daily.loc[~self.daily.index.isin(new_daily.index)]
+    self.daily = pd.concat([daily, new_daily]).sort_index()
+    self.compute_levels()
+
+
+def create_rollup_pyramid(dataf: pd.DataFrame) -> RollupPyramid:
+  """Create the rollup pyramid of a half-hourly dataframe (charges or
+  costs)."""
+  return RollupPyramid(compute_daily_aggregates(dataf))
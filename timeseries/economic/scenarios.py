@@ -0,0 +1,124 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from timeseries.data import schema
+from timeseries.economic import tariff_functions
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+TOTAL_LABEL = "Total"
+RATE_COLUMNS = (
+    schema.DataInputSchema.CCL,
+    schema.DataInputSchema.DAY_CHARGE,
+    schema.DataInputSchema.NIGHT_CHARGE,
+    schema.DataInputSchema.DUOS_RED,
+    schema.DataInputSchema.DUOS_AMBER,
+    schema.DataInputSchema.DUOS_GREEN,
+    schema.DataInputSchema.ENERGY_CHARGE,
+    schema.DataInputSchema.GAS,
+)
+
+
+def get_time_of_use_masks(index: pd.DatetimeIndex,
+                          rate_columns: list[str]) -> np.ndarray:
+  """Return a (rates x periods) array of 0/1 masks of when each rate applies.
+  Rates without a time of use band (e.g. CCL) apply all the time."""
+  band_masks = tariff_functions.get_duos_band_masks(index)
+  band_masks.update(tariff_functions.get_day_night_masks(index))
+  masks = np.ones((len(rate_columns), len(index)))
+  for row, col in enumerate(rate_columns):
+    if col in band_masks:
+      masks[row] = band_masks[col]
+  return masks
+
+
+def get_band_energy(load: pd.Series,
+                    monthly_rates: pd.DataFrame) -> np.ndarray:
+  """Return the (months x rates) consumption (kWh) of the load in each rate
+  band. The load is half-hourly in kWh, the monthly rates are indexed by month
+  start."""
+  rate_columns = list(monthly_rates.columns)
+  months = load.index.to_period("M").to_timestamp()
+  month_position = monthly_rates.index.get_indexer(months)
+  in_horizon = month_position >= 0
+  masks = get_time_of_use_masks(load.index[in_horizon], rate_columns)
+  energy = masks * load.values[in_horizon]
+  band_energy = np.zeros((len(monthly_rates), len(rate_columns)))
+  for row in range(len(rate_columns)):
+    band_energy[:, row] = np.bincount(month_position[in_horizon],
+                                      weights=energy[row],
+                                      minlength=len(monthly_rates))
+  return band_energy
+
+
+def get_rate_columns(monthly_rates: pd.DataFrame) -> pd.DataFrame:
+  """Return the rate (GBP/kWh) columns of the monthly data, leaving out the
+  meter code, the end dates and the consumptions."""
+  columns = [col for col in monthly_rates.columns if col in RATE_COLUMNS]
+  return monthly_rates[columns].astype(float)
+
+
+def get_volatility_array(rate_columns: list[str],
+                         volatility: float | dict[str, float]) -> np.ndarray:
+  """Return the log-normal volatility of each rate column."""
+  if isinstance(volatility, dict):
+    return np.array([volatility.get(col, 0.0) for col in rate_columns])
+  return np.full(len(rate_columns), volatility)
+
+
+def generate_rate_scenarios(base_rates: np.ndarray, volatility: np.ndarray,
+                            nb_scenarios: int,
+                            rng: np.random.Generator) -> np.ndarray:
+  """Return (scenarios x months x rates) rates with mean-preserving log-normal
+  shocks."""
+  shocks = rng.standard_normal((nb_scenarios, ) + base_rates.shape)
+  return base_rates * np.exp(volatility * shocks - volatility**2 / 2)
+
+
+def evaluate_scenario_chunk(base_rates: np.ndarray, band_energy: np.ndarray,
+                            volatility: np.ndarray, nb_scenarios: int,
+                            seed: np.random.SeedSequence) -> np.ndarray:
+  """Return the (scenarios x months) costs of a chunk of scenarios."""
+  rng = np.random.default_rng(seed)
+  rates = generate_rate_scenarios(base_rates, volatility, nb_scenarios, rng)
+  return np.einsum("smr,mr->sm", rates, band_energy)
+
+
+def evaluate_rate_scenarios(
+    monthly_rates: pd.DataFrame,
+    load: pd.Series,
+    nb_scenarios: int = 1000,
+    volatility: float | dict[str, float] = 0.1,
+    seed: int | None = None,
+    percentiles: tuple[float, ...] = DEFAULT_PERCENTILES,
+    nb_workers: int = 1,
+    chunk_size: int = 1000) -> pd.DataFrame:
+  """Return the percentiles of the monthly and total costs (GBP) of a load
+  profile under random monthly rates.
+  monthly_rates is a monthly dataframe compliant with DataInputSchema, e.g. the
+  output of shift_filter_monthly_dataframe, load is the half-hourly consumption
+  in kWh. The scenarios are generated in chunks of chunk_size, each with its
+  own seed spawned from seed, so the results do not depend on nb_workers."""
+  monthly_rates = get_rate_columns(monthly_rates)
+  band_energy = get_band_energy(load, monthly_rates)
+  base_rates = monthly_rates.values
+  volatility_array = get_volatility_array(list(monthly_rates.columns),
+                                          volatility)
+  chunk_sizes = [
+      min(chunk_size, nb_scenarios - start)
+      for start in range(0, nb_scenarios, chunk_size)
+  ]
+  seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+  args = ([base_rates] * len(chunk_sizes), [band_energy] * len(chunk_sizes),
+          [volatility_array] * len(chunk_sizes), chunk_sizes, seeds)
+  if nb_workers > 1:
+    with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+      chunks = list(executor.map(evaluate_scenario_chunk, *args))
+  else:
+    chunks = list(map(evaluate_scenario_chunk, *args))
+  monthly_costs = np.concatenate(chunks, axis=0)
+  costs = np.column_stack([monthly_costs, monthly_costs.sum(axis=1)])
+  return pd.DataFrame(data=np.percentile(costs, percentiles, axis=0),
+                      index=pd.Index(percentiles, name="Percentile"),
+                      columns=list(monthly_rates.index) + [TOTAL_LABEL])
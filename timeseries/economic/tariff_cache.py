@@ -0,0 +1,164 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+import pandas as pd
+
+from timeseries.economic import tariff_structure
+
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+CacheKey = tuple[int, datetime | None, datetime | None]
+
+
+@dataclass
+class CacheInfo:
+  """Statistics of a TariffStructureCache."""
+  hits: int = 0
+  slice_hits: int = 0
+  misses: int = 0
+  evictions: int = 0
+  entries: int = 0
+  nbytes: int = 0
+
+
+def get_structure_nbytes(structure: tariff_structure.TariffStructure) -> int:
+  return sum(
+      int(temp_charges.series.memory_usage(index=True))
+      for temp_charges in structure.list_consumption_charges)
+
+
+def copy_structure(
+    structure: tariff_structure.TariffStructure
+) -> tariff_structure.TariffStructure:
+  """Return a structure sharing the charge series but not the charge objects,
+  so that updating the copy does not alter the cached structure."""
+  return tariff_structure.TariffStructure(
+      energy_carrier=structure.energy_carrier,
+      destination=structure.destination,
+      origin=structure.origin,
+      units=structure.units,
+      list_consumption_charges=[
+          tariff_structure.ConsumptionCharges(temp_charges.name,
+                                              temp_charges.series)
+          for temp_charges in structure.list_consumption_charges
+      ],
+  )
+
+
+def covers(key: CacheKey, start_date: datetime | None,
+           end_date: datetime | None) -> bool:
+  """Return True if the window of key contains the window
+  start_date-end_date."""
+  _, cached_start, cached_end = key
+  start_covered = cached_start is None or (start_date is not None
+                                           and cached_start <= start_date)
+  end_covered = cached_end is None or (end_date is not None
+                                       and cached_end >= end_date)
+  return start_covered and end_covered
+
+
+class TariffStructureCache:
+  """LRU cache of tariff structures keyed by (meter_id, start_date, end_date),
+  bounded both in number of entries and in memory. It is shared by the
+  request threads of the price service, so every access holds a lock."""
+
+  def __init__(self,
+               max_entries: int = DEFAULT_MAX_ENTRIES,
+               max_bytes: int = DEFAULT_MAX_BYTES):
+    self.max_entries = max_entries
+    self.max_bytes = max_bytes
+    self._entries: OrderedDict[
+        CacheKey, tariff_structure.TariffStructure] = OrderedDict()
+    self._nbytes: dict[CacheKey, int] = {}
+    self._info = CacheInfo()
+    self._lock = threading.RLock()
+
+  def get(
+      self, meter_id: int, start_date: datetime | None,
+      end_date: datetime | None
+  ) -> tariff_structure.TariffStructure | None:
+    """Return a copy of the cached structure of the exact window, if any."""
+    key = (meter_id, start_date, end_date)
+    with self._lock:
+      if key not in self._entries:
+        return None
+      self._entries.move_to_end(key)
+      self._info.hits += 1
+      return copy_structure(self._entries[key])
+
+  def get_covering(
+      self, meter_id: int, start_date: datetime | None,
+      end_date: datetime | None
+  ) -> tariff_structure.TariffStructure | None:
+    """Return a cached structure of the meter whose window contains
+    start_date-end_date. It counts as a slice hit only once the caller slices
+    it, see record_slice_hit."""
+    with self._lock:
+      for key in reversed(self._entries):
+        if key[0] == meter_id and covers(key, start_date, end_date):
+          self._entries.move_to_end(key)
+          return self._entries[key]
+    return None
+
+  def put(self, meter_id: int, start_date: datetime | None,
+          end_date: datetime | None,
+          structure: tariff_structure.TariffStructure) -> None:
+    key = (meter_id, start_date, end_date)
+    nbytes = get_structure_nbytes(structure)
+    if nbytes > self.max_bytes:
+      return
+    with self._lock:
+      self.invalidate_key(key)
+      self._entries[key] = copy_structure(structure)
+      self._nbytes[key] = nbytes
+      while (len(self._entries) > self.max_entries
+             or sum(self._nbytes.values()) > self.max_bytes):
+        oldest_key = next(iter(self._entries))
+        self.invalidate_key(oldest_key)
+        self._info.evictions += 1
+
+  def record_miss(self) -> None:
+    with self._lock:
+      self._info.misses += 1
+
+  def record_slice_hit(self) -> None:
+    with self._lock:
+      self._info.slice_hits += 1
+
+  def invalidate_key(self, key: CacheKey) -> None:
+    with self._lock:
+      self._entries.pop(key, None)
+      self._nbytes.pop(key, None)
+
+  def invalidate(self, meter_ids: list[int] | None = None) -> None:
+    """Remove the structures of the meters, or all structures if meter_ids is
+    None."""
+    with self._lock:
+      if meter_ids is None:
+        self._entries.clear()
+        self._nbytes.clear()
+        return
+      meter_ids = set(meter_ids)
+      for key in [key for key in self._entries if key[0] in meter_ids]:
+        self.invalidate_key(key)
+
+  def info(self) -> CacheInfo:
+    with self._lock:
+      return CacheInfo(
+          hits=self._info.hits,
+          slice_hits=self._info.slice_hits,
+          misses=self._info.misses,
+          evictions=self._info.evictions,
+          entries=len(self._entries),
+          nbytes=sum(self._nbytes.values()),
+      )
+
+
+def get_month_bounds(dates: pd.DatetimeIndex) -> tuple[datetime, datetime]:
+  """Return the first and last half-hour of the months of the invoice dates."""
+  months = dates.to_period("M")
+  return (months.min().to_timestamp(),
+          (months.max() + 1).to_timestamp() - pd.Timedelta(minutes=30))
@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from timeseries.economic import tariff_structure
+
+DEFAULT_BLOCK_PERIODS = 4096
+
+
+@dataclass
+class TariffComparison:
+  """Costs (GBP) of every candidate tariff for every site load profile.
+  Args:
+      costs: pd.DataFrame
+        The total costs, one row per tariff and one column per site.
+      component_costs: dict[str, pd.DataFrame]
+        The costs of each charge, in the same layout as costs.
+      coverage: pd.Series
+        The share of the periods priced by each tariff, unpriced periods cost
+        nothing.
+
+  Methods:
+      get_covered_costs() -> pd.DataFrame:
+          Return the costs of the tariffs pricing every period.
+      get_ranking() -> pd.DataFrame:
+          Return the rank of each fully covering tariff for each site, 1 being
+          the cheapest.
+      get_best_tariffs() -> pd.Series:
+          Return the cheapest fully covering tariff of each site, None if there
+          is none.
+  """
+  costs: pd.DataFrame
+  component_costs: dict[str, pd.DataFrame]
+  coverage: pd.Series
+
+  def get_covered_costs(self) -> pd.DataFrame:
+    """Return the costs of the tariffs pricing every period, the costs of the
+    others leave out the unpriced periods and cannot be compared."""
+    return self.costs.loc[self.coverage >= 1.0]
+
+  def get_ranking(self) -> pd.DataFrame:
+    return self.get_covered_costs().rank(axis=0, method="min").astype(int)
+
+  def get_best_tariffs(self) -> pd.Series:
+    covered_costs = self.get_covered_costs()
+    if covered_costs.empty:
+      return pd.Series(None, index=self.costs.columns, dtype=object)
+    return covered_costs.idxmin(axis=0)
+
+
+def get_tariff_charges(
+    tariffs: dict[str, tariff_structure.TariffStructure]
+) -> tuple[list[str], list[tuple[pd.Index, np.ndarray]]]:
+  """Return the charge names of all tariffs and the periods and (periods x
+  charges) charges of each tariff, 0 for the charges a tariff does not have."""
+  charge_names = []
+  for temp_structure in tariffs.values():
+    for temp_charges in temp_structure.list_consumption_charges:
+      if temp_charges.name not in charge_names:
+        charge_names.append(temp_charges.name)
+  tariff_charges = []
+  for temp_structure in tariffs.values():
+    dataf = temp_structure.get_consumption_charges_dataframe()
+    dataf = dataf[~dataf.index.duplicated(keep="last")]
+    dataf = dataf.reindex(columns=charge_names, fill_value=0.0)
+    tariff_charges.append((dataf.index, dataf.to_numpy(dtype=float)))
+  return charge_names, tariff_charges
+
+
+def stack_component_charges(tariff_charges: list[tuple[pd.Index, np.ndarray]],
+                            index: pd.DatetimeIndex) -> np.ndarray:
+  """Return the (charges x tariffs x periods) charges of get_tariff_charges
+  over index, NaN where a tariff has no value."""
+  nb_charges = tariff_charges[0][1].shape[1] if tariff_charges else 0
+  charges = np.empty((nb_charges, len(tariff_charges), len(index)))
+  for column, (periods, values) in enumerate(tariff_charges):
+    positions = periods.get_indexer(index)
+    charges[:, column] = np.where(positions >= 0, values[positions].T, np.nan)
+  return charges
+
+
+def stack_loads(sites: dict[str, pd.Series],
+                index: pd.DatetimeIndex) -> np.ndarray:
+  """Return the (sites x periods) loads in kWh, 0 where a load is not given."""
+  loads = np.zeros((len(sites), len(index)))
+  for row, load in enumerate(sites.values()):
+    loads[row] = load.reindex(index).fillna(0).values
+  return loads
+
+
+def compare_tariffs(
+    tariffs: dict[str, tariff_structure.TariffStructure],
+    sites: dict[str, pd.Series],
+    index: pd.DatetimeIndex,
+    block_periods: int = DEFAULT_BLOCK_PERIODS) -> TariffComparison:
+  """Compute the cost of every tariff for every site load (kWh per half-hour)
+  over index. The costs are (tariffs x periods) @ (periods x sites) matrix
+  products accumulated over blocks of block_periods periods, the charges being
+  stacked one block at a time."""
+  charge_names, tariff_charges = get_tariff_charges(tariffs)
+  loads = stack_loads(sites, index)
+  nb_priced = np.zeros(len(tariffs))
+  component_costs = np.zeros((len(charge_names), len(tariffs), len(sites)))
+  for start in range(0, len(index), block_periods):
+    block = slice(start, start + block_periods)
+    charges = stack_component_charges(tariff_charges, index[block])
+    nb_priced += (~np.isnan(charges).any(axis=0)).sum(axis=1)
+    component_costs += np.nan_to_num(charges) @ loads[:, block].T
+
+  tariff_names = list(tariffs)
+  site_names = list(sites)
+  return TariffComparison(
+      costs=pd.DataFrame(component_costs.sum(axis=0),
+                         index=tariff_names,
+                         columns=site_names),
+      component_costs={
+          name: pd.DataFrame(component_costs[row],
+                             index=tariff_names,
+                             columns=site_names)
+          for row, name in enumerate(charge_names)
+      },
+      coverage=pd.Series(nb_priced / len(index) if len(index) else 0.0,
+                         index=tariff_names),
+  )
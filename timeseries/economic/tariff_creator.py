@@ -1,10 +1,129 @@
-from timeseries.common import enums
+from timeseries.common import dataframe_backend, enums
 from dataclasses import dataclass, field
 import pandas as pd
 from pathlib import Path
 from timeseries.data import schema
 from datetime import timedelta, datetime
-from timeseries.economic import tariff_functions, tariff_structure
+from timeseries.economic import (billing_periods, edf_importer,
+                                 gas_reconciliation, load_reconstruction,
+                                 parallel_build,
+                                 tariff_cache, tariff_functions,
+                                 tariff_structure)
+
+EXCEL_SUFFIXES = (".xlsx", ".xlsm", ".xls")
+INVOICE_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y")
+GAS_DATE_FORMATS = ("%Y-%m-%d", )
+
+ELECTRICITY_COLUMNS = [
+    (schema.ImportElecSchema.INFO, schema.ImportElecSchema.ID),
+    (schema.ImportElecSchema.CARBON, schema.ImportElecSchema.CHARGE),
+    (
+        schema.ImportElecSchema.DISTRIBUTION,
+        schema.ImportElecSchema.GREEN,
+    ),
+    (
+        schema.ImportElecSchema.DISTRIBUTION,
+        schema.ImportElecSchema.AMBER,
+    ),
+    (
+        schema.ImportElecSchema.DISTRIBUTION,
+        schema.ImportElecSchema.RED,
+    ),
+    (
+        schema.ImportElecSchema.SUPPLY,
+        schema.ImportElecSchema.DAY,
+    ),
+    (
+        schema.ImportElecSchema.SUPPLY,
+        schema.ImportElecSchema.NIGHT,
+    ),
+]
+ELECTRICITY_CONSUMPTION_COLUMNS = [
+    (
+        schema.ImportElecSchema.DISTRIBUTION,
+        schema.ImportElecSchema.RED_CONSUMPTION,
+    ),
+    (
+        schema.ImportElecSchema.DISTRIBUTION,
+        schema.ImportElecSchema.AMBER_CONSUMPTION,
+    ),
+    (
+        schema.ImportElecSchema.DISTRIBUTION,
+        schema.ImportElecSchema.GREEN_CONSUMPTION,
+    ),
+    (
+        schema.ImportElecSchema.SUPPLY,
+        schema.ImportElecSchema.DAY_CONSUMPTION,
+    ),
+    (
+        schema.ImportElecSchema.SUPPLY,
+        schema.ImportElecSchema.NIGHT_CONSUMPTION,
+    ),
+    (
+        schema.ImportElecSchema.NETWORK,
+        schema.ImportElecSchema.PEAK,
+    ),
+]
+ELECTRICITY_NAMES = {
+    schema.ImportElecSchema.ID: schema.DataInputSchema.METERCODE,
+    schema.ImportElecSchema.CHARGE: schema.DataInputSchema.CCL,
+    schema.ImportElecSchema.GREEN: schema.DataInputSchema.DUOS_GREEN,
+    schema.ImportElecSchema.RED: schema.DataInputSchema.DUOS_RED,
+    schema.ImportElecSchema.AMBER: schema.DataInputSchema.DUOS_AMBER,
+    schema.ImportElecSchema.DAY: schema.DataInputSchema.DAY_CHARGE,
+    schema.ImportElecSchema.NIGHT: schema.DataInputSchema.NIGHT_CHARGE,
+    schema.ImportElecSchema.RED_CONSUMPTION:
+        schema.DataInputSchema.RED_CONSUMPTION,
+    schema.ImportElecSchema.AMBER_CONSUMPTION:
+        schema.DataInputSchema.AMBER_CONSUMPTION,
+    schema.ImportElecSchema.GREEN_CONSUMPTION:
+        schema.DataInputSchema.GREEN_CONSUMPTION,
+    schema.ImportElecSchema.DAY_CONSUMPTION:
+        schema.DataInputSchema.DAY_CONSUMPTION,
+    schema.ImportElecSchema.NIGHT_CONSUMPTION:
+        schema.DataInputSchema.NIGHT_CONSUMPTION,
+    schema.ImportElecSchema.PEAK: schema.DataInputSchema.PEAK_DEMAND,
+}
+GAS_COLUMNS = [
+    schema.ImportGasSchema.END_DATE,
+    schema.ImportGasSchema.ID,
+    schema.ImportGasSchema.CARBON,
+    schema.ImportGasSchema.GAS_RATE,
+]
+GAS_READING_COLUMNS = [
+    schema.ImportGasSchema.CONSUMPTION,
+    schema.ImportGasSchema.CONSUMPTION_CHARGE,
+    schema.ImportGasSchema.UNIT,
+    schema.ImportGasSchema.CORRECTION_FACTOR,
+    schema.ImportGasSchema.CALORIFIC_VALUE,
+    schema.ImportGasSchema.PRESENT_READING,
+    schema.ImportGasSchema.PRESENT_READING_TYPE,
+    schema.ImportGasSchema.PREVIOUS_READING,
+    schema.ImportGasSchema.PREVIOUS_READING_TYPE,
+]
+GAS_NAMES = {
+    schema.ImportGasSchema.ID: schema.DataInputSchema.METERCODE,
+    schema.ImportGasSchema.CARBON: schema.DataInputSchema.CCL,
+    schema.ImportGasSchema.GAS_RATE: schema.DataInputSchema.ENERGY_CHARGE,
+    schema.ImportGasSchema.END_DATE: schema.DataInputSchema.END_DATE,
+    schema.ImportGasSchema.CONSUMPTION:
+        schema.DataInputSchema.GAS_CONSUMPTION,
+    schema.ImportGasSchema.CONSUMPTION_CHARGE:
+        schema.DataInputSchema.GAS_CONSUMPTION_CHARGE,
+    schema.ImportGasSchema.UNIT: schema.DataInputSchema.METER_UNIT,
+    schema.ImportGasSchema.CORRECTION_FACTOR:
+        schema.DataInputSchema.CORRECTION_FACTOR,
+    schema.ImportGasSchema.CALORIFIC_VALUE:
+        schema.DataInputSchema.CALORIFIC_VALUE,
+    schema.ImportGasSchema.PRESENT_READING:
+        schema.DataInputSchema.PRESENT_READING,
+    schema.ImportGasSchema.PRESENT_READING_TYPE:
+        schema.DataInputSchema.PRESENT_READING_TYPE,
+    schema.ImportGasSchema.PREVIOUS_READING:
+        schema.DataInputSchema.PREVIOUS_READING,
+    schema.ImportGasSchema.PREVIOUS_READING_TYPE:
+        schema.DataInputSchema.PREVIOUS_READING_TYPE,
+}
 
 
 @dataclass
@@ -15,6 +134,16 @@ class EnergyTariffImporter:
         A name for the class object
       invoice_data_dict: dict[enums.EnergyCarrier, pd.DataFrame] = field(default_factory=dict)
         A dictionary with the energy carrier as the key and the tariff data as the value.
+      structure_cache: tariff_cache.TariffStructureCache = field(
+          default_factory=tariff_cache.TariffStructureCache)
+        The cache of the tariff structures, cleared by load_data and, for the
+        meters of the new invoices, by add_invoice_data.
+      backend: enums.DataFrameBackend = enums.DataFrameBackend.PANDAS
+        The engine reading and normalising the csv invoice files, the
+        normalised data is returned as pandas frames.
+      keep_gas_readings: bool = False
+        Whether the gas data keeps the billed kWh and charges and the meter
+        readings.
   
   Methods:
       load_data(invoice_path_dict: dict[enums.EnergyCarrier, Path]) -> None:
@@ -27,63 +156,152 @@ class EnergyTariffImporter:
           Rename the columns of the gas data.
       import_gas_data(org_dataf: pd.DataFrame) -> pd.DataFrame:
           Import the gas data.
+      import_electricity_table(table: pyarrow.Table) -> pd.DataFrame:
+          Import the electricity data read by the Arrow backend.
+      import_gas_table(table: pyarrow.Table) -> pd.DataFrame:
+          Import the gas data read by the Arrow backend.
       get_all_meter_ids() -> dict[enums.EnergyCarrier, list[int]]:
           Get all the meter ids.
       find_meter(meter_id: int) -> enums.EnergyCarrier:
           Find the meter id.
       filter_data(meter_id: int | None = None, start_date: datetime | None = None, end_date: datetime | None = None) -> pd.DataFrame:
           Filter the data.
+      get_invoice_dates(energy_carrier: enums.EnergyCarrier, meter_id: int,
+                        start_date: datetime | None,
+                        end_date: datetime | None) -> pd.DatetimeIndex:
+          Get the invoice dates of a meter.
       get_tariff_structure(meter_id: int, start_date: datetime | None = None, end_date: datetime | None = None) -> tariff_structure.TariffStructure | None:
           Get the tariff structure.
+      read_invoice_data(energy_carrier: enums.EnergyCarrier,
+                        temp_path: Path) -> pd.DataFrame:
+          Read and normalise an invoice file.
+      add_invoice_data(energy_carrier: enums.EnergyCarrier,
+                       new_dataf: pd.DataFrame) -> None:
+          Add normalised invoices, replacing re-issued invoices of the same
+          meter and month.
+      load_new_data(invoice_path_dict: dict[enums.EnergyCarrier, Path])
+                    -> dict[enums.EnergyCarrier, pd.DataFrame]:
+          Load new invoice files on top of the existing data.
+      update_tariff_structure(structure: tariff_structure.TariffStructure,
+                              meter_id: int,
+                              new_dataf: pd.DataFrame)
+                              -> tariff_structure.TariffStructure:
+          Splice the charges of new invoices into an existing tariff structure.
+      get_tariff_structures(meter_ids: list[int] | None = None,
+                            start_date: datetime | None = None,
+                            end_date: datetime | None = None,
+                            nb_workers: int = 1)
+                            -> dict[int, tariff_structure.TariffStructure]:
+          Get the tariff structures of many meters, built over a process pool.
+      get_sliced_tariff_structure(energy_carrier: enums.EnergyCarrier,
+                                  meter_id: int,
+                                  start_date: datetime | None,
+                                  end_date: datetime | None)
+                                  -> tariff_structure.TariffStructure | None:
+          Slice the tariff structure of a meter from a wider cached one.
+      get_cache_info() -> tariff_cache.CacheInfo:
+          Get the hit/miss statistics of the tariff structure cache.
+      get_billing_periods(meter_id: int) -> billing_periods.BillingPeriods:
+          Get the interval index of the billing periods of a meter.
+      get_billing_period_tariff_structure(
+          meter_id: int, index: pd.DatetimeIndex | None = None
+      ) -> tariff_structure.TariffStructure | None:
+          Get the tariff structure following the actual billing periods of a
+          meter.
+      get_load_profiles(meter_ids: list[int] | None = None,
+                        template: pd.Series | None = None,
+                        use_peak_demand: bool = False) -> pd.DataFrame:
+          Get the half-hourly loads of electricity meters estimated from their
+          invoiced band consumptions.
+      get_gas_discrepancies(meter_ids: list[int] | None = None)
+                            -> pd.DataFrame:
+          Get the gas invoice lines which billed kWh or charge do not match
+          their meter readings.
   """
   name: str
   invoice_data_dict: dict[enums.EnergyCarrier,
                           pd.DataFrame] = field(default_factory=dict)
+  structure_cache: tariff_cache.TariffStructureCache = field(
+      default_factory=tariff_cache.TariffStructureCache,
+      repr=False,
+      compare=False)
+  backend: enums.DataFrameBackend = enums.DataFrameBackend.PANDAS
+  keep_gas_readings: bool = False
 
   def load_data(self, invoice_path_dict: dict[enums.EnergyCarrier, Path]):
     invoice_data = {}
     for energy_carrier, temp_path in invoice_path_dict.items():
-      if energy_carrier is enums.EnergyCarrier.ELECTRICITY:
-        temp_dataf = pd.read_csv(temp_path, header=[0, 1], index_col=None)
-        temp_dataf = self.import_electricity_data(temp_dataf)
-      elif energy_carrier is enums.EnergyCarrier.NATURALGAS:
-        temp_dataf = pd.read_csv(temp_path)
-        temp_dataf = self.import_gas_data(temp_dataf)
-      else:
-        raise ValueError(
-            "Utility type must be enums.EnergyCarrier.ELECTRICITY or .NATURALGAS. Re-enter utility type."
-        )
-      invoice_data[energy_carrier] = temp_dataf
+      invoice_data[energy_carrier] = self.read_invoice_data(
+          energy_carrier, temp_path)
     self.invoice_data_dict = invoice_data
+    self.structure_cache.invalidate()
+
+  def read_invoice_data(self, energy_carrier: enums.EnergyCarrier,
+                        temp_path: Path) -> pd.DataFrame:
+    if (energy_carrier is enums.EnergyCarrier.ELECTRICITY
+        and Path(temp_path).suffix.lower() in EXCEL_SUFFIXES):
+      return edf_importer.import_edf_data(temp_path)
+    backend = dataframe_backend.get_backend(self.backend)
+    is_arrow = self.backend is enums.DataFrameBackend.ARROW
+    if energy_carrier is enums.EnergyCarrier.ELECTRICITY:
+      temp_data = backend.read_csv(temp_path, nb_header_rows=2)
+      if is_arrow:
+        return self.import_electricity_table(temp_data)
+      return self.import_electricity_data(temp_data)
+    if energy_carrier is enums.EnergyCarrier.NATURALGAS:
+      temp_data = backend.read_csv(temp_path)
+      if is_arrow:
+        return self.import_gas_table(temp_data)
+      return self.import_gas_data(temp_data)
+    raise ValueError(
+        "Utility type must be enums.EnergyCarrier.ELECTRICITY or .NATURALGAS. "
+        "Re-enter utility type.")
+
+  def add_invoice_data(self, energy_carrier: enums.EnergyCarrier,
+                       new_dataf: pd.DataFrame) -> None:
+    """Add normalised invoice rows to the existing data.
+    An invoice for a meter and month that is already known replaces the old
+    one."""
+    self.structure_cache.invalidate(
+        list(new_dataf[schema.DataInputSchema.METERCODE].unique()))
+    if energy_carrier not in self.invoice_data_dict:
+      self.invoice_data_dict[energy_carrier] = new_dataf
+      return
+    dataf = self.invoice_data_dict[energy_carrier]
+    old_keys = pd.MultiIndex.from_arrays([
+        dataf[schema.DataInputSchema.METERCODE],
+        dataf.index.to_period("M")
+    ])
+    new_keys = pd.MultiIndex.from_arrays([
+        new_dataf[schema.DataInputSchema.METERCODE],
+        new_dataf.index.to_period("M")
+    ])
+    dataf = dataf.loc[~old_keys.isin(new_keys)]
+    self.invoice_data_dict[energy_carrier] = pd.concat([dataf, new_dataf])
+
+  def load_new_data(
+      self, invoice_path_dict: dict[enums.EnergyCarrier, Path]
+  ) -> dict[enums.EnergyCarrier, pd.DataFrame]:
+    """Load new invoice files on top of the existing data and return the new
+    rows."""
+    new_data = {}
+    for energy_carrier, temp_path in invoice_path_dict.items():
+      new_dataf = self.read_invoice_data(energy_carrier, temp_path)
+      self.add_invoice_data(energy_carrier, new_dataf)
+      new_data[energy_carrier] = new_dataf
+    return new_data
 
   def rename_columns_electricity_data(
       self, elec_dataf: pd.DataFrame) -> pd.DataFrame:
-    rename_dict = {
-        schema.ImportElecSchema.ID: schema.DataInputSchema.METERCODE,
-        schema.ImportElecSchema.CHARGE: schema.DataInputSchema.CCL,
-        schema.ImportElecSchema.GREEN: schema.DataInputSchema.DUOS_GREEN,
-        schema.ImportElecSchema.RED: schema.DataInputSchema.DUOS_RED,
-        schema.ImportElecSchema.AMBER: schema.DataInputSchema.DUOS_AMBER,
-        schema.ImportElecSchema.DAY: schema.DataInputSchema.DAY_CHARGE,
-        schema.ImportElecSchema.NIGHT: schema.DataInputSchema.NIGHT_CHARGE,
-    }
     elec_dataf.index.name = schema.DataInputSchema.INDEX
-    return elec_dataf.rename(columns=rename_dict)
+    return elec_dataf.rename(columns=ELECTRICITY_NAMES)
 
   def import_electricity_data(self, org_dataf: pd.DataFrame) -> pd.DataFrame:
 
-    try:
-      org_dataf.index = pd.to_datetime(
-          org_dataf[schema.ImportElecSchema.INFO][
-              schema.ImportElecSchema.START_DATE],
-          format="%Y-%m-%d",
-      )
-    except ValueError:
-      org_dataf.index = pd.to_datetime(
-          org_dataf[schema.ImportElecSchema.INFO][
-              schema.ImportElecSchema.START_DATE],
-          format="%d/%m/%Y",
-      )
+    org_dataf.index = parse_invoice_dates(org_dataf[
+        schema.ImportElecSchema.INFO][schema.ImportElecSchema.START_DATE])
+    end_dates = parse_invoice_dates(org_dataf[schema.ImportElecSchema.INFO][
+        schema.ImportElecSchema.END_DATE])
     cols_to_drop = [
         schema.ImportElecSchema.START_DATE, schema.ImportElecSchema.END_DATE
     ]
@@ -93,58 +311,79 @@ class EnergyTariffImporter:
         level=1,
         inplace=True,
     )
-    elec_raw = org_dataf.loc[:, [
-        (schema.ImportElecSchema.INFO, schema.ImportElecSchema.ID),
-        (schema.ImportElecSchema.CARBON, schema.ImportElecSchema.CHARGE),
-        (
-            schema.ImportElecSchema.DISTRIBUTION,
-            schema.ImportElecSchema.GREEN,
-        ),
-        (
-            schema.ImportElecSchema.DISTRIBUTION,
-            schema.ImportElecSchema.AMBER,
-        ),
-        (
-            schema.ImportElecSchema.DISTRIBUTION,
-            schema.ImportElecSchema.RED,
-        ),
-        (
-            schema.ImportElecSchema.SUPPLY,
-            schema.ImportElecSchema.DAY,
-        ),
-        (
-            schema.ImportElecSchema.SUPPLY,
-            schema.ImportElecSchema.NIGHT,
-        ),
-    ], ].copy()
+    elec_raw = org_dataf.loc[:,
+                             get_electricity_columns(org_dataf.columns)].copy()
     elec_raw.columns = elec_raw.columns.droplevel()
+    elec_raw[schema.DataInputSchema.END_DATE] = end_dates.values
     elec_raw = self.rename_columns_electricity_data(elec_raw)
     return elec_raw
 
+  def import_electricity_table(self, table) -> pd.DataFrame:
+    """Normalise the electricity invoices of an Arrow table as
+    import_electricity_data does, the table being converted once normalised."""
+    start_dates = dataframe_backend.parse_dates(
+        table.column(
+            dataframe_backend.get_column_name(
+                (schema.ImportElecSchema.INFO,
+                 schema.ImportElecSchema.START_DATE))), INVOICE_DATE_FORMATS)
+    end_dates = dataframe_backend.parse_dates(
+        table.column(
+            dataframe_backend.get_column_name(
+                (schema.ImportElecSchema.INFO,
+                 schema.ImportElecSchema.END_DATE))), INVOICE_DATE_FORMATS)
+    columns = get_electricity_columns([
+        x for x in ELECTRICITY_CONSUMPTION_COLUMNS
+        if dataframe_backend.get_column_name(x) in table.column_names
+    ])
+    table = dataframe_backend.select_columns(
+        table, columns, [ELECTRICITY_NAMES[label[1]] for label in columns])
+    table = table.add_column(0, schema.DataInputSchema.INDEX, start_dates)
+    table = table.append_column(schema.DataInputSchema.END_DATE, end_dates)
+    return dataframe_backend.ArrowBackend().to_pandas(
+        table, schema.DataInputSchema.INDEX)
+
   def rename_columns_gas_data(self, gas_dataf: pd.DataFrame) -> pd.DataFrame:
-    rename_dict = {
-        schema.ImportGasSchema.ID: schema.DataInputSchema.METERCODE,
-        schema.ImportGasSchema.CARBON: schema.DataInputSchema.CCL,
-        schema.ImportGasSchema.GAS_RATE: schema.DataInputSchema.ENERGY_CHARGE
-    }
     gas_dataf.index.name = schema.DataInputSchema.INDEX
-    return gas_dataf.rename(columns=rename_dict)
+    return gas_dataf.rename(columns=GAS_NAMES)
+
+  def get_gas_columns(self) -> list[str]:
+    """Return the gas columns kept, with the meter readings if
+    keep_gas_readings."""
+    if self.keep_gas_readings:
+      return GAS_COLUMNS + GAS_READING_COLUMNS
+    return GAS_COLUMNS
 
   def import_gas_data(self, org_dataf: pd.DataFrame) -> pd.DataFrame:
-    gas_raw = org_dataf[[
-        schema.ImportGasSchema.START_DATE,
-        schema.ImportGasSchema.ID,
-        schema.ImportGasSchema.CARBON,
-        schema.ImportGasSchema.GAS_RATE,
-    ]].copy()
+    columns = [schema.ImportGasSchema.START_DATE] + self.get_gas_columns()
+    gas_raw = org_dataf[columns].copy()
 
     gas_raw.index = pd.to_datetime(gas_raw[schema.ImportGasSchema.START_DATE],
                                    format="%Y-%m-%d") + timedelta(1)
+    gas_raw[schema.ImportGasSchema.END_DATE] = pd.to_datetime(
+        gas_raw[schema.ImportGasSchema.END_DATE], format="%Y-%m-%d")
     gas_raw.drop(schema.ImportGasSchema.START_DATE,
                  axis="columns",
                  inplace=True)
     return self.rename_columns_gas_data(gas_raw)
 
+  def import_gas_table(self, table) -> pd.DataFrame:
+    """Normalise the gas invoices of an Arrow table as import_gas_data does,
+    the table being converted once normalised."""
+    start_dates = dataframe_backend.parse_dates(
+        table.column(schema.ImportGasSchema.START_DATE), GAS_DATE_FORMATS,
+        timedelta(1))
+    end_dates = dataframe_backend.parse_dates(
+        table.column(schema.ImportGasSchema.END_DATE), GAS_DATE_FORMATS)
+    columns = self.get_gas_columns()
+    table = dataframe_backend.select_columns(
+        table, columns, [GAS_NAMES[col] for col in columns])
+    table = table.set_column(
+        table.schema.get_field_index(schema.DataInputSchema.END_DATE),
+        schema.DataInputSchema.END_DATE, end_dates)
+    table = table.add_column(0, schema.DataInputSchema.INDEX, start_dates)
+    return dataframe_backend.ArrowBackend().to_pandas(
+        table, schema.DataInputSchema.INDEX)
+
   def get_all_meter_ids(self) -> dict[enums.EnergyCarrier, list[int]]:
     dict_meter_ids = {}
     for energy_carrier, temp_dataf in self.invoice_data_dict.items():
@@ -179,19 +418,230 @@ class EnergyTariffImporter:
         dataf = dataf.loc[filt]
     return dataf
 
+  def get_invoice_dates(self, energy_carrier: enums.EnergyCarrier,
+                        meter_id: int, start_date: datetime | None,
+                        end_date: datetime | None) -> pd.DatetimeIndex:
+    """Return the invoice dates of a meter between start_date and end_date,
+    without copying the invoice data."""
+    dataf = self.invoice_data_dict[energy_carrier]
+    dates = dataf.index[dataf[schema.DataInputSchema.METERCODE] == meter_id]
+    if start_date is not None:
+      dates = dates[dates >= start_date]
+    if end_date is not None:
+      dates = dates[dates <= end_date]
+    return dates
+
   def get_tariff_structure(
       self,
       meter_id: int,
       start_date: datetime | None = None,
-      end_date: datetime | None = None
+      end_date: datetime | None = None,
+      nb_workers: int = 1,
   ) -> tariff_structure.TariffStructure | None:
+    """Return the tariff structure of a meter, from the cache when possible,
+    None if the meter is unknown or has no invoices in the window.
+    A window contained in a cached window is answered by slicing the cached
+    structure."""
+    structure = self.structure_cache.get(meter_id, start_date, end_date)
+    if structure is not None:
+      return structure
     energy_carrier = self.find_meter(meter_id)
-    if energy_carrier is not enums.EnergyCarrier.NONE:
+    if energy_carrier is enums.EnergyCarrier.NONE:
+      return None
+    structure = self.get_sliced_tariff_structure(energy_carrier, meter_id,
+                                                 start_date, end_date)
+    if structure is not None:
+      return structure
+    dataf = self.filter_data(meter_id, start_date, end_date)
+    if dataf.empty:
+      return None
+    self.structure_cache.record_miss()
+    structure = create_tariff_structure(energy_carrier, dataf, nb_workers)
+    self.structure_cache.put(meter_id, start_date, end_date, structure)
+    return structure
+
+  def get_tariff_structures(
+      self,
+      meter_ids: list[int] | None = None,
+      start_date: datetime | None = None,
+      end_date: datetime | None = None,
+      nb_workers: int = 1,
+  ) -> dict[int, tariff_structure.TariffStructure]:
+    """Return the tariff structures of the meters (all meters by default).
+    The structures missing from the cache are built over nb_workers
+    processes."""
+    if meter_ids is None:
+      meter_ids = [
+          x for list_meters in self.get_all_meter_ids().values()
+          for x in list_meters
+      ]
+    if nb_workers <= 1:
+      return {
+          meter_id: self.get_tariff_structure(meter_id, start_date, end_date)
+          for meter_id in meter_ids
+      }
+    structures = {}
+    missing_data = {}
+    for meter_id in meter_ids:
+      structures[meter_id] = self.structure_cache.get(meter_id, start_date,
+                                                      end_date)
+      energy_carrier = self.find_meter(meter_id)
+      if (structures[meter_id] is not None
+          or energy_carrier is enums.EnergyCarrier.NONE):
+        continue
+      structures[meter_id] = self.get_sliced_tariff_structure(
+          energy_carrier, meter_id, start_date, end_date)
+      if structures[meter_id] is not None:
+        continue
       dataf = self.filter_data(meter_id, start_date, end_date)
-      if energy_carrier is enums.EnergyCarrier.ELECTRICITY:
-        return tariff_functions.create_import_electricity_tariff_structure_from_data(
-            dataf)
-      elif energy_carrier is enums.EnergyCarrier.NATURALGAS:
-        return tariff_functions.create_import_gas_tariff_structure_from_data(
-            dataf)
+      if not dataf.empty:
+        missing_data.setdefault(energy_carrier, {})[meter_id] = dataf
+    for energy_carrier, dict_dataf in missing_data.items():
+      list_structures = parallel_build.build_structures_in_parallel(
+          get_structure_builder(energy_carrier), list(dict_dataf.values()),
+          nb_workers)
+      for meter_id, structure in zip(dict_dataf, list_structures):
+        self.structure_cache.record_miss()
+        self.structure_cache.put(meter_id, start_date, end_date, structure)
+        structures[meter_id] = structure
+    return structures
+
+  def get_sliced_tariff_structure(
+      self, energy_carrier: enums.EnergyCarrier, meter_id: int,
+      start_date: datetime | None, end_date: datetime | None
+  ) -> tariff_structure.TariffStructure | None:
+    """Return the structure of a meter sliced from a cached structure whose
+    window contains start_date-end_date, None if there is none."""
+    wider_structure = self.structure_cache.get_covering(
+        meter_id, start_date, end_date)
+    if wider_structure is None:
+      return None
+    dates = self.get_invoice_dates(energy_carrier, meter_id, start_date,
+                                   end_date)
+    if dates.empty:
+      return None
+    self.structure_cache.record_slice_hit()
+    return wider_structure.get_slice(*tariff_cache.get_month_bounds(dates))
+
+  def get_cache_info(self) -> tariff_cache.CacheInfo:
+    return self.structure_cache.info()
+
+  def get_billing_periods(self,
+                          meter_id: int) -> billing_periods.BillingPeriods:
+    """Return the billing periods of the invoices of a meter, to look up the
+    invoice of each half-hour and find the gaps and overlaps between
+    invoices."""
+    return billing_periods.BillingPeriods.from_dataframe(
+        self.filter_data(meter_id))
+
+  def get_billing_period_tariff_structure(
+      self,
+      meter_id: int,
+      index: pd.DatetimeIndex | None = None
+  ) -> tariff_structure.TariffStructure | None:
+    """Return the tariff structure of a meter following its actual billing
+    periods rather than calendar months. Such structures are not cached."""
+    energy_carrier = self.find_meter(meter_id)
+    if energy_carrier is enums.EnergyCarrier.NONE:
+      return None
+    return tariff_functions.create_tariff_structure_from_billing_periods(
+        self.filter_data(meter_id), energy_carrier, index)
+
+  def get_load_profiles(self,
+                        meter_ids: list[int] | None = None,
+                        template: pd.Series | None = None,
+                        use_peak_demand: bool = False) -> pd.DataFrame:
+    """Return the half-hourly load (kWh) of the electricity meters (all by
+    default) reconstructed from the band consumptions of their invoices, one
+    column per meter."""
+    dataf = self.invoice_data_dict.get(enums.EnergyCarrier.ELECTRICITY,
+                                       pd.DataFrame())
+    if dataf.empty:
+      return pd.DataFrame()
+    required_columns = list(load_reconstruction.BAND_CONSUMPTIONS.values())
+    if use_peak_demand:
+      required_columns.append(schema.DataInputSchema.PEAK_DEMAND)
+    missing_columns = [x for x in required_columns if x not in dataf.columns]
+    if missing_columns:
+      raise ValueError("The electricity data has no "
+                       f"{', '.join(missing_columns)} columns to reconstruct "
+                       "the load profiles from.")
+    if meter_ids is not None:
+      dataf = dataf.loc[dataf[schema.DataInputSchema.METERCODE].isin(
+          meter_ids)]
+    return load_reconstruction.reconstruct_load_profiles(
+        dataf, template, use_peak_demand)
+
+  def get_gas_discrepancies(self,
+                            meter_ids: list[int] | None = None
+                            ) -> pd.DataFrame:
+    """Return the gas invoice lines of the meters (all by default) which billed
+    kWh or consumption charge do not match the energy converted from their
+    meter readings."""
+    if enums.EnergyCarrier.NATURALGAS not in self.invoice_data_dict:
+      raise ValueError("No gas data was loaded.")
+    dataf = self.invoice_data_dict[enums.EnergyCarrier.NATURALGAS]
+    if schema.DataInputSchema.PRESENT_READING not in dataf.columns:
+      raise ValueError("The gas data was imported without its meter readings, "
+                       "set keep_gas_readings.")
+    if meter_ids is not None:
+      dataf = dataf.loc[dataf[schema.DataInputSchema.METERCODE].isin(
+          meter_ids)]
+    return gas_reconciliation.reconcile_gas_invoices(dataf)
+
+  def update_tariff_structure(
+      self, structure: tariff_structure.TariffStructure, meter_id: int,
+      new_dataf: pd.DataFrame) -> tariff_structure.TariffStructure:
+    """Splice the charges of the new invoices of a meter into an existing
+    tariff structure. Only the months covered by the new invoices are
+    generated."""
+    dataf = new_dataf.loc[new_dataf[schema.DataInputSchema.METERCODE] ==
+                          meter_id]
+    if not dataf.empty:
+      new_structure = create_tariff_structure(structure.energy_carrier,
+                                              dataf)
+      structure.update_charges(new_structure)
+    return structure
+
+
+def get_electricity_columns(columns) -> list[tuple[str, str]]:
+  """Return the electricity columns to import, the consumption and peak demand
+  columns only when they are among columns, as rates-only invoices lack
+  them."""
+  columns = set(columns)
+  return ELECTRICITY_COLUMNS + [
+      x for x in ELECTRICITY_CONSUMPTION_COLUMNS if x in columns
+  ]
+
+
+def parse_invoice_dates(dates: pd.Series) -> pd.Series:
+  """Parse invoice dates written either as YYYY-MM-DD or as DD/MM/YYYY."""
+  try:
+    return pd.to_datetime(dates, format="%Y-%m-%d")
+  except ValueError:
+    return pd.to_datetime(dates, format="%d/%m/%Y")
+
+
+def get_structure_builder(
+    energy_carrier: enums.EnergyCarrier
+) -> parallel_build.StructureBuilder | None:
+  """Return the function creating the import tariff structure of an energy
+  carrier."""
+  if energy_carrier is enums.EnergyCarrier.ELECTRICITY:
+    return (
+        tariff_functions.create_import_electricity_tariff_structure_from_data)
+  if energy_carrier is enums.EnergyCarrier.NATURALGAS:
+    return tariff_functions.create_import_gas_tariff_structure_from_data
+  return None
+
+
+def create_tariff_structure(
+    energy_carrier: enums.EnergyCarrier,
+    dataf: pd.DataFrame,
+    nb_workers: int = 1) -> tariff_structure.TariffStructure | None:
+  """Create the import tariff structure of an energy carrier from invoice
+  data."""
+  builder = get_structure_builder(energy_carrier)
+  if builder is None:
     return None
+  return builder(dataf, nb_workers=nb_workers)
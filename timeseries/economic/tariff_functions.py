@@ -1,5 +1,6 @@
 import copy
 from datetime import date, datetime, time, timedelta
+from functools import lru_cache
 from pathlib import Path
 
 import numpy as np
@@ -7,42 +8,42 @@ import pandas as pd
 
 from timeseries.common import datetime_functions, enums
 from timeseries.data import schema
-from timeseries.economic import tariff_structure
+from timeseries.economic import (billing_periods, parallel_build,
+                                 tariff_structure, time_of_use)
 
+MONTH_PROFILE_CACHE_SIZE = 4096
 
-def create_duos_electricity_charges(**args) -> pd.Series:
+
+def create_duos_electricity_charges(
+    rules: time_of_use.TimeOfUseRules = time_of_use.DUOS_RULES,
+    **args) -> pd.Series:
   """Create a Series to represent the DUOS charges for electricity.
   Date is the date of the charges
   Green_charges is in £/kWh
   Amber_charges is in £/kWh
   Red_charges is in £/kWh
 
-  Sets the charges for the green band, amber band and red band for given times of the day.
+  Sets the charges for the green band, amber band and red band for the times of
+  the day defined by the time of use rules.
   """
   temp_date = args["Date"].date()
-  green_charges = args[schema.DataInputSchema.DUOS_GREEN]
-  amber_charges = args[schema.DataInputSchema.DUOS_AMBER]
-  red_charges = args[schema.DataInputSchema.DUOS_RED]
+  return get_month_series(temp_date, rules, get_band_rates(rules, args))
 
-  temp_series = get_date_range(temp_date)
-  time_index = temp_series.index.time
-  day_of_week_index = temp_series.index.day_of_week
-
-  temp_series.loc[:] = green_charges  # green price
-  period_filter_red_band = ((day_of_week_index < 5)
-                            & (time_index >= time(16, 00))
-                            & (time_index < time(19, 00)))
-  temp_series.loc[period_filter_red_band] = red_charges  # red price
-  period_filter_amber_band = ((day_of_week_index < 5)
-                              & (time_index >= time(7, 00))
-                              & (time_index < time(16, 00)))
-  temp_series.loc[period_filter_amber_band] = amber_charges  # amber price
-  period_filter_amber_band = ((day_of_week_index < 5)
-                              & (time_index >= time(19, 00))
-                              & (time_index < time(23, 00)))
-  temp_series.loc[period_filter_amber_band] = amber_charges  # amber price
 
-  return temp_series
+def get_duos_band_masks(
+    index: pd.DatetimeIndex,
+    rules: time_of_use.TimeOfUseRules = time_of_use.DUOS_RULES
+) -> dict[str, np.ndarray]:
+  """Return the boolean masks of the DUOS red, amber and green bands."""
+  return time_of_use.get_band_masks(index, rules)
+
+
+def get_day_night_masks(
+    index: pd.DatetimeIndex,
+    rules: time_of_use.TimeOfUseRules = time_of_use.DAY_NIGHT_RULES
+) -> dict[str, np.ndarray]:
+  """Return the boolean masks of the day and night charges."""
+  return time_of_use.get_band_masks(index, rules)
 
 
 def create_duos_gas_charges(**args):
@@ -58,32 +59,73 @@ def create_duos_gas_charges(**args):
 
 def create_series_with_default_value(default_value_col: str, **args):
   temp_date = args["Date"].date()
-  default_value_col = args[default_value_col]
-  temp_series = get_date_range(temp_date)
-  temp_series.fillna(default_value_col, inplace=True)
-  return temp_series
+  return get_month_series(temp_date, None, (float(args[default_value_col]), ))
 
 
-def create_day_night_series(**args) -> pd.Series:
+def create_day_night_series(
+    rules: time_of_use.TimeOfUseRules = time_of_use.DAY_NIGHT_RULES,
+    **args) -> pd.Series:
   """Create a Series to represent a day/night tariff.
-    Day tariff is set to be between 7 am and 12pm.
+    By default, day tariff is set to be between 7 am and 12pm.
     Day_charges is in £/kWh
     Night_charges is in £/kWh"""
   temp_date = args["Date"].date()
-  day_charges = args[schema.DataInputSchema.DAY_CHARGE]
-  night_charges = args[schema.DataInputSchema.NIGHT_CHARGE]
+  return get_month_series(temp_date, rules, get_band_rates(rules, args))
+
+
+def get_band_rates(rules: time_of_use.TimeOfUseRules,
+                   args: dict) -> tuple[float, ...]:
+  """Return the rates of the bands of the rules, in the order of
+  rules.bands."""
+  return tuple(float(args[band]) for band in rules.bands)
 
-  temp_series = get_date_range(temp_date)
-  time_index = temp_series.index.time
-  temp_series.loc[:] = night_charges
-  period_filter_day_charges = time_index >= time(7, 00)
-  temp_series.loc[period_filter_day_charges] = day_charges
-  return temp_series
+
+@lru_cache(maxsize=MONTH_PROFILE_CACHE_SIZE)
+def get_month_index(year: int, month: int) -> pd.DatetimeIndex:
+  """Return the half-hourly index of a month."""
+  return get_date_range(date(year, month, 1)).index
+
+
+@lru_cache(maxsize=MONTH_PROFILE_CACHE_SIZE)
+def get_month_profile(year: int, month: int,
+                      rules: time_of_use.TimeOfUseRules | None,
+                      rates: tuple[float, ...]) -> np.ndarray:
+  """Return the read-only half-hourly charges of a month.
+  Profiles are cached by (month, rates, rules) so that the months of meters on
+  the same rates are generated once, rules None is a flat rate. The structures
+  built from them concatenate copies, the memory is not shared."""
+  index = get_month_index(year, month)
+  if rules is None:
+    profile = np.full(len(index), rates[0])
+  else:
+    profile = time_of_use.apply_rates(index, rules,
+                                      dict(zip(rules.bands, rates)))
+  profile.flags.writeable = False
+  return profile
+
+
+def get_month_series(target_month: date,
+                     rules: time_of_use.TimeOfUseRules | None,
+                     rates: tuple[float, ...]) -> pd.Series:
+  """Return a series viewing the cached charges of the month of target_month,
+  to be copied by the concatenation of the months."""
+  return pd.Series(get_month_profile(target_month.year, target_month.month,
+                                     rules, rates),
+                   index=get_month_index(target_month.year,
+                                         target_month.month),
+                   copy=False)
 
 
 def create_import_gas_tariff_structure_from_data(
-    dataf: pd.DataFrame, ) -> tariff_structure.TariffStructure:
-  """Create a tariff structure based on the value of a dataframe compliant with the gas import schema."""
+    dataf: pd.DataFrame,
+    nb_workers: int = 1,
+) -> tariff_structure.TariffStructure:
+  """Create a tariff structure based on the value of a dataframe compliant with
+  the gas import schema. With nb_workers > 1 the months are built over a
+  process pool."""
+  if nb_workers > 1:
+    return parallel_build.build_structures_in_parallel(
+        create_import_gas_tariff_structure_from_data, [dataf], nb_workers)[0]
   dataf = dataf.reset_index()
   ccl_charges = pd.concat([
       create_series_with_default_value(schema.DataInputSchema.CCL, **args)
@@ -114,17 +156,31 @@ def create_import_gas_tariff_structure_from_data(
 
 
 def create_import_electricity_tariff_structure_from_data(
-    dataf: pd.DataFrame, ) -> tariff_structure.TariffStructure:
-  """Create a tariff structure based on the value of a dataframe compliant with the electricity import schema."""
+    dataf: pd.DataFrame,
+    duos_rules: time_of_use.TimeOfUseRules = time_of_use.DUOS_RULES,
+    day_night_rules: time_of_use.TimeOfUseRules = time_of_use.DAY_NIGHT_RULES,
+    nb_workers: int = 1,
+) -> tariff_structure.TariffStructure:
+  """Create a tariff structure based on the value of a dataframe compliant with
+  the electricity import schema. With nb_workers > 1 the months are built over
+  a process pool."""
+  if nb_workers > 1:
+    return parallel_build.build_structures_in_parallel(
+        create_import_electricity_tariff_structure_from_data, [dataf],
+        nb_workers,
+        duos_rules=duos_rules,
+        day_night_rules=day_night_rules)[0]
   dataf = dataf.reset_index()
-  day_night_charges = pd.concat(
-      [create_day_night_series(**args) for args in dataf.to_dict("records")])
+  day_night_charges = pd.concat([
+      create_day_night_series(day_night_rules, **args)
+      for args in dataf.to_dict("records")
+  ])
   ccl_charges = pd.concat([
       create_series_with_default_value(schema.DataInputSchema.CCL, **args)
       for args in dataf.to_dict("records")
   ])
   duos_charges = pd.concat([
-      create_duos_electricity_charges(**args)
+      create_duos_electricity_charges(duos_rules, **args)
       for args in dataf.to_dict("records")
   ])
   climate_change_levy = tariff_structure.ConsumptionCharges(
@@ -147,6 +203,123 @@ def create_import_electricity_tariff_structure_from_data(
   return electricity_tariff_structure
 
 
+def create_tariff_structure_from_billing_periods(
+    dataf: pd.DataFrame,
+    energy_carrier: enums.EnergyCarrier,
+    index: pd.DatetimeIndex | None = None,
+    duos_rules: time_of_use.TimeOfUseRules = time_of_use.DUOS_RULES,
+    day_night_rules: time_of_use.TimeOfUseRules = time_of_use.DAY_NIGHT_RULES,
+) -> tariff_structure.TariffStructure:
+  """Create an import tariff structure from the actual billing periods of the
+  invoices instead of their calendar months, over index (by default the
+  half-hours of all periods). Half-hours without invoice are NaN, where
+  invoices overlap the one starting last is used."""
+  periods = billing_periods.BillingPeriods.from_dataframe(dataf)
+  if index is None:
+    index = periods.get_index()
+  positions = periods.get_positions(index)
+  charges = {
+      schema.DataInputSchema.CCL:
+          billing_periods.expand_invoice_values(
+              dataf, [schema.DataInputSchema.CCL], positions)[:, 0]
+  }
+  if energy_carrier is enums.EnergyCarrier.ELECTRICITY:
+    charges[schema.DataInputSchema.DUOS] = (
+        billing_periods.expand_time_of_use_charges(dataf, index, positions,
+                                                   duos_rules))
+    charges[schema.DataInputSchema.ENERGY_CHARGE] = (
+        billing_periods.expand_time_of_use_charges(dataf, index, positions,
+                                                   day_night_rules))
+  elif energy_carrier is enums.EnergyCarrier.NATURALGAS:
+    charges[schema.DataInputSchema.ENERGY_CHARGE] = (
+        billing_periods.expand_invoice_values(
+            dataf, [schema.DataInputSchema.ENERGY_CHARGE], positions)[:, 0])
+  else:
+    raise ValueError(
+        "Utility type must be enums.EnergyCarrier.ELECTRICITY or .NATURALGAS.")
+  return tariff_structure.TariffStructure(
+      energy_carrier=energy_carrier,
+      destination=enums.Destination.IMPORT,
+      origin=enums.TechnologyType.GRID,
+      list_consumption_charges=[
+          tariff_structure.ConsumptionCharges(name,
+                                              pd.Series(values, index=index))
+          for name, values in charges.items()
+      ],
+  )
+
+
+def create_flat_rate_tariff_structure_from_data(
+    dataf: pd.DataFrame, energy_carrier: enums.EnergyCarrier,
+    destination: enums.Destination,
+    origin: enums.TechnologyType) -> tariff_structure.TariffStructure:
+  """Create a tariff structure with one flat monthly charge per column of a
+  monthly dataframe."""
+  dataf = dataf.reset_index()
+  charge_columns = [
+      col for col in dataf.columns
+      if col not in (schema.DataInputSchema.INDEX,
+                     schema.DataInputSchema.METERCODE)
+  ]
+  list_charges = []
+  for col in charge_columns:
+    charges = pd.concat([
+        create_series_with_default_value(col, **args)
+        for args in dataf.to_dict("records")
+    ])
+    list_charges.append(tariff_structure.ConsumptionCharges(col, charges))
+  return tariff_structure.TariffStructure(
+      energy_carrier=energy_carrier,
+      destination=destination,
+      origin=origin,
+      list_consumption_charges=list_charges,
+  )
+
+
+def create_tariff_structure_from_hh_data(
+    dataf: pd.DataFrame, energy_carrier: enums.EnergyCarrier,
+    destination: enums.Destination,
+    origin: enums.TechnologyType) -> tariff_structure.TariffStructure:
+  """Create a tariff structure with one charge per column of a half-hourly
+  dataframe."""
+  list_charges = [
+      tariff_structure.ConsumptionCharges(col, dataf[col])
+      for col in dataf.columns if col != schema.DataInputSchema.METERCODE
+  ]
+  return tariff_structure.TariffStructure(
+      energy_carrier=energy_carrier,
+      destination=destination,
+      origin=origin,
+      list_consumption_charges=list_charges,
+  )
+
+
+def create_export_electricity_tariff_structure_from_data(
+    dataf: pd.DataFrame,
+    half_hourly: bool = False) -> tariff_structure.TariffStructure:
+  """Create an export tariff structure based on a dataframe standardised with
+  tariff_schema.BaseExportElectricityPriceSchema. The charges are export
+  revenues in £/kWh."""
+  create_function = (create_tariff_structure_from_hh_data if half_hourly else
+                     create_flat_rate_tariff_structure_from_data)
+  return create_function(dataf, enums.EnergyCarrier.ELECTRICITY,
+                         enums.Destination.EXPORT, enums.TechnologyType.SITE)
+
+
+def create_onsite_electricity_tariff_structure_from_data(
+    dataf: pd.DataFrame,
+    half_hourly: bool = False,
+    origin: enums.TechnologyType = enums.TechnologyType.WINDTURBINE
+) -> tariff_structure.TariffStructure:
+  """Create an onsite generation tariff structure based on a dataframe
+  standardised with tariff_schema.BaseWindElectricityPriceSchema. The charges
+  are in £/kWh generated and used onsite."""
+  create_function = (create_tariff_structure_from_hh_data if half_hourly else
+                     create_flat_rate_tariff_structure_from_data)
+  return create_function(dataf, enums.EnergyCarrier.ELECTRICITY,
+                         enums.Destination.ONSITE, origin)
+
+
 def create_default_import_gas_data(start_datetime: datetime,
                                    end_datetime: datetime) -> pd.DataFrame:
   """Create a dataframe filled with default import gas prices values"""
@@ -220,7 +393,17 @@ def filter_input_data(dataf: pd.DataFrame, start_time: datetime,
 def create_hh_dataframe(org_hh_df: pd.DataFrame, start_month: date,
                         end_month: date) -> pd.DataFrame:
   """Create a half-hourly dataframe for the given date based on the average weeks values from the input dataframe."""
+  lookup_dict = get_average_week(org_hh_df)
+  return create_hh_dataframe_from_lookup(lookup_dict, start_month, end_month)
+
+
+def create_hh_dataframe_from_lookup(lookup_dict: dict[str, pd.DataFrame],
+                                    start_month: date,
+                                    end_month: date) -> pd.DataFrame:
+  """Create a half-hourly dataframe for the given date based on average week
+  lookup tables, from get_average_week or an AverageWeekAccumulator."""
   new_index = pd.date_range(start_month, end_month, freq="MS")
+  columns = list(lookup_dict)
   frames = []
   for datetime_month in new_index:
     temp_df = get_date_range(datetime_month).to_frame()
@@ -228,14 +411,13 @@ def create_hh_dataframe(org_hh_df: pd.DataFrame, start_month: date,
         axis=1).reset_index()
     temp_df["Key"] = (temp_df["Week"] * 7 * 48 + temp_df["Day_of_week"] * 48 +
                       temp_df["HH"])
-    lookup_dict = get_average_week(org_hh_df)
-    for col in org_hh_df.columns:
+    for col in columns:
       temp_df = pd.merge(temp_df,
                          lookup_dict[col],
                          left_on="Key",
                          right_on="Key")
 
-    temp_df = temp_df.set_index("index")[org_hh_df.columns]
+    temp_df = temp_df.set_index("index")[columns]
     frames.append(temp_df)
 
   return pd.concat(frames, axis=0)
@@ -282,6 +464,41 @@ def shift_filter_monthly_dataframe(org_monthly_df: pd.DataFrame,
   return new_df
 
 
+def fill_missing_months(dataf: pd.DataFrame,
+                        start_month: date,
+                        end_month: date,
+                        default_dataf: pd.DataFrame | None = None
+                        ) -> pd.DataFrame:
+  """Return the monthly data between start_month and end_month.
+  Months without data are filled with default_dataf when given, otherwise with
+  the latest data of the same month of the year, or the latest data if that
+  month was never invoiced. The end dates of the filled months are left
+  empty."""
+  dataf = dataf.copy()
+  dataf.index = dataf.index.to_period("M").to_timestamp()
+  dataf = dataf.sort_index()
+  dataf = dataf[~dataf.index.duplicated(keep="last")]
+  new_index = pd.date_range(start_month, end_month, freq="MS")
+  new_dataf = dataf.reindex(new_index)
+  for datetime_month in new_index.difference(dataf.index):
+    if default_dataf is not None:
+      values = default_dataf.loc[datetime_month]
+    else:
+      same_month = dataf.loc[dataf.index.month == datetime_month.month]
+      values = (same_month if len(same_month) > 0 else dataf).iloc[-1]
+    new_dataf.loc[datetime_month,
+                  values.index.intersection(new_dataf.columns)] = values
+  if schema.DataInputSchema.END_DATE in new_dataf.columns:
+    # the filled months are billed over their calendar month
+    new_dataf.loc[new_index.difference(dataf.index),
+                  schema.DataInputSchema.END_DATE] = pd.NaT
+  if schema.DataInputSchema.METERCODE in dataf.columns and len(dataf) > 0:
+    new_dataf[schema.DataInputSchema.METERCODE] = dataf[
+        schema.DataInputSchema.METERCODE].iloc[-1]
+  new_dataf.index.name = dataf.index.name
+  return new_dataf
+
+
 def get_attributes_class(input_class: object) -> dict:
   """Return a list of the attributes of a class."""
   dict_attributes = input_class.__dict__
@@ -1,7 +1,17 @@
+import json
+import logging
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, time, timedelta
+from pathlib import Path
+import numpy as np
 import pandas as pd
 from timeseries.common import enums, measurements
+from timeseries.economic import rollups, window_query
+
+CHARGES_FILENAME = "charges.npy"
+METADATA_FILENAME = "metadata.json"
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -13,7 +23,7 @@ class ConsumptionCharges:
   series: pd.Series
 
   def __post_init__(self):
-    print(f"post_init of {self.energy_charge_name}")
+    logger.debug("post_init of %s", self.energy_charge_name)
 
   @property
   def name(self):
@@ -22,6 +32,46 @@ class ConsumptionCharges:
   def get_charges_by_datetime(self, date_time: datetime) -> float:
     return self.series.loc[date_time]
 
+  def replace_months(self, new_series: pd.Series) -> None:
+    """Replace the charges of every month covered by new_series.
+    The charges of known months are written at their positions, months that
+    are not already in the series are appended. The series is replaced, not
+    modified, as it may be shared with cached structures."""
+    if not self.series.index.is_monotonic_increasing:
+      self.series = self.series.sort_index()
+    new_series = new_series.sort_index()
+    new_series = new_series[~new_series.index.duplicated(keep="last")]
+    new_months = new_series.index.to_period("M")
+    month_starts = new_months.unique().to_timestamp()
+    index = self.series.index
+    starts = index.searchsorted(month_starts)
+    ends = index.searchsorted(month_starts + pd.offsets.MonthBegin(1))
+    is_added = new_months.to_timestamp().isin(month_starts[starts == ends])
+    replaced = new_series.loc[~is_added]
+    # get_indexer needs unique timestamps, others go through drop_months
+    positions = (index.get_indexer(replaced.index)
+                 if index.is_unique else np.array([-1]))
+    if (positions < 0).any() or len(positions) != (ends - starts).sum():
+      self.series = self.drop_months(starts, ends, new_series)
+      return
+    values = self.series.to_numpy(dtype=float, copy=True)
+    values[positions] = replaced.to_numpy(dtype=float)
+    series = pd.Series(values, index=index, name=self.series.name)
+    if is_added.any():
+      series = pd.concat([series, new_series.loc[is_added]])
+      if not series.index.is_monotonic_increasing:
+        series = series.sort_index()
+    self.series = series
+
+  def drop_months(self, starts: np.ndarray, ends: np.ndarray,
+                  new_series: pd.Series) -> pd.Series:
+    """Return the series with the positions starts-ends replaced by
+    new_series, for months which half-hours differ from the new ones."""
+    keep = np.ones(len(self.series), dtype=bool)
+    for start, end in zip(starts, ends):
+      keep[start:end] = False
+    return pd.concat([self.series.loc[keep], new_series]).sort_index()
+
 
 @dataclass
 class TariffStructure:
@@ -32,9 +82,17 @@ class TariffStructure:
   units: measurements.Unit | None = None
   list_consumption_charges: list[ConsumptionCharges] = field(
       default_factory=list)
+  _rollups: rollups.RollupPyramid | None = field(default=None,
+                                                 init=False,
+                                                 repr=False,
+                                                 compare=False)
+  _prefix_sums: window_query.PrefixSums | None = field(default=None,
+                                                       init=False,
+                                                       repr=False,
+                                                       compare=False)
 
   def __post_init__(self):
-    print("post init")
+    logger.debug("post init")
     if self.units is None:
       self.units = measurements.get_unit(
           unit_name=enums.SimParameters.PRICE_UNIT.units)
@@ -54,6 +112,22 @@ class TariffStructure:
       names.append(temp_charges.name)
     return pd.DataFrame(index=names, columns=dates, data=list_values).T
 
+  def get_total_charges_series(self) -> pd.Series:
+    """Return the sum of all the consumption charges for each timestamp."""
+    total_charges = self.get_consumption_charges_dataframe().sum(axis=1)
+    total_charges.name = self.name
+    return total_charges
+
+  def get_total_charges_array(self,
+                              index: pd.DatetimeIndex,
+                              fill_value: float = np.nan) -> np.ndarray:
+    """Return the total charges aligned on index, fill_value where there is no
+    charge."""
+    total_charges = self.get_total_charges_series()
+    total_charges = total_charges[~total_charges.index.duplicated(
+        keep="last")]
+    return total_charges.reindex(index, fill_value=fill_value).values
+
   def get_total_consumption_charges(self, date_time: datetime) -> float:
     cost = 0
     assert self.list_consumption_charges is not None
@@ -62,6 +136,163 @@ class TariffStructure:
 
     return cost
 
+  def update_charges(self, new_structure: "TariffStructure") -> None:
+    """Splice the charges of new_structure into the tariff structure.
+    Only the months covered by new_structure are replaced."""
+    if (new_structure.energy_carrier is not self.energy_carrier
+        or new_structure.destination is not self.destination):
+      raise ValueError(
+          f"Cannot update {self.name} with charges from {new_structure.name}."
+      )
+    existing_charges = {
+        temp_charges.name: temp_charges
+        for temp_charges in self.list_consumption_charges
+    }
+    for new_charges in new_structure.list_consumption_charges:
+      if new_charges.name in existing_charges:
+        existing_charges[new_charges.name].replace_months(new_charges.series)
+      else:
+        self.list_consumption_charges.append(new_charges)
+    self._prefix_sums = None
+    if self._rollups is not None:
+      if new_structure.list_consumption_charges and all(
+          x.name in existing_charges
+          for x in new_structure.list_consumption_charges):
+        # the structure's own charges, so that the charges new_structure
+        # does not carry keep their values in the recomputed days
+        new_dataf = new_structure.get_consumption_charges_dataframe()
+        months = new_dataf.index.to_period("M").unique()
+        dataf = self.get_consumption_charges_dataframe()
+        is_updated = dataf.index.to_period("M").isin(months)
+        self._rollups.update(dataf.loc[is_updated])
+      else:
+        self._rollups = None
+
+  def get_rollups(self) -> rollups.RollupPyramid:
+    """Return the daily, weekly, monthly and yearly rollups of the charges.
+    They are computed once and updated by update_charges."""
+    if self._rollups is None:
+      self._rollups = rollups.create_rollup_pyramid(
+          self.get_consumption_charges_dataframe())
+    return self._rollups
+
+  def get_prefix_sums(self) -> window_query.PrefixSums:
+    """Return the prefix sums of the total charges over whole days.
+    They are computed once and reset by update_charges."""
+    if self._prefix_sums is None:
+      self._prefix_sums = window_query.PrefixSums.from_series(
+          self.get_total_charges_series())
+    return self._prefix_sums
+
+  def get_cheapest_windows(self,
+                           duration: timedelta,
+                           nb_windows: int = 1,
+                           start_date: datetime | None = None,
+                           end_date: datetime | None = None,
+                           earliest: time | None = None,
+                           latest: time | None = None,
+                           carbon: pd.Series | None = None,
+                           carbon_price: float = 0.0) -> pd.DataFrame:
+    """Return the start times of the nb_windows cheapest windows of duration of
+    each day between start_date and end_date, within earliest and latest.
+    With carbon (gCO2/kWh) the emissions are added to the charges at
+    carbon_price (GBP/tCO2)."""
+    prices = self.get_prefix_sums()
+    carbon_sums = None
+    if carbon is not None:
+      carbon_sums = window_query.PrefixSums.from_array(
+          prices.index,
+          carbon.reindex(prices.index).to_numpy(dtype=float))
+    return window_query.get_daily_windows(prices,
+                                          duration,
+                                          nb_windows,
+                                          start_date=start_date,
+                                          end_date=end_date,
+                                          earliest=earliest,
+                                          latest=latest,
+                                          carbon=carbon_sums,
+                                          carbon_price=carbon_price)
+
+  def get_slice(self, start_date: datetime | None,
+                end_date: datetime | None) -> "TariffStructure":
+    """Return a new tariff structure with the charges between start_date and
+    end_date included."""
+    list_charges = []
+    for temp_charges in self.list_consumption_charges:
+      series = temp_charges.series
+      if not series.index.is_monotonic_increasing:
+        series = series.sort_index()
+      list_charges.append(
+          ConsumptionCharges(temp_charges.name,
+                             series.loc[start_date:end_date]))
+    return TariffStructure(
+        energy_carrier=self.energy_carrier,
+        destination=self.destination,
+        origin=self.origin,
+        units=self.units,
+        list_consumption_charges=list_charges,
+    )
+
+  def save(self,
+           path: Path,
+           freq: str = "30min",
+           dtype: str = "float64") -> None:
+    """Save the tariff structure in a directory as a (charges x periods) matrix
+    and a json file describing the index and the charges.
+    The charges are stored on a regular index, missing periods are saved as NaN
+    and only the last charges of duplicated periods are kept."""
+    dataf = self.get_consumption_charges_dataframe().sort_index()
+    dataf = dataf[~dataf.index.duplicated(keep="last")]
+    index = pd.date_range(dataf.index[0], dataf.index[-1], freq=freq)
+    dataf = dataf.reindex(index)
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    np.save(path / CHARGES_FILENAME,
+            np.ascontiguousarray(dataf.values.T, dtype=dtype))
+    metadata = {
+        "energy_carrier": self.energy_carrier.name,
+        "destination": self.destination.name,
+        "origin": self.origin.name,
+        "units": str(self.units.units),
+        "start": index[0].isoformat(),
+        "freq": freq,
+        "periods": len(index),
+        "tz": None if index.tz is None else str(index.tz),
+        "charges": list(dataf.columns),
+    }
+    with open(path / METADATA_FILENAME, "w", encoding="utf-8") as file:
+      json.dump(metadata, file, indent=2)
+
+  @classmethod
+  def load(cls, path: Path, mmap: bool = True) -> "TariffStructure":
+    """Load a tariff structure saved with save.
+    With mmap, the charges are memory-mapped read-only so processes opening the
+    same file share a single page-cached copy."""
+    path = Path(path)
+    with open(path / METADATA_FILENAME, encoding="utf-8") as file:
+      metadata = json.load(file)
+    charges = np.load(path / CHARGES_FILENAME,
+                      mmap_mode="r" if mmap else None)
+    # the start is saved with its UTC offset, converted back to its time zone
+    start = pd.Timestamp(metadata["start"])
+    if metadata["tz"] is not None:
+      start = start.tz_convert(metadata["tz"])
+    index = pd.date_range(start,
+                          periods=metadata["periods"],
+                          freq=metadata["freq"])
+    list_charges = [
+        ConsumptionCharges(name, pd.Series(charges[row], index=index,
+                                           copy=False))
+        for row, name in enumerate(metadata["charges"])
+    ]
+    return cls(
+        energy_carrier=enums.EnergyCarrier[metadata["energy_carrier"]],
+        destination=enums.Destination[metadata["destination"]],
+        origin=enums.TechnologyType[metadata["origin"]],
+        units=measurements.get_unit(metadata["units"]),
+        list_consumption_charges=list_charges,
+    )
+
   def add_component(self):
     pass
 
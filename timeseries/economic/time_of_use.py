@@ -0,0 +1,158 @@
+from dataclasses import dataclass
+from datetime import date, time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from timeseries.data import schema
+
+NB_HH = 48
+HOLIDAY = 7  # day type used for the dates of the holiday calendar
+WEEKDAYS = (0, 1, 2, 3, 4)
+WEEKEND = (5, 6)
+ALL_DAYS = WEEKDAYS + WEEKEND + (HOLIDAY, )
+ALL_MONTHS = tuple(range(1, 13))
+
+
+@dataclass(frozen=True)
+class BandRule:
+  """Rule setting a band for some time ranges of some days of some months.
+  Args:
+      band: str
+        The name of the band (e.g. schema.DataInputSchema.DUOS_RED).
+      weekdays: tuple[int, ...]
+        The days the rule applies to, 0 is Monday and HOLIDAY is a holiday.
+      time_ranges: tuple[tuple[time, time], ...]
+        The (start, end) times of the rule, end excluded.
+        A range ending before it starts wraps around midnight.
+      months: tuple[int, ...]
+        The months (season) the rule applies to.
+  """
+  band: str
+  weekdays: tuple[int, ...]
+  time_ranges: tuple[tuple[time, time], ...]
+  months: tuple[int, ...] = ALL_MONTHS
+
+
+@dataclass(frozen=True)
+class TimeOfUseRules:
+  """Declarative set of time of use rules.
+  Args:
+      name: str
+        A name for the rule set.
+      default_band: str
+        The band applied when no rule matches.
+      rules: tuple[BandRule, ...]
+        The rules, a rule overrides the rules before it.
+      holidays: tuple[date, ...]
+        The holiday calendar, holidays use the HOLIDAY day type instead of
+        their weekday.
+  """
+  name: str
+  default_band: str
+  rules: tuple[BandRule, ...] = ()
+  holidays: tuple[date, ...] = ()
+
+  @property
+  def bands(self) -> tuple[str, ...]:
+    bands = [self.default_band]
+    for rule in self.rules:
+      if rule.band not in bands:
+        bands.append(rule.band)
+    return tuple(bands)
+
+
+@dataclass(frozen=True)
+class CompiledTimeOfUse:
+  """Time of use rules compiled into a (months x day types x half-hours) band
+  lookup table."""
+  bands: tuple[str, ...]
+  table: np.ndarray
+
+
+def get_hh_mask(time_ranges: tuple[tuple[time, time], ...]) -> np.ndarray:
+  """Return the boolean mask of the half-hours starting within the time
+  ranges."""
+  hh_minutes = np.arange(NB_HH) * 30
+  mask = np.zeros(NB_HH, dtype=bool)
+  for start, end in time_ranges:
+    start_minutes = start.hour * 60 + start.minute
+    end_minutes = end.hour * 60 + end.minute
+    if start_minutes < end_minutes:
+      mask |= (hh_minutes >= start_minutes) & (hh_minutes < end_minutes)
+    else:
+      mask |= (hh_minutes >= start_minutes) | (hh_minutes < end_minutes)
+  return mask
+
+
+@lru_cache(maxsize=None)
+def compile_rules(rules: TimeOfUseRules) -> CompiledTimeOfUse:
+  """Compile the rules into a band lookup table, cached per rule set."""
+  bands = rules.bands
+  table = np.zeros((len(ALL_MONTHS), HOLIDAY + 1, NB_HH), dtype=np.int8)
+  for rule in rules.rules:
+    months = np.array(rule.months) - 1
+    days = np.array(rule.weekdays)
+    hh_mask = get_hh_mask(rule.time_ranges)
+    table[np.ix_(months, days, np.flatnonzero(hh_mask))] = bands.index(
+        rule.band)
+  table.flags.writeable = False
+  return CompiledTimeOfUse(bands, table)
+
+
+def get_band_codes(index: pd.DatetimeIndex,
+                   rules: TimeOfUseRules) -> np.ndarray:
+  """Return the position in rules.bands of the band of each timestamp."""
+  compiled = compile_rules(rules)
+  hh = np.asarray(index.hour * 2 + index.minute // 30)
+  day_type = np.asarray(index.dayofweek).copy()
+  if rules.holidays:
+    holidays = pd.DatetimeIndex(rules.holidays)
+    day_type[np.asarray(index.normalize().isin(holidays))] = HOLIDAY
+  return compiled.table[np.asarray(index.month) - 1, day_type, hh]
+
+
+def get_band_masks(index: pd.DatetimeIndex,
+                   rules: TimeOfUseRules) -> dict[str, np.ndarray]:
+  """Return the boolean mask of each band."""
+  codes = get_band_codes(index, rules)
+  return {band: codes == code for code, band in enumerate(rules.bands)}
+
+
+def apply_rates(index: pd.DatetimeIndex, rules: TimeOfUseRules,
+                rates: dict[str, float]) -> np.ndarray:
+  """Return the rate of the band of each timestamp."""
+  lookup = np.array([rates[band] for band in rules.bands], dtype=float)
+  return lookup[get_band_codes(index, rules)]
+
+
+def create_duos_rules(name: str,
+                      red_ranges: tuple[tuple[time, time], ...],
+                      amber_ranges: tuple[tuple[time, time], ...],
+                      weekdays: tuple[int, ...] = WEEKDAYS,
+                      holidays: tuple[date, ...] = ()) -> TimeOfUseRules:
+  """Create DUOS red/amber/green rules, green being the default band."""
+  return TimeOfUseRules(
+      name=name,
+      default_band=schema.DataInputSchema.DUOS_GREEN,
+      rules=(
+          BandRule(schema.DataInputSchema.DUOS_AMBER, weekdays, amber_ranges),
+          BandRule(schema.DataInputSchema.DUOS_RED, weekdays, red_ranges),
+      ),
+      holidays=holidays,
+  )
+
+
+DUOS_RULES = create_duos_rules(
+    name="DUOS",
+    red_ranges=((time(16, 00), time(19, 00)), ),
+    amber_ranges=((time(7, 00), time(16, 00)), (time(19, 00), time(23, 00))),
+)
+
+DAY_NIGHT_RULES = TimeOfUseRules(
+    name="DAY_NIGHT",
+    default_band=schema.DataInputSchema.NIGHT_CHARGE,
+    rules=(BandRule(schema.DataInputSchema.DAY_CHARGE, ALL_DAYS,
+                    ((time(7, 00), time(0, 00)), )), ),
+)
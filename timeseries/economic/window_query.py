@@ -0,0 +1,185 @@
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+import numpy as np
+import pandas as pd
+
+NB_HH = 48
+PERIOD = pd.Timedelta(minutes=30)
+GRAMS_PER_TONNE = 10**6
+
+DAY = "Day"
+RANK = "Rank"
+START = "Start"
+END = "End"
+AVERAGE_PRICE = "Average_price"
+AVERAGE_CARBON = "Average_carbon"
+
+
+@dataclass
+class PrefixSums:
+  """Prefix sums of a half-hourly series on a regular index starting at
+  midnight, so the sum of any window is the difference of two values.
+  Args:
+      index: pd.DatetimeIndex
+        The regular half-hourly index, whole days.
+      cumulative: np.ndarray
+        The len(index) + 1 cumulative sums, missing values counting as 0.
+      missing: np.ndarray
+        The len(index) + 1 cumulative counts of missing values.
+
+  Methods:
+      get_window_sums(nb_periods: int) -> np.ndarray:
+          Return the sum of the window starting at each period, NaN if
+          incomplete.
+  """
+  index: pd.DatetimeIndex
+  cumulative: np.ndarray
+  missing: np.ndarray
+
+  @classmethod
+  def from_series(cls, series: pd.Series) -> "PrefixSums":
+    series = series.sort_index()
+    series = series[~series.index.duplicated(keep="last")]
+    if series.empty:
+      index = pd.DatetimeIndex([], dtype="M8[ns]")
+    else:
+      first_day = series.index[0].normalize()
+      last_day = series.index[-1].normalize()
+      index = pd.date_range(first_day,
+                            last_day + pd.Timedelta(days=1),
+                            freq=PERIOD,
+                            inclusive="left")
+    return cls.from_array(index, series.reindex(index).to_numpy(dtype=float))
+
+  @classmethod
+  def from_array(cls, index: pd.DatetimeIndex,
+                 values: np.ndarray) -> "PrefixSums":
+    is_missing = np.isnan(values)
+    return cls(
+        index=index,
+        cumulative=np.concatenate([[0.0],
+                                   np.cumsum(np.where(is_missing, 0.0,
+                                                      values))]),
+        missing=np.concatenate([[0], np.cumsum(is_missing)]),
+    )
+
+  def get_window_sums(self, nb_periods: int) -> np.ndarray:
+    sums = np.full(len(self.index), np.nan)
+    if nb_periods > len(self.index):
+      return sums
+    nb_starts = len(self.index) - nb_periods + 1
+    window_sums = self.cumulative[nb_periods:] - self.cumulative[:nb_starts]
+    complete = (self.missing[nb_periods:] - self.missing[:nb_starts]) == 0
+    sums[:nb_starts] = np.where(complete, window_sums, np.nan)
+    return sums
+
+
+def get_nb_periods(duration: timedelta) -> int:
+  nb_periods = pd.Timedelta(duration) / PERIOD
+  if nb_periods < 1 or nb_periods != int(nb_periods):
+    raise ValueError("The duration must be a positive multiple of 30 minutes.")
+  return int(nb_periods)
+
+
+def get_slot(time_of_day: time | None, default: int, round_up: bool) -> int:
+  """Return the half-hour slot of a time of day, rounded to a slot boundary."""
+  if time_of_day is None:
+    return default
+  minutes = time_of_day.hour * 60 + time_of_day.minute
+  return -(-minutes // 30) if round_up else minutes // 30
+
+
+def select_daily_windows(scores: np.ndarray, nb_periods: int,
+                         nb_windows: int) -> tuple[np.ndarray, np.ndarray]:
+  """Return the (days x nb_windows) starting slots of the lowest
+  non-overlapping windows of each day of (days x 48) scores and their scores,
+  inf when a day has fewer windows. Each rank is one pass over all days."""
+  scores = scores.copy()
+  slots = np.arange(NB_HH)
+  days = np.arange(len(scores))
+  best_slots = np.zeros((len(scores), nb_windows), dtype=np.int64)
+  best_scores = np.full((len(scores), nb_windows), np.inf)
+  for rank in range(nb_windows):
+    best = np.argmin(scores, axis=1)
+    best_slots[:, rank] = best
+    best_scores[:, rank] = scores[days, best]
+    overlapping = np.abs(slots[None, :] - best[:, None]) < nb_periods
+    scores[overlapping] = np.inf
+  return best_slots, best_scores
+
+
+def get_daily_windows(prices: PrefixSums | None,
+                      duration: timedelta,
+                      nb_windows: int = 1,
+                      start_date: datetime | None = None,
+                      end_date: datetime | None = None,
+                      earliest: time | None = None,
+                      latest: time | None = None,
+                      carbon: PrefixSums | None = None,
+                      carbon_price: float = 0.0) -> pd.DataFrame:
+  """Return the nb_windows cheapest non-overlapping windows of duration of each
+  day between start_date and end_date, starting at or after earliest and ending
+  at or before latest (the end of the day by default).
+  With carbon (gCO2/kWh, on the index of prices) the windows are ranked on the
+  price plus the emissions priced at carbon_price (GBP/tCO2), with prices None
+  on the carbon only. Windows with missing values are skipped, days without
+  window are left out."""
+  reference = prices if prices is not None else carbon
+  nb_periods = get_nb_periods(duration)
+  scores = np.zeros(len(reference.index))
+  price_sums = None
+  carbon_sums = None
+  if prices is not None:
+    price_sums = prices.get_window_sums(nb_periods)
+    scores = scores + price_sums
+  if carbon is not None:
+    carbon_sums = carbon.get_window_sums(nb_periods)
+    weight = 1.0 if prices is None else carbon_price / GRAMS_PER_TONNE
+    scores = scores + weight * carbon_sums
+
+  days = reference.index[::NB_HH]
+  first_day, last_day = 0, len(days)
+  if start_date is not None:
+    first_day = days.searchsorted(pd.Timestamp(start_date).normalize())
+  if end_date is not None:
+    last_day = days.searchsorted(pd.Timestamp(end_date), side="right")
+  scores = scores.reshape(-1, NB_HH)[first_day:last_day]
+
+  first_slot = get_slot(earliest, 0, round_up=True)
+  last_slot = get_slot(latest, NB_HH, round_up=False) - nb_periods
+  slots = np.arange(NB_HH)
+  allowed = (slots >= first_slot) & (slots <= last_slot)
+  scores = np.where(allowed[None, :] & ~np.isnan(scores), scores, np.inf)
+  best_slots, best_scores = select_daily_windows(scores, nb_periods,
+                                                 nb_windows)
+
+  found = np.isfinite(best_scores)
+  day_positions = np.nonzero(found)[0]
+  positions = (first_day + day_positions) * NB_HH + best_slots[found]
+  starts = reference.index[positions]
+  windows = pd.DataFrame({
+      DAY: days[first_day + day_positions],
+      RANK: np.nonzero(found)[1] + 1,
+      START: starts,
+      END: starts + nb_periods * PERIOD,
+  })
+  if price_sums is not None:
+    windows[AVERAGE_PRICE] = price_sums[positions] / nb_periods
+  if carbon_sums is not None:
+    windows[AVERAGE_CARBON] = carbon_sums[positions] / nb_periods
+  return windows
+
+
+def get_lowest_carbon_windows(carbon: pd.Series,
+                              duration: timedelta,
+                              nb_windows: int = 1,
+                              **constraints) -> pd.DataFrame:
+  """Return the nb_windows lowest-carbon windows of each day of a half-hourly
+  carbon intensity series (gCO2/kWh), constraints being those of
+  get_daily_windows."""
+  return get_daily_windows(None,
+                           duration,
+                           nb_windows,
+                           carbon=PrefixSums.from_series(carbon),
+                           **constraints)
@@ -5,6 +5,8 @@ from pathlib import Path
 import pandas as pd
 import requests
 
+from timeseries.common import dataframe_backend, enums
+
 url = "https://api.carbonintensity.org.uk/intensity"
 
 
@@ -34,19 +36,16 @@ def convert_datetime_to_isoformat(temp_date):
   return temp_date.isoformat()
 
 
-def json_response_to_dataframe(response: dict):
-
-  # load the dictionary into a dataframe
-  df = pd.DataFrame(response['data'])
-
-  # select the desired columns
-  df = df[['from', 'to', 'intensity']]
+def json_response_to_dataframe(
+    response: dict,
+    backend: enums.DataFrameBackend = enums.DataFrameBackend.PANDAS):
 
-  # expand the nested dictionary into separate columns
-  df = pd.concat(
-      [df.drop(['intensity'], axis=1), df['intensity'].apply(pd.Series)],
-      axis=1)
-  return df
+  # load the records into a dataframe, the nested intensity keys becoming
+  # columns, and select the desired columns
+  intensity_columns = list(
+      response['data'][0]['intensity']) if response['data'] else []
+  return dataframe_backend.get_backend(backend).from_records(
+      response['data'], 'intensity', ['from', 'to'] + intensity_columns)
 
 
 def get_number_days_in_month(year: int, month: int) -> int: